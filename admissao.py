@@ -0,0 +1,114 @@
+"""
+Controle de admissão para as operações de depósito, saque e extrato.
+
+Cada CPF tem um balde de tokens (taxa sustentada + rajada): o estado é só
+(tokens, instante da última consulta), reabastecido sob demanda quando o CPF
+volta a pedir, e os baldes cheios são descartados. Globalmente, no máximo
+`maximo_em_andamento` operações rodam ao mesmo tempo; as demais esperam até
+`espera_maxima_s` por uma vaga e então são recusadas.
+
+O resultado é um código:
+    ADMITIDA    a operação pode prosseguir (chame liberar() ao terminar)
+    LIMITE_CPF  o CPF excedeu a própria taxa; nada foi reservado
+    SOBRECARGA  não havia vaga dentro da espera máxima; nada foi reservado
+
+Uso:
+    with controle.operacao(cpf) as codigo:
+        if codigo != ADMITIDA:
+            ...  # responder com o código, sem tocar no banco
+"""
+import contextlib
+import threading
+import time
+
+ADMITIDA = "ADMITIDA"
+LIMITE_CPF = "LIMITE_CPF"
+SOBRECARGA = "SOBRECARGA"
+
+MENSAGENS = {
+    LIMITE_CPF: "Muitas requisições para este CPF; tente novamente em instantes.",
+    SOBRECARGA: "Sistema sobrecarregado; tente novamente em instantes.",
+}
+
+
+class ControleAdmissao:
+    def __init__(self, taxa_por_cpf, rajada_por_cpf, maximo_em_andamento, espera_maxima_s=0.0, relogio=time.monotonic):
+        self.taxa_por_cpf = taxa_por_cpf
+        self.rajada_por_cpf = rajada_por_cpf
+        self.maximo_em_andamento = maximo_em_andamento
+        self.espera_maxima_s = espera_maxima_s
+        self._relogio = relogio
+        self._baldes = {}  # cpf -> [tokens, instante da última consulta]
+        self._em_andamento = 0
+        self._consultas = 0
+        self._condicao = threading.Condition()
+
+    @property
+    def em_andamento(self):
+        return self._em_andamento
+
+    def _consumir_token(self, cpf, agora):
+        tokens, ultimo = self._baldes.get(cpf) or (self.rajada_por_cpf, agora)
+        tokens = min(self.rajada_por_cpf, tokens + (agora - ultimo) * self.taxa_por_cpf)
+        if tokens < 1:
+            self._baldes[cpf] = [tokens, agora]
+            return False
+        self._baldes[cpf] = [tokens - 1, agora]
+        return True
+
+    def _devolver_token(self, cpf, agora):
+        # O balde pode ter sido descartado (cheio) enquanto esta thread esperava:
+        # ausente equivale a cheio, e a devolução nunca passa da rajada
+        balde = self._baldes.get(cpf)
+        if balde is None:
+            return
+        tokens, ultimo = balde
+        tokens = min(self.rajada_por_cpf, tokens + (agora - ultimo) * self.taxa_por_cpf + 1)
+        self._baldes[cpf] = [tokens, agora]
+
+    def _descartar_baldes_cheios(self, agora):
+        # Um balde que já teria reabastecido por completo equivale a um CPF novo
+        cheios = [
+            cpf for cpf, (tokens, ultimo) in self._baldes.items()
+            if tokens + (agora - ultimo) * self.taxa_por_cpf >= self.rajada_por_cpf
+        ]
+        for cpf in cheios:
+            del self._baldes[cpf]
+
+    def admitir(self, cpf, espera=None):
+        """
+        Reserva uma vaga para uma operação do CPF e retorna ADMITIDA,
+        LIMITE_CPF ou SOBRECARGA. `espera` (segundos) substitui a espera
+        máxima configurada; use 0 em código assíncrono.
+        """
+        espera = self.espera_maxima_s if espera is None else espera
+        with self._condicao:
+            agora = self._relogio()
+            self._consultas += 1
+            if self._consultas % 4096 == 0:
+                self._descartar_baldes_cheios(agora)
+
+            if not self._consumir_token(cpf, agora):
+                return LIMITE_CPF
+            if self._em_andamento >= self.maximo_em_andamento and espera > 0:
+                self._condicao.wait_for(lambda: self._em_andamento < self.maximo_em_andamento, timeout=espera)
+            if self._em_andamento >= self.maximo_em_andamento:
+                # Recusada sem executar: o token volta para o CPF
+                self._devolver_token(cpf, self._relogio())
+                return SOBRECARGA
+            self._em_andamento += 1
+            return ADMITIDA
+
+    def liberar(self):
+        with self._condicao:
+            self._em_andamento -= 1
+            self._condicao.notify()
+
+    @contextlib.contextmanager
+    def operacao(self, cpf, espera=None):
+        codigo = self.admitir(cpf, espera)
+        try:
+            yield codigo
+        finally:
+            if codigo == ADMITIDA:
+                self.liberar()
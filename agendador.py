@@ -0,0 +1,94 @@
+"""
+Agendador de operações com duas classes de prioridade.
+
+    interativas  depósitos, saques, transferências, cadastros: rodam na hora,
+                 na thread de quem chamou
+    relatórios   extratos completos e listagens: rodam em um pool de threads
+                 em segundo plano, com no máximo `relatorios_simultaneos` ao
+                 mesmo tempo (os demais aguardam na fila do pool)
+
+Um relatório é um iterável de blocos de texto. Entre um bloco e o seguinte,
+ele cede a vez enquanto houver operação interativa em andamento (por até
+`pausa_maxima_s`, para nunca ficar parado indefinidamente). O texto completo
+fica disponível em `prontos()` quando o relatório termina.
+"""
+import contextlib
+import functools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class Agendador:
+    def __init__(self, relatorios_simultaneos=2, pausa_maxima_s=0.1):
+        self.pausa_maxima_s = pausa_maxima_s
+        self._executor = ThreadPoolExecutor(max_workers=relatorios_simultaneos, thread_name_prefix="relatorio")
+        self._interativas = 0
+        self._condicao = threading.Condition()
+        self._prontos = queue.Queue()
+        self._pendentes = set()
+
+    @contextlib.contextmanager
+    def operacao_interativa(self):
+        with self._condicao:
+            self._interativas += 1
+        try:
+            yield
+        finally:
+            with self._condicao:
+                self._interativas -= 1
+                if not self._interativas:
+                    self._condicao.notify_all()
+
+    def interativa(self, funcao):
+        """
+        Envolve `funcao` para que rode como operação interativa.
+        """
+        @functools.wraps(funcao)
+        def executar(*args, **kwargs):
+            with self.operacao_interativa():
+                return funcao(*args, **kwargs)
+        return executar
+
+    def _ceder(self):
+        with self._condicao:
+            self._condicao.wait_for(lambda: not self._interativas, timeout=self.pausa_maxima_s)
+
+    def _gerar(self, nome, blocos, erro):
+        partes = []
+        try:
+            for bloco in blocos:
+                partes.append(bloco)
+                self._ceder()
+            texto = "".join(partes)
+        except Exception as e:
+            texto = f"{erro or f'Erro em {nome}'}: {e}\n"
+        self._prontos.put((nome, texto))
+        return texto
+
+    def submeter_relatorio(self, nome, blocos, erro=None):
+        """
+        Agenda o relatório e retorna o Future com o texto completo.
+        `erro` é o prefixo da mensagem exibida se o relatório falhar.
+        """
+        futuro = self._executor.submit(self._gerar, nome, blocos, erro)
+        self._pendentes.add(futuro)
+        futuro.add_done_callback(self._pendentes.discard)
+        return futuro
+
+    def prontos(self):
+        """
+        Relatórios concluídos desde a última chamada, como (nome, texto).
+        """
+        concluidos = []
+        while True:
+            try:
+                concluidos.append(self._prontos.get_nowait())
+            except queue.Empty:
+                return concluidos
+
+    def aguardar(self, timeout=None):
+        wait(list(self._pendentes), timeout=timeout)
+
+    def encerrar(self):
+        self._executor.shutdown(wait=True)
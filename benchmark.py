@@ -0,0 +1,1217 @@
+"""
+Benchmarks de desempenho do sistema bancário.
+
+Uso:
+    python benchmark.py <nome> [--operacoes N]
+
+Os benchmarks do extradb rodam em arquivos SQLite temporários e não tocam o
+banco configurado em EXTRADB_URL.
+"""
+import argparse
+import asyncio
+import contextlib
+import datetime
+import io
+import os
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from sqlalchemy.orm import sessionmaker
+
+# O extradb cria sua engine ao ser importado; sem EXTRADB_URL usamos um SQLite em memória
+os.environ.setdefault("EXTRADB_URL", "sqlite://")
+
+
+# --- Utilitários ---
+
+@contextlib.contextmanager
+def silencioso():
+    """
+    Descarta as mensagens impressas pelas operações durante a medição.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def percentil(amostras, p):
+    ordenadas = sorted(amostras)
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+def executar_produtores(quantidade, funcao):
+    """
+    Roda `funcao(indice)` em `quantidade` threads e devolve a duração total.
+    """
+    threads = [threading.Thread(target=funcao, args=(i,)) for i in range(quantidade)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - inicio
+
+
+def cronometrar(funcao, *args, **kwargs):
+    inicio = time.perf_counter()
+    resultado = funcao(*args, **kwargs)
+    return time.perf_counter() - inicio, resultado
+
+
+def preparar_banco_extradb(diretorio, nome="bench.db", otimizar_sqlite=True, quantidade_contas=1, saldo_inicial=0.0):
+    """
+    Cria um banco SQLite com um cliente por conta e retorna (engine, Sessao, ids das contas).
+    """
+    import extradb
+
+    engine = extradb.criar_engine(f"sqlite:///{os.path.join(diretorio, nome)}", otimizar_sqlite=otimizar_sqlite)
+    extradb.Base.metadata.create_all(engine)
+    Sessao = sessionmaker(bind=engine)
+
+    session = Sessao()
+    contas = []
+    for i in range(quantidade_contas):
+        cliente = extradb.Cliente(
+            nome=f"Cliente {i}",
+            cpf=str(i).zfill(11),
+            endereco="Rua do Benchmark, 1",
+            data_nascimento=datetime.datetime(1990, 1, 1),
+        )
+        conta = extradb.ContaCorrente(
+            numero=str(i + 1).zfill(4),
+            agencia="0001",
+            saldo=saldo_inicial,
+            limite_saque=500.00,
+            limite_saques_diarios=3,
+            numero_saques=0,
+            cliente=cliente,
+        )
+        session.add(conta)
+        contas.append(conta)
+    session.commit()
+    ids = [conta.id for conta in contas]
+    session.close()
+    return engine, Sessao, ids
+
+
+# --- Benchmarks ---
+
+def bench_sqlite_pragmas(operacoes):
+    """
+    Vazão de depósitos (um commit por operação) no SQLite padrão e no perfil otimizado.
+    """
+    import extradb
+
+    for perfil, otimizar in (("padrão", False), ("otimizado", True)):
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, (conta_id,) = preparar_banco_extradb(diretorio, otimizar_sqlite=otimizar)
+
+            def depositar_varias_vezes():
+                for _ in range(operacoes):
+                    session = Sessao()
+                    conta = session.get(extradb.ContaCorrente, conta_id)
+                    extradb.Deposito(10.0).registrar(conta, session)
+                    session.commit()
+                    session.close()
+
+            with silencioso():
+                duracao, _ = cronometrar(depositar_varias_vezes)
+            engine.dispose()
+        print(f"SQLite {perfil:>10}: {operacoes} depósitos em {duracao:.2f}s ({operacoes / duracao:,.0f} ops/s)")
+
+
+def bench_async_concorrencia(operacoes, niveis=(1, 10, 100, 500)):
+    """
+    Vazão do caminho assíncrono (1 depósito para cada 4 extratos) por nível de concorrência.
+    """
+    import extradb_async
+
+    quantidade_contas = 200
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, _, ids = preparar_banco_extradb(diretorio, quantidade_contas=quantidade_contas, saldo_inicial=1000.0)
+        engine.dispose()
+
+        async def medir(concorrencia):
+            engine_async = extradb_async.criar_engine_async(
+                f"sqlite+aiosqlite:///{os.path.join(diretorio, 'bench.db')}", pool_size=20, max_overflow=0
+            )
+            Sessao = extradb_async.async_sessionmaker(engine_async, expire_on_commit=False)
+            limite = asyncio.Semaphore(concorrencia)
+
+            async def operacao(i):
+                cpf, numero = str(i % quantidade_contas).zfill(11), str(i % quantidade_contas + 1).zfill(4)
+                async with limite:
+                    if i % 5 == 0:
+                        await extradb_async.depositar(cpf, numero, 1.0, sessionmaker=Sessao)
+                    else:
+                        await extradb_async.exibir_extrato(cpf, numero, sessionmaker=Sessao)
+
+            inicio = time.perf_counter()
+            await asyncio.gather(*(operacao(i) for i in range(operacoes)))
+            duracao = time.perf_counter() - inicio
+            await engine_async.dispose()
+            return duracao
+
+        for concorrencia in niveis:
+            with silencioso():
+                duracao = asyncio.run(medir(concorrencia))
+            print(f"Concorrência {concorrencia:>4}: {operacoes} operações em {duracao:.2f}s ({operacoes / duracao:,.0f} ops/s)")
+
+
+def bench_arquivamento(operacoes, historicos=(10_000, 100_000, 500_000)):
+    """
+    Extratos recentes (últimos 30 dias) antes e depois de arquivar históricos crescentes.
+    """
+    import extradb
+    from sqlalchemy import insert
+
+    agora = datetime.datetime.now()
+    inicio_recente = agora - datetime.timedelta(days=30)
+    for tamanho in historicos:
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=10)
+            session = Sessao()
+            antigas = [
+                {"tipo": "Deposito", "valor": 1.0, "data": agora - datetime.timedelta(days=365, minutes=i), "conta_id": ids[i % len(ids)]}
+                for i in range(tamanho)
+            ]
+            recentes = [
+                {"tipo": "Deposito", "valor": 1.0, "data": agora - datetime.timedelta(days=1, minutes=i), "conta_id": ids[i % len(ids)]}
+                for i in range(100)
+            ]
+            session.execute(insert(extradb.Transacao), antigas + recentes)
+            session.commit()
+            contas = session.query(extradb.ContaCorrente).all()
+
+            def consultar_recentes():
+                for i in range(operacoes):
+                    extradb.consultar_transacoes(contas[i % len(contas)], session, inicio_recente)
+
+            quente, _ = cronometrar(consultar_recentes)
+            arquivamento, total = cronometrar(
+                extradb.arquivar_transacoes, agora - datetime.timedelta(days=180), session_factory=Sessao, tamanho_lote=5000
+            )
+            arquivado, _ = cronometrar(consultar_recentes)
+            session.close()
+            engine.dispose()
+        print(f"Histórico {tamanho:>9,}: extratos recentes {operacoes / quente:,.0f}/s sem arquivo, "
+              f"{operacoes / arquivado:,.0f}/s com arquivo ({total:,} linhas arquivadas em {arquivamento:.2f}s)")
+
+
+def bench_escrita_em_grupo(operacoes, produtores=16):
+    """
+    Depósitos de vários produtores: um commit por operação vs. commit em grupo.
+    """
+    import extradb
+
+    por_produtor = max(1, operacoes // produtores)
+    for modo in ("commit individual", "commit em grupo"):
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=produtores, otimizar_sqlite=True)
+            escritor = extradb.EscritorEmGrupo(Sessao).iniciar() if modo == "commit em grupo" else None
+            latencias = []
+
+            def produtor(indice):
+                for _ in range(por_produtor):
+                    inicio = time.perf_counter()
+                    if escritor:
+                        escritor.submeter(ids[indice], extradb.Deposito(1.0)).resultado()
+                    else:
+                        session = Sessao()
+                        conta = session.get(extradb.ContaCorrente, ids[indice])
+                        extradb.Deposito(1.0).registrar(conta, session)
+                        session.commit()
+                        session.close()
+                    latencias.append(time.perf_counter() - inicio)
+
+            with silencioso():
+                duracao = executar_produtores(produtores, produtor)
+                if escritor:
+                    escritor.parar()
+            engine.dispose()
+        total = por_produtor * produtores
+        print(f"{modo:>17}: {total / duracao:,.0f} ops/s | latência p50 {statistics.median(latencias) * 1000:.1f} ms, "
+              f"p99 {percentil(latencias, 99) * 1000:.1f} ms")
+
+
+def bench_projecao_leitura(operacoes, leitores=4, quantidade_contas=2000, intervalo=0.005):
+    """
+    Latência de depósitos e de listagens de contas no banco ou na projeção. Cada leitor
+    lista as contas a cada `intervalo` segundos, no mesmo ritmo nos dois modos, para
+    comparar o custo de cada leitura sem que leitores em laço disputem a GIL com as escritas.
+    """
+    import extradb
+
+    for modo in ("banco", "projeção"):
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=quantidade_contas)
+            projecao = extradb.ProjecaoLeitura(Sessao).ativar() if modo == "projeção" else None
+            parar = threading.Event()
+            leituras = []
+
+            def leitor(_):
+                while not parar.wait(intervalo):
+                    inicio = time.perf_counter()
+                    if projecao:
+                        projecao.listar_contas()
+                    else:
+                        session = Sessao()
+                        session.query(extradb.ContaCorrente.agencia, extradb.ContaCorrente.numero, extradb.Cliente.nome,
+                                      extradb.Cliente.cpf).join(extradb.Cliente).order_by(extradb.ContaCorrente.numero).all()
+                        session.close()
+                    leituras.append(time.perf_counter() - inicio)
+
+            threads = [threading.Thread(target=leitor, args=(i,)) for i in range(leitores)]
+            for thread in threads:
+                thread.start()
+
+            latencias = []
+            with silencioso():
+                for i in range(operacoes):
+                    inicio = time.perf_counter()
+                    session = Sessao()
+                    conta = session.get(extradb.ContaCorrente, ids[i % len(ids)])
+                    extradb.Deposito(1.0).registrar(conta, session)
+                    session.commit()
+                    session.close()
+                    latencias.append(time.perf_counter() - inicio)
+            parar.set()
+            for thread in threads:
+                thread.join()
+            if projecao:
+                projecao.desativar()
+            engine.dispose()
+        print(f"Leituras no {modo:>8}: depósito p50 {statistics.median(latencias) * 1000:.1f} ms, "
+              f"p99 {percentil(latencias, 99) * 1000:.1f} ms | listagem p50 "
+              f"{statistics.median(leituras) * 1000:.2f} ms ({len(leituras)} listagens)")
+
+
+def bench_comandos_preconstruidos(operacoes):
+    """
+    CPU por busca de cliente/conta e por crédito: consulta remontada a cada chamada vs. comando pré-construído.
+    """
+    import extradb
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=100)
+        session = Sessao()
+        cpfs = [str(i).zfill(11) for i in range(100)]
+
+        def buscar_remontando():
+            for i in range(operacoes):
+                cliente = session.query(extradb.Cliente).filter_by(cpf=cpfs[i % 100]).first()
+                session.query(extradb.ContaCorrente).filter_by(numero=str(i % 100 + 1).zfill(4), cliente=cliente).first()
+
+        def buscar_preconstruido():
+            for i in range(operacoes):
+                cliente = extradb.filtrar_cliente(cpfs[i % 100], session)
+                extradb.filtrar_conta(cliente, str(i % 100 + 1).zfill(4), session)
+
+        contas = [session.get(extradb.ContaCorrente, conta_id) for conta_id in ids]
+
+        def creditar_pelo_orm():
+            for i in range(operacoes):
+                contas[i % 100].saldo += 1.0
+                session.flush()
+
+        def creditar_preconstruido():
+            for i in range(operacoes):
+                session.execute(extradb._CREDITAR_CONTA, {"conta_id": ids[i % 100], "valor": 1.0})
+
+        for nome, funcao in (
+            ("busca remontada", buscar_remontando),
+            ("busca pré-construída", buscar_preconstruido),
+            ("crédito via ORM", creditar_pelo_orm),
+            ("crédito pré-construído", creditar_preconstruido),
+        ):
+            inicio = time.process_time()
+            funcao()
+            cpu = time.process_time() - inicio
+            print(f"{nome:>23}: {cpu / operacoes * 1e6:,.1f} µs de CPU por operação")
+        session.rollback()
+        session.close()
+        engine.dispose()
+
+
+def bench_tabela_contas(operacoes, quantidade_contas=100_000):
+    """
+    desafio3: lista de dicionários (busca linear) vs. tabela colunar (acesso direto).
+    """
+    import desafio3
+
+    def nova_conta(numero):
+        return {
+            "agencia": desafio3.AGENCIA, "numero_conta": numero, "cpf": str(numero).zfill(11), "saldo": 0.0,
+            "limite": 500.0, "extrato": "", "numero_saques": 0, "numero_transacoes": 0
+        }
+
+    tracemalloc.start()
+    lista = [nova_conta(numero) for numero in range(1, quantidade_contas + 1)]
+    memoria_lista = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del lista
+
+    tracemalloc.start()
+    tabela = desafio3.TabelaContas()
+    for numero in range(1, quantidade_contas + 1):
+        tabela.adicionar(nova_conta(numero))
+    memoria_tabela = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    lista = [tabela.linha(posicao) for posicao in range(len(tabela))]
+    consultas = [(str(numero).zfill(11), numero) for numero in range(1, quantidade_contas + 1, max(1, quantidade_contas // 200))]
+    consultas_lista = consultas[:max(1, min(len(consultas), operacoes // 100))]
+    duracao_lista, _ = cronometrar(lambda: [
+        [conta for conta in lista if conta["cpf"] == cpf and conta["numero_conta"] == numero] for cpf, numero in consultas_lista
+    ])
+    duracao_tabela, _ = cronometrar(lambda: [
+        desafio3.filtrar_conta(tabela, *consultas[i % len(consultas)]) for i in range(operacoes)
+    ])
+    print(f"{quantidade_contas:,} contas | memória: lista {memoria_lista / quantidade_contas:,.0f} B/conta, "
+          f"tabela {memoria_tabela / quantidade_contas:,.0f} B/conta")
+    print(f"Busca: lista {duracao_lista / len(consultas_lista) * 1e6:,.1f} µs, tabela {duracao_tabela / operacoes * 1e6:,.2f} µs")
+    duracao_soma, total = cronometrar(tabela.saldo_total)
+    print(f"Saldo total do banco: {duracao_soma * 1000:.2f} ms")
+
+
+def bench_fechamento_diario(operacoes, contas_tabela=10_000_000, contas_objetos=1_000_000, contas_sql=100_000):
+    """
+    Fechamento diário: tabela colunar do desafio3, objetos do desafio4 e comandos em massa do extradb.
+    """
+    from array import array
+
+    import desafio3
+    import desafio4
+    import extradb
+    from sqlalchemy import insert
+
+    tabela = desafio3.TabelaContas()
+    tabela.agencia = [desafio3.AGENCIA] * contas_tabela
+    tabela.cpf = [""] * contas_tabela
+    tabela.extrato = [""] * contas_tabela
+    tabela.saldo = array("d", bytes(8 * contas_tabela))
+    tabela.limite = array("d", [500.0]) * contas_tabela
+    tabela.numero_saques = array("i", [2]) * contas_tabela
+    tabela.numero_transacoes = array("i", [5]) * contas_tabela
+    duracao, _ = cronometrar(tabela.fechamento_diario)
+    print(f"desafio3 (tabela colunar), {contas_tabela:>10,} contas: {duracao:.3f}s")
+    del tabela
+
+    cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+    contas = [desafio4.ContaCorrente(cliente, numero) for numero in range(contas_objetos)]
+    duracao, _ = cronometrar(desafio4.fechamento_diario, contas)
+    print(f"desafio4 (objetos),        {contas_objetos:>10,} contas: {duracao:.3f}s")
+    del contas
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, _ = preparar_banco_extradb(diretorio, quantidade_contas=0)
+        session = Sessao()
+        session.execute(insert(extradb.Cliente), [{"id": 1, "nome": "Cliente", "cpf": "0", "endereco": "Rua"}])
+        session.execute(insert(extradb.ContaCorrente), [
+            {"numero": str(i), "agencia": "0001", "saldo": 100.0, "limite_saque": 500.0,
+             "limite_saques_diarios": 3, "numero_saques": 2, "cliente_id": 1}
+            for i in range(contas_sql)
+        ])
+        session.commit()
+        session.close()
+        duracao, _ = cronometrar(extradb.fechamento_diario, Sessao, contas_por_lote=5000)
+        engine.dispose()
+    print(f"extradb (SQLite, lotes),   {contas_sql:>10,} contas: {duracao:.3f}s")
+
+
+def bench_lote(operacoes, quantidade_contas=1000):
+    """
+    Replay de um fluxo de comandos em lote nos programas em memória (desafio1 a desafio4).
+    """
+    import desafio1
+    import desafio2
+    import desafio3
+    import desafio4
+
+    cpf = "12345678900"
+    cadastro = [f"nu;{cpf};Cliente;01-01-1990;Rua A, 1"] + [f"nc;{cpf}"] * quantidade_contas
+    movimentos = [
+        f"d;{cpf};{i % quantidade_contas + 1};10" if i % 2 else f"s;{cpf};{i % quantidade_contas + 1};5"
+        for i in range(operacoes)
+    ]
+    simples = ["e" if i % 1000 == 999 else "d;10" for i in range(operacoes)]
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        for nome, modulo, linhas in (
+            ("desafio1", desafio1, simples),
+            ("desafio2", desafio2, simples),
+            ("desafio3", desafio3, cadastro + movimentos),
+            ("desafio4", desafio4, cadastro + movimentos),
+        ):
+            arquivo = os.path.join(diretorio, f"{nome}.txt")
+            with open(arquivo, "w", encoding="utf-8") as fluxo:
+                fluxo.write("\n".join(linhas))
+            with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+                duracao, _ = cronometrar(modulo.main, arquivo)
+            print(f"{nome}: {len(linhas):,} operações em {duracao:.2f}s ({len(linhas) / duracao:,.0f} ops/s)")
+
+
+def bench_reconstrucao(operacoes, quantidade_contas=2000, transacoes_por_operacao=100):
+    """
+    Reconstrução de saldos a partir do log de transações com 1, 2, 4... processos.
+    """
+    import extradb
+    from sqlalchemy import insert
+
+    agora = datetime.datetime.now()
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=quantidade_contas)
+        session = Sessao()
+        total = operacoes * transacoes_por_operacao
+        for inicio in range(0, total, 100_000):
+            session.execute(insert(extradb.Transacao), [
+                {"tipo": "Deposito" if i % 3 else "Saque", "valor": 1.0,
+                 "data": agora - datetime.timedelta(minutes=i), "conta_id": ids[i % len(ids)]}
+                for i in range(inicio, min(inicio + 100_000, total))
+            ])
+        session.commit()
+        session.close()
+
+        niveis = sorted({1, *[2 ** i for i in range(1, 5) if 2 ** i <= (os.cpu_count() or 1)]})
+        referencia = None
+        for processos in niveis:
+            duracao, estado = cronometrar(extradb.reconstruir_estado, Sessao, processos=processos, gravar=False)
+            referencia = referencia or duracao
+            print(f"{processos:>2} processo(s): {total:,} transações em {duracao:.2f}s "
+                  f"({total / duracao:,.0f}/s, {referencia / duracao:.1f}x)")
+        engine.dispose()
+
+
+def bench_transferencias(operacoes, quantidade_contas=10_000, operacoes_sql=5_000):
+    """
+    Folha de pagamento: transferências de uma conta pagadora para várias contas, uma a uma
+    e em lote compensado (desafio4 em memória e extradb em SQLite).
+    """
+    import desafio4
+    import extradb
+
+    cliente = desafio4.PessoaFisica("Empresa", "01-01-2000", "0", "Rua do Benchmark, 1")
+    for modo in ("uma a uma", "em lote"):
+        contas = [desafio4.ContaCorrente(cliente, numero) for numero in range(quantidade_contas + 1)]
+        pagadora = contas[0]
+        pagadora._saldo = float(operacoes)
+        folha = [(pagadora, contas[1 + i % quantidade_contas], 1.0) for i in range(operacoes)]
+        with silencioso():
+            if modo == "uma a uma":
+                duracao, _ = cronometrar(lambda: [desafio4.Transferencia(valor, destino).registrar(origem) for origem, destino, valor in folha])
+            else:
+                duracao, _ = cronometrar(desafio4.transferir_em_lote, folha)
+        print(f"desafio4 {modo:>9}: {operacoes:,} transferências em {duracao:.2f}s ({operacoes / duracao:,.0f}/s), "
+              f"{len(pagadora.historico.transacoes):,} lançamento(s) na pagadora")
+
+    operacoes_sql = min(operacoes, operacoes_sql)
+    quantidade_sql = min(quantidade_contas, 1000)
+    for modo in ("uma a uma", "em lote"):
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=quantidade_sql + 1)
+            session = Sessao()
+            session.get(extradb.ContaCorrente, ids[0]).saldo = float(operacoes_sql)
+            session.commit()
+            folha = [(ids[0], ids[1 + i % quantidade_sql], 1.0) for i in range(operacoes_sql)]
+
+            def uma_a_uma():
+                pagadora = session.get(extradb.ContaCorrente, ids[0])
+                for origem_id, destino_id, valor in folha:
+                    extradb.Transferencia(valor, destino_id).registrar(pagadora, session)
+                    session.commit()
+
+            with silencioso():
+                if modo == "uma a uma":
+                    duracao, _ = cronometrar(uma_a_uma)
+                else:
+                    duracao, _ = cronometrar(extradb.transferir_em_lote, folha, Sessao)
+            session.close()
+            engine.dispose()
+        print(f"extradb  {modo:>9}: {operacoes_sql:,} transferências em {duracao:.2f}s ({operacoes_sql / duracao:,.0f}/s)")
+
+
+def bench_juros_tarifas(operacoes, contas_tabela=10_000_000, contas_python=1_000_000, contas_sql=100_000):
+    """
+    Juros e tarifas em todas as contas: tabela colunar do desafio3 (NumPy e Python puro)
+    e lançamentos em massa do extradb.
+    """
+    from array import array
+
+    import desafio3
+    import extradb
+    from sqlalchemy import insert
+
+    def tabela_com(quantidade):
+        tabela = desafio3.TabelaContas()
+        tabela.agencia = [desafio3.AGENCIA] * quantidade
+        tabela.cpf = [""] * quantidade
+        tabela.extrato = [""] * quantidade
+        tabela.saldo = array("d", (float(i % 5000) for i in range(quantidade)))
+        tabela.limite = array("d", [500.0]) * quantidade
+        tabela.numero_saques = array("i", [0]) * quantidade
+        tabela.numero_transacoes = array("i", [0]) * quantidade
+        tabela.lancamentos_aplicados = array("i", [0]) * quantidade
+        return tabela
+
+    numpy = desafio3.np
+    for nome, quantidade, usar_numpy in (("NumPy", contas_tabela, True), ("Python puro", contas_python, False)):
+        if usar_numpy and numpy is None:
+            print("desafio3 (NumPy): NumPy não instalado")
+            continue
+        tabela = tabela_com(quantidade)
+        desafio3.np = numpy if usar_numpy else None
+        try:
+            duracao, (juros, tarifas) = cronometrar(tabela.aplicar_juros_e_tarifas, 0.01, 5.0, 100.0)
+        finally:
+            desafio3.np = numpy
+        extrato, _ = cronometrar(lambda: [tabela.materializar_lancamentos(i) for i in range(0, quantidade, quantidade // 1000)])
+        print(f"desafio3 ({nome:>11}), {quantidade:>10,} contas: {duracao:.3f}s "
+              f"({juros:,} juros, {tarifas:,} tarifas; extrato de uma conta {extrato:.3f} ms)")
+        del tabela
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, _ = preparar_banco_extradb(diretorio, quantidade_contas=0)
+        session = Sessao()
+        session.execute(insert(extradb.Cliente), [{"id": 1, "nome": "Cliente", "cpf": "0", "endereco": "Rua"}])
+        session.execute(insert(extradb.ContaCorrente), [
+            {"numero": str(i), "agencia": "0001", "saldo": float(i % 5000), "limite_saque": 500.0,
+             "limite_saques_diarios": 3, "numero_saques": 0, "cliente_id": 1}
+            for i in range(contas_sql)
+        ])
+        session.commit()
+        session.close()
+        duracao, totais = cronometrar(extradb.aplicar_juros_e_tarifas, 0.01, 5.0, 100.0, Sessao)
+        engine.dispose()
+    print(f"extradb (SQLite, em massa),  {contas_sql:>10,} contas: {duracao:.3f}s "
+          f"({totais['Juros']:,} juros, {totais['Tarifa']:,} tarifas)")
+
+
+def bench_busca_nomes(operacoes, clientes_memoria=10_000_000, clientes_sql=1_000_000):
+    """
+    Busca de clientes por prefixo do nome: varredura completa vs. índice ordenado
+    (desafio4) e índice de nome normalizado (extradb em SQLite).
+    """
+    import collections
+    import gc
+    import random
+
+    import desafio4
+    import extradb
+    from sqlalchemy import insert
+
+    # Registros leves com os mesmos atributos usados pelo índice (nome, cpf)
+    ClienteLeve = collections.namedtuple("ClienteLeve", "nome cpf")
+    nomes = ["Ana", "Bruno", "Cecília", "Débora", "Érico", "Fábio", "Glória", "Hélio", "Íris", "João"]
+    sobrenomes = ["Silva", "Souza", "Araújo", "Gonçalves", "Conceição", "Ribeiro", "Almeida", "Simões"]
+    aleatorio = random.Random(42)
+
+    def nome_aleatorio(i):
+        return f"{aleatorio.choice(nomes)} {aleatorio.choice(sobrenomes)} {i}"
+
+    prefixos = [nome[:3] for nome in nomes] + [f"{nome} {sobrenome} 12" for nome in nomes for sobrenome in sobrenomes]
+
+    def cadastrar_um_a_um():
+        # Como no menu: um append por cliente
+        cadastro = desafio4.CadastroClientes()
+        for i in range(clientes_memoria):
+            cadastro.append(ClienteLeve(nome_aleatorio(i), str(i)))
+        return cadastro
+
+    duracao, cadastro = cronometrar(cadastrar_um_a_um)
+    print(f"desafio4: índice de {clientes_memoria:,} clientes cadastrados um a um em {duracao:.1f}s")
+    # Tira os milhões de objetos já carregados das coletas do GC, que senão dominariam a medição
+    gc.freeze()
+    varredura, _ = cronometrar(lambda: [
+        cliente for cliente in cadastro if desafio4.normalizar_nome(cliente.nome).startswith(prefixos[0])
+    ][:10])
+    indice, _ = cronometrar(lambda: [cadastro.buscar_por_prefixo(prefixos[i % len(prefixos)]) for i in range(operacoes)])
+    print(f"desafio4: varredura {varredura * 1000:,.0f} ms, índice {indice / operacoes * 1e6:,.1f} µs por busca")
+
+    def cadastrar_e_buscar(i):
+        inicio = time.perf_counter()
+        cadastro.append(ClienteLeve(nome_aleatorio(clientes_memoria + i), str(clientes_memoria + i)))
+        cadastro.buscar_por_prefixo(prefixos[i % len(prefixos)])
+        return time.perf_counter() - inicio
+
+    duracoes = [cadastrar_e_buscar(i) for i in range(operacoes)]
+    print(f"desafio4: cadastro seguido de busca {statistics.median(duracoes) * 1e6:,.1f} µs (mediana), "
+          f"pior {max(duracoes) * 1000:,.0f} ms")
+    del cadastro
+    gc.unfreeze()
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, _ = preparar_banco_extradb(diretorio, quantidade_contas=0)
+        session = Sessao()
+        for inicio in range(0, clientes_sql, 100_000):
+            session.execute(insert(extradb.Cliente), [
+                {"nome": nome_aleatorio(i), "cpf": str(i), "endereco": "Rua"}
+                for i in range(inicio, min(inicio + 100_000, clientes_sql))
+            ])
+        session.commit()
+        consultas = min(operacoes, 2000)
+        varredura, _ = cronometrar(lambda: session.query(extradb.Cliente.nome).filter(
+            extradb.Cliente.nome.like(f"{nomes[0][:3]}%")).order_by(extradb.Cliente.nome).limit(10).all())
+        indice, _ = cronometrar(lambda: [
+            extradb.buscar_clientes_por_prefixo(prefixos[i % len(prefixos)], session) for i in range(consultas)
+        ])
+        session.close()
+        engine.dispose()
+    print(f"extradb ({clientes_sql:,} clientes): LIKE sem índice {varredura * 1000:,.0f} ms, "
+          f"nome normalizado {indice / consultas * 1e6:,.1f} µs por busca")
+
+
+def bench_listagens(operacoes, quantidade_contas=1_000_000):
+    """
+    desafio4: listagem completa com um print() por conta vs. páginas em buffer único
+    e contagem sem percorrer as contas.
+    """
+    import desafio4
+    import lote
+
+    cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+    contas = desafio4.CadastroContas(desafio4.ContaCorrente(cliente, numero) for numero in range(1, quantidade_contas + 1))
+
+    def listar_tudo():
+        for conta in contas:
+            print(f"""
+Agência:\t{conta.agencia}
+C/C:\t\t{conta.numero}
+Cliente:\t{conta.cliente.nome}
+CPF:\t\t{conta.cliente.cpf}
+""")
+
+    tamanho = desafio4.TAMANHO_PAGINA
+    paginas = [f"lc;{tamanho};{i * tamanho % quantidade_contas}" for i in range(operacoes)]
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        completa, _ = cronometrar(listar_tudo)
+        resumo = lote.executar_lote({"lc": lambda: desafio4.listar_contas_flow(contas)}, paginas, nulo)
+        contagem, _ = cronometrar(len, contas)
+    paginas = resumo.duracao
+    print(f"{quantidade_contas:,} contas: listagem completa {completa:.2f}s, "
+          f"página de {desafio4.TAMANHO_PAGINA} {paginas / operacoes * 1e6:,.0f} µs, contagem {contagem * 1e6:.1f} µs")
+
+
+def bench_historico(operacoes, quantidade_contas=10_000, movimentos=1_000_000):
+    """
+    desafio4: histórico em memória (blocos compactados) vs. registros em arquivos
+    mapeados (heap Python, tamanho em disco e tempo de um extrato).
+    """
+    import desafio4
+    import historico_disco
+
+    cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+
+    def medir(armazenamento):
+        desafio4.armazenamento_historico = armazenamento
+        try:
+            tracemalloc.start()
+            contas = [desafio4.ContaCorrente(cliente, numero) for numero in range(1, quantidade_contas + 1)]
+            for i in range(movimentos):
+                contas[i % quantidade_contas].historico.registrar_movimento("Deposito" if i % 3 else "Saque", 10.0)
+            memoria = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            duracao, _ = cronometrar(lambda: [contas[i % quantidade_contas].historico.transacoes for i in range(operacoes)])
+        finally:
+            desafio4.armazenamento_historico = None
+        return memoria, duracao / operacoes
+
+    memoria_memoria, extrato_memoria = medir(None)
+    with tempfile.TemporaryDirectory() as diretorio:
+        with historico_disco.ArquivoHistorico(diretorio) as armazenamento:
+            memoria_disco, extrato_disco = medir(armazenamento)
+        tamanho_disco = sum(entrada.stat().st_size for entrada in os.scandir(diretorio))
+    print(f"{movimentos:,} movimentos em {quantidade_contas:,} contas")
+    print(f"Heap Python: memória {memoria_memoria / 2**20:,.1f} MB, disco {memoria_disco / 2**20:,.1f} MB "
+          f"(arquivos: {tamanho_disco / 2**20:,.1f} MB)")
+    print(f"Extrato ({movimentos // quantidade_contas} movimentos): memória {extrato_memoria * 1e6:,.1f} µs, "
+          f"disco {extrato_disco * 1e6:,.1f} µs")
+
+
+def bench_compactacao(operacoes, quantidade_contas=1000, movimentos=1_000_000, dias=365):
+    """
+    desafio4: histórico de um ano em listas de dicionários (formato anterior) vs.
+    blocos compactados (historico_compacto.py): heap Python, extrato completo e
+    extrato dos últimos 30 dias.
+    """
+    import random
+    import desafio4
+    import historico_compacto
+
+    aleatorio = random.Random(42)
+    fim = int(time.time())
+    inicio = fim - dias * 86400
+    tipos = ("Deposito", "Saque", "TransferenciaEnviada", "TransferenciaRecebida")
+    movimentacoes = [
+        (aleatorio.choice(tipos), aleatorio.choice((10.0, 50.0, 100.0, round(aleatorio.uniform(1, 5000), 2))),
+         inicio + i * (fim - inicio) // movimentos)
+        for i in range(movimentos)
+    ]
+
+    def em_listas():
+        historicos = [[] for _ in range(quantidade_contas)]
+        for i, (tipo, valor, data) in enumerate(movimentacoes):
+            historicos[i % quantidade_contas].append(
+                {"tipo": tipo, "valor": valor, "data": historico_compacto.formatar_data(data)}
+            )
+        return historicos
+
+    def compactado():
+        historicos = [desafio4.Historico() for _ in range(quantidade_contas)]
+        for i, (tipo, valor, data) in enumerate(movimentacoes):
+            historicos[i % quantidade_contas].registrar_movimento(tipo, valor, data)
+        return historicos
+
+    def medir_memoria(construir):
+        tracemalloc.start()
+        historicos = construir()
+        memoria = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return historicos, memoria
+
+    listas, memoria_listas = medir_memoria(em_listas)
+    del listas
+    historicos, memoria_compactada = medir_memoria(compactado)
+    completo, _ = cronometrar(lambda: [historicos[i % quantidade_contas].transacoes for i in range(operacoes)])
+    desde = datetime.datetime.fromtimestamp(fim - 30 * 86400)
+    recente, _ = cronometrar(lambda: [historicos[i % quantidade_contas].transacoes_entre(desde) for i in range(operacoes)])
+
+    print(f"{movimentos:,} movimentos de {dias} dias em {quantidade_contas:,} contas")
+    print(f"Heap Python: listas {memoria_listas / 2**20:,.1f} MB, compactado {memoria_compactada / 2**20:,.1f} MB "
+          f"({memoria_listas / memoria_compactada:.1f}x menor)")
+    print(f"Extrato compactado ({movimentos // quantidade_contas} movimentos): completo {completo / operacoes * 1000:,.2f} ms, "
+          f"últimos 30 dias {recente / operacoes * 1000:,.2f} ms")
+
+
+def bench_extratos(operacoes, movimentos=100_000, quantidade_contas=1000):
+    """
+    desafio4: extrato repetido com uma movimentação nova entre cada um, formatando
+    todo o histórico vs. só as transações novas (CacheExtratos), e remoção LRU.
+    """
+    import desafio4
+
+    cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+    conta = desafio4.ContaCorrente(cliente, 1)
+    for _ in range(movimentos):
+        conta.historico.registrar_movimento("Deposito", 10.0)
+
+    def extrato_completo():
+        return "".join(f"{t['data']} - {t['tipo']}: R$ {t['valor']:.2f}\n" for t in conta.historico.transacoes)
+
+    def repetir(renderizar):
+        for _ in range(operacoes):
+            conta.historico.registrar_movimento("Saque", 1.0)
+            renderizar()
+
+    repeticoes = max(1, operacoes // 100)
+    completo, _ = cronometrar(lambda: [extrato_completo() for _ in range(repeticoes)])
+    extratos = desafio4.CacheExtratos()
+    primeiro, _ = cronometrar(extratos.extrato, conta)
+    incremental, _ = cronometrar(repetir, lambda: extratos.extrato(conta))
+    print(f"Extrato de {movimentos:,} movimentos: completo {completo / repeticoes * 1000:,.2f} ms, "
+          f"primeiro com cache {primeiro * 1000:,.2f} ms, seguintes {incremental / operacoes * 1000:,.3f} ms")
+
+    contas = [desafio4.ContaCorrente(cliente, numero) for numero in range(2, quantidade_contas + 2)]
+    for outra in contas:
+        outra.historico.registrar_movimento("Deposito", 10.0)
+    limite = len(extratos.extrato(contas[0])) * quantidade_contas // 10
+    extratos = desafio4.CacheExtratos(limite)
+    for outra in contas:
+        extratos.extrato(outra)
+    print(f"Limite de {limite:,} caracteres: {len(extratos)} de {quantidade_contas} extratos mantidos")
+
+
+def bench_instantaneos(operacoes, quantidade_contas=100_000, produtores=2, relatorios=5):
+    """
+    desafio4: relatório de saldos de todas as contas com transferências em
+    andamento, sem coordenação, congelando as escritas (todas as contas
+    bloqueadas) e lendo de um instantâneo: duração do relatório, total
+    conferido e maior espera de uma transferência.
+    """
+    import random
+    import desafio4
+
+    cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+    contas = [desafio4.ContaCorrente(cliente, numero) for numero in range(1, quantidade_contas + 1)]
+    with silencioso():
+        for conta in contas:
+            desafio4.Deposito(100.0).registrar(conta)
+    total_esperado = 100.0 * quantidade_contas
+
+    def sem_coordenacao():
+        return sum(conta.saldo for conta in contas)
+
+    def congelando():
+        with desafio4.bloquear_contas(*contas):
+            return sum(conta.saldo for conta in contas)
+
+    def com_instantaneo():
+        with desafio4.versoes.instantaneo() as instantaneo:
+            return sum(instantaneo.saldos(contas).values())
+
+    for modo, relatorio in (("sem coordenação", sem_coordenacao), ("congelando", congelando), ("instantâneo", com_instantaneo)):
+        parar = threading.Event()
+        esperas = []
+
+        def produtor(semente):
+            aleatorio = random.Random(semente)
+            while not parar.is_set():
+                origem, destino = aleatorio.sample(contas, 2)
+                inicio = time.perf_counter()
+                desafio4.Transferencia(1.0, destino).registrar(origem)
+                esperas.append(time.perf_counter() - inicio)
+
+        with silencioso():
+            threads = [threading.Thread(target=produtor, args=(i,)) for i in range(produtores)]
+            for thread in threads:
+                thread.start()
+            duracoes, divergentes = [], 0
+            for _ in range(relatorios):
+                time.sleep(0.05)
+                duracao, total = cronometrar(relatorio)
+                duracoes.append(duracao)
+                divergentes += abs(total - total_esperado) > 0.005
+            parar.set()
+            for thread in threads:
+                thread.join()
+        print(f"{modo:>15}: relatório {statistics.median(duracoes) * 1000:,.0f} ms, {divergentes}/{relatorios} total(is) "
+              f"divergente(s) | {len(esperas):,} transferências, maior espera {max(esperas) * 1000:,.1f} ms")
+
+    tempo_abertura, instantaneo = cronometrar(desafio4.versoes.instantaneo)
+    instantaneo.fechar()
+    restantes = sum(len(conta._anteriores) for conta in contas)
+    print(f"Abrir um instantâneo: {tempo_abertura * 1e6:,.1f} µs | estados antigos restantes: {restantes}")
+
+
+def _iniciar_processo_contadores(contadores):
+    import desafio4
+    desafio4.contadores_compartilhados = contadores
+
+
+def _sacar_em_todas(quantidade_contas, tentativas):
+    # Processo de trabalho: recria as mesmas contas e tenta sacar de todas várias vezes
+    import desafio4
+
+    cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+    contas = [desafio4.ContaCorrente(cliente, numero) for numero in range(1, quantidade_contas + 1)]
+    with silencioso():
+        for conta in contas:
+            desafio4.Deposito(1000.0).registrar(conta)
+        inicio = time.perf_counter()
+        for _ in range(tentativas):
+            for conta in contas:
+                desafio4.Saque(1.0).registrar(conta)
+        duracao = time.perf_counter() - inicio
+    # Cada saque realizado tirou R$ 1,00
+    return round(sum(1000.0 - conta.saldo for conta in contas)), duracao
+
+
+def bench_contadores(operacoes, quantidade_contas=10_000, processos=4, tentativas=5):
+    """
+    desafio4 com vários processos atendendo as mesmas contas: saques realizados
+    com o limite diário contado em cada processo vs. em contadores
+    compartilhados (contadores_compartilhados.py), e custo por saque.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    import desafio4
+    from contadores_compartilhados import ContadoresCompartilhados
+
+    limite = desafio4.LIMITE_SAQUES * quantidade_contas
+    for modo in ("por processo", "compartilhados"):
+        contadores = ContadoresCompartilhados(quantidade_contas) if modo == "compartilhados" else None
+        try:
+            with ProcessPoolExecutor(processos, initializer=_iniciar_processo_contadores, initargs=(contadores,)) as executor:
+                resultados = list(executor.map(_sacar_em_todas, [quantidade_contas] * processos, [tentativas] * processos))
+        finally:
+            if contadores is not None:
+                contadores.fechar()
+        realizados = sum(realizados for realizados, _ in resultados)
+        tentados = processos * quantidade_contas * tentativas
+        por_saque = sum(duracao for _, duracao in resultados) / tentados
+        print(f"{modo:>14}: {realizados:,} saques realizados (limite {limite:,}) | {por_saque * 1e6:.1f} µs por tentativa")
+
+
+def bench_agencias(operacoes, produtores=16, agencias=(1, 2, 4)):
+    """
+    Depósitos de vários produtores (um commit por operação) com os clientes
+    distribuídos em 1, 2 ou 4 bancos (um por agência), com o tempo de CPU do
+    processo por depósito: quando ele é quase todo o tempo de parede, o limite
+    é o Python (GIL) e não a trava de escrita de cada banco.
+    """
+    import extradb
+
+    por_produtor = max(1, operacoes // produtores)
+    for quantidade in agencias:
+        with tempfile.TemporaryDirectory() as diretorio:
+            roteador = extradb.RoteadorAgencias.de_configuracao(",".join(
+                f"{agencia:04d}=sqlite:///{os.path.join(diretorio, f'agencia_{agencia:04d}.db')}"
+                for agencia in range(1, quantidade + 1)
+            ))
+            roteador.criar_tabelas()
+            cpfs = [str(i).zfill(11) for i in range(produtores)]
+            for cpf in cpfs:
+                session = roteador.session_do_cpf(cpf)
+                agencia = roteador.agencia_do_cpf(cpf)
+                session.add(extradb.ContaCorrente(
+                    numero=extradb.proximo_numero_conta(session, *roteador.numeracao(agencia)), agencia=agencia,
+                    limite_saque=500.00, limite_saques_diarios=3,
+                    cliente=extradb.Cliente(nome=f"Cliente {cpf}", cpf=cpf, endereco="Rua do Benchmark, 1"),
+                ))
+                session.commit()
+                session.close()
+
+            def produtor(indice):
+                for _ in range(por_produtor):
+                    session = roteador.session_do_cpf(cpfs[indice])
+                    conta = extradb.filtrar_cliente(cpfs[indice], session).contas[0]
+                    extradb.Deposito(1.0).registrar(conta, session)
+                    session.commit()
+                    session.close()
+
+            with silencioso():
+                cpu_inicial = time.process_time()
+                duracao = executar_produtores(produtores, produtor)
+                cpu = time.process_time() - cpu_inicial
+            for agencia in roteador.agencias:
+                roteador.session_factory(agencia).kw["bind"].dispose()
+        depositos = por_produtor * produtores
+        print(f"{quantidade} agência(s): {depositos / duracao:,.0f} depósitos/s | CPU {cpu / depositos * 1e6:,.0f} µs "
+              f"por depósito ({cpu / duracao:.0%} do tempo)")
+
+
+def bench_instrumentacao(operacoes):
+    """
+    Custo dos eventos de instrumentação: depósitos sem medição, com medição por
+    fluxo e com o log de consultas lentas ativo.
+    """
+    import extradb
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, (conta_id,) = preparar_banco_extradb(diretorio)
+
+        def depositos():
+            for _ in range(operacoes):
+                session = Sessao()
+                extradb.Deposito(1.0).registrar(session.get(extradb.ContaCorrente, conta_id), session)
+                session.commit()
+                session.close()
+
+        with silencioso():
+            sem_medicao, _ = cronometrar(depositos)
+            with extradb.medir_consultas("bench") as medicao:
+                com_medicao, _ = cronometrar(depositos)
+            extradb.INSTRUMENTAR_CONSULTAS = True
+            try:
+                com_log, _ = cronometrar(depositos)
+            finally:
+                extradb.INSTRUMENTAR_CONSULTAS = False
+        engine.dispose()
+    print(f"{medicao.quantidade / operacoes:.0f} consultas por depósito | sem medição {sem_medicao / operacoes * 1e6:,.0f} µs, "
+          f"com medição {com_medicao / operacoes * 1e6:,.0f} µs, com log de lentas {com_log / operacoes * 1e6:,.0f} µs")
+
+
+def bench_posicao_cliente(operacoes, contas_por_cliente=(1, 100, 10_000)):
+    """
+    Posição de um cliente: somar o saldo de todas as contas vs. ler os agregados
+    mantidos a cada movimentação (desafio4 em memória e extradb em SQLite).
+    """
+    import desafio4
+    import extradb
+
+    for quantidade in contas_por_cliente:
+        cliente = desafio4.PessoaFisica("Cliente", "01-01-1990", "0", "Rua")
+        for numero in range(1, quantidade + 1):
+            conta = desafio4.ContaCorrente(cliente, numero)
+            cliente.adicionar_conta(conta)
+            conta._ajustar_saldo(10.0)
+        somando, _ = cronometrar(lambda: [sum(conta.saldo for conta in cliente.contas) for _ in range(operacoes)])
+        agregado, _ = cronometrar(lambda: [cliente.saldo_total for _ in range(operacoes)])
+
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=1)
+            session = Sessao()
+            cliente_db = session.get(extradb.ContaCorrente, ids[0]).cliente
+            session.add_all(
+                extradb.ContaCorrente(numero=str(numero).zfill(6), agencia="0001", saldo=10.0, limite_saque=500.00,
+                                      limite_saques_diarios=3, cliente=cliente_db)
+                for numero in range(2, quantidade + 1)
+            )
+            session.commit()
+            cpf = cliente_db.cpf
+            session.close()
+            consultas = max(1, operacoes // 10)
+
+            def pelas_contas():
+                session = Sessao()
+                total = sum(conta.saldo for conta in extradb.filtrar_cliente(cpf, session).contas)
+                session.close()
+                return total
+
+            def pela_coluna():
+                session = Sessao()
+                total = extradb.filtrar_cliente(cpf, session).saldo_total
+                session.close()
+                return total
+
+            somando_db, _ = cronometrar(lambda: [pelas_contas() for _ in range(consultas)])
+            agregado_db, _ = cronometrar(lambda: [pela_coluna() for _ in range(consultas)])
+            engine.dispose()
+        print(f"{quantidade:>6,} conta(s): desafio4 soma {somando / operacoes * 1e6:,.2f} µs vs agregado "
+              f"{agregado / operacoes * 1e6:,.3f} µs | extradb soma {somando_db / consultas * 1000:,.2f} ms vs coluna "
+              f"{agregado_db / consultas * 1000:,.2f} ms")
+
+
+def bench_admissao(operacoes, clientes_normais=4, abusivos=10):
+    """
+    Latência dos clientes bem-comportados enquanto um CPF é martelado por várias
+    threads, sem e com controle de admissão (balde de tokens por CPF + limite global).
+    """
+    import admissao
+    import extradb
+
+    por_cliente = max(1, operacoes // clientes_normais)
+    for modo in ("sem admissão", "com admissão"):
+        with tempfile.TemporaryDirectory() as diretorio:
+            engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=clientes_normais + 1)
+            controle = admissao.ControleAdmissao(
+                taxa_por_cpf=50, rajada_por_cpf=10, maximo_em_andamento=4, espera_maxima_s=0.05
+            ) if modo == "com admissão" else None
+            latencias = []
+            recusadas = [0]
+            parar = threading.Event()
+
+            def operar(indice):
+                cpf = str(indice).zfill(11)
+                codigo = controle.admitir(cpf) if controle else admissao.ADMITIDA
+                if codigo != admissao.ADMITIDA:
+                    recusadas[0] += 1
+                    return False
+                session = Sessao()
+                try:
+                    extradb.Deposito(1.0).registrar(session.get(extradb.ContaCorrente, ids[indice]), session)
+                    session.commit()
+                finally:
+                    session.close()
+                    if controle:
+                        controle.liberar()
+                return True
+
+            def produtor(indice):
+                if indice < clientes_normais:
+                    for _ in range(por_cliente):
+                        inicio = time.perf_counter()
+                        operar(indice)
+                        latencias.append(time.perf_counter() - inicio)
+                        time.sleep(0.005)
+                else:
+                    # Integração com defeito: repete sem pausa (1 ms entre recusas) até o fim da medição
+                    while not parar.is_set():
+                        if not operar(clientes_normais):
+                            time.sleep(0.001)
+
+            abusadores = [threading.Thread(target=produtor, args=(clientes_normais + i,)) for i in range(abusivos)]
+            with silencioso():
+                for thread in abusadores:
+                    thread.start()
+                duracao = executar_produtores(clientes_normais, produtor)
+                parar.set()
+                for thread in abusadores:
+                    thread.join()
+            engine.dispose()
+        print(f"{modo:>12}: clientes normais p50 {statistics.median(latencias) * 1000:.1f} ms, "
+              f"p99 {percentil(latencias, 99) * 1000:.1f} ms | {recusadas[0]:,} requisição(ões) recusada(s) em {duracao:.1f}s")
+
+
+def bench_agendador(operacoes, quantidade_contas=20_000, saques_por_relatorio=50, intervalo_s=0.005):
+    """
+    Latência dos saques (da chegada ao commit) num fluxo de operações em que, a
+    cada `saques_por_relatorio` saques, chega uma listagem completa de contas:
+    tudo no mesmo laço ou com as listagens no agendador (agendador.py).
+    """
+    from sqlalchemy import update
+    import agendador
+    import extradb
+
+    with tempfile.TemporaryDirectory() as diretorio:
+        engine, Sessao, ids = preparar_banco_extradb(diretorio, quantidade_contas=quantidade_contas, saldo_inicial=1e9)
+        session = Sessao()
+        session.execute(update(extradb.ContaCorrente).values(limite_saques_diarios=10**9))
+        session.commit()
+        session.close()
+        roteador_original = extradb.roteador
+        extradb.roteador = extradb.RoteadorAgencias({"0001": Sessao})
+
+        for modo in ("no mesmo laço", "com agendador"):
+            fila = agendador.Agendador(relatorios_simultaneos=2) if modo == "com agendador" else None
+            prioridade = fila.operacao_interativa if fila else contextlib.nullcontext
+            latencias = []
+            relatorios = 0
+            with silencioso():
+                inicio = time.perf_counter()
+                for indice in range(operacoes):
+                    chegada = inicio + indice * intervalo_s
+                    espera = chegada - time.perf_counter()
+                    if espera > 0:
+                        time.sleep(espera)
+                    if indice % saques_por_relatorio == 0:
+                        relatorios += 1
+                        if fila:
+                            fila.submeter_relatorio("Listagem de contas", extradb.blocos_listagem_contas())
+                        else:
+                            "".join(extradb.blocos_listagem_contas())
+                    with prioridade():
+                        session = Sessao()
+                        extradb.Saque(1.0).registrar(session.get(extradb.ContaCorrente, ids[indice % len(ids)]), session)
+                        session.commit()
+                        session.close()
+                    latencias.append(time.perf_counter() - chegada)
+                if fila:
+                    fila.encerrar()
+            duracao = time.perf_counter() - inicio
+            print(f"{modo:>14}: saques p50 {statistics.median(latencias) * 1000:.1f} ms, "
+                  f"p99 {percentil(latencias, 99) * 1000:.1f} ms | {relatorios} listagem(ns) de "
+                  f"{quantidade_contas:,} contas em {duracao:.1f}s")
+
+        extradb.roteador = roteador_original
+        engine.dispose()
+
+
+BENCHMARKS = {
+    "sqlite": bench_sqlite_pragmas,
+    "async": bench_async_concorrencia,
+    "arquivo": bench_arquivamento,
+    "grupo": bench_escrita_em_grupo,
+    "projecao": bench_projecao_leitura,
+    "comandos": bench_comandos_preconstruidos,
+    "tabela": bench_tabela_contas,
+    "fechamento": bench_fechamento_diario,
+    "lote": bench_lote,
+    "reconstrucao": bench_reconstrucao,
+    "transferencias": bench_transferencias,
+    "juros": bench_juros_tarifas,
+    "busca": bench_busca_nomes,
+    "listagens": bench_listagens,
+    "historico": bench_historico,
+    "compactacao": bench_compactacao,
+    "extratos": bench_extratos,
+    "instantaneos": bench_instantaneos,
+    "agencias": bench_agencias,
+    "contadores": bench_contadores,
+    "instrumentacao": bench_instrumentacao,
+    "posicao": bench_posicao_cliente,
+    "admissao": bench_admissao,
+    "agendador": bench_agendador,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do sistema bancário")
+    parser.add_argument("nome", choices=sorted(BENCHMARKS))
+    parser.add_argument("--operacoes", type=int, default=2000)
+    argumentos = parser.parse_args()
+    BENCHMARKS[argumentos.nome](argumentos.operacoes)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Contadores diários compartilhados entre processos.
+
+Uma tabela de inteiros de 32 bits em multiprocessing.shared_memory, com uma
+coluna por contador ("numero_saques", "numero_transacoes") e uma linha por
+posição de conta (número da conta - 1). Todos os processos que recebem a
+tabela enxergam os mesmos contadores, de modo que um limite diário vale para
+o cliente, e não para cada processo, sem nenhuma consulta ao banco.
+
+Conferir e incrementar um contador é uma operação atômica: cada linha é
+protegida por um de `listras` locks de multiprocessing (posição % listras),
+o que mantém a disputa baixa sem precisar de um lock por conta. A tabela é
+entregue aos processos de trabalho na criação deles (argumento de Process ou
+`initargs` de um Pool/ProcessPoolExecutor), que é quando os locks podem ser
+transferidos.
+
+Os programas de menu (desafio3.py, desafio4.py) rodam em um único processo e
+não criam a tabela: ela é usada como biblioteca, por quem distribui as contas
+entre processos de trabalho (veja `python benchmark.py contadores`).
+
+Só o processo que criou a tabela a remove do sistema em fechar(); um processo
+filho obtido por fork herda o objeto, mas não a posse.
+
+Uso:
+    contadores = ContadoresCompartilhados(capacidade=100_000)
+    with ProcessPoolExecutor(initializer=iniciar, initargs=(contadores,)) as executor:
+        ...
+    contadores.fechar()
+"""
+import multiprocessing
+import os
+from multiprocessing import shared_memory
+
+CAMPOS = ("numero_saques", "numero_transacoes")
+LISTRAS = 64
+
+
+class ContadoresCompartilhados:
+    def __init__(self, capacidade, campos=CAMPOS, listras=LISTRAS):
+        self.capacidade = capacidade
+        self.campos = tuple(campos)
+        tamanho = max(1, capacidade * len(self.campos) * 4)
+        self._memoria = shared_memory.SharedMemory(create=True, size=tamanho)
+        self._locks = [multiprocessing.Lock() for _ in range(listras)]
+        self._pid_dono = os.getpid()
+        self._mapear()
+
+    def _mapear(self):
+        self._valores = self._memoria.buf.cast("i")
+        self._colunas = {
+            campo: self._valores[indice * self.capacidade:(indice + 1) * self.capacidade]
+            for indice, campo in enumerate(self.campos)
+        }
+
+    def __getstate__(self):
+        return {
+            "nome": self._memoria.name, "capacidade": self.capacidade,
+            "campos": self.campos, "locks": self._locks,
+        }
+
+    def __setstate__(self, estado):
+        self.capacidade = estado["capacidade"]
+        self.campos = estado["campos"]
+        self._locks = estado["locks"]
+        self._memoria = shared_memory.SharedMemory(name=estado["nome"])
+        self._pid_dono = None
+        self._mapear()
+
+    def coluna(self, campo):
+        """
+        Visão (memoryview de inteiros) da coluna do contador, indexada pela posição da conta.
+        """
+        return self._colunas[campo]
+
+    def valor(self, posicao, campo):
+        return self._colunas[campo][posicao]
+
+    def incrementar_se_abaixo(self, posicao, campo, limite):
+        """
+        Incrementa o contador se ele estiver abaixo de `limite`, de forma atômica
+        entre os processos. Retorna o valor anterior, ou None se o limite já foi atingido.
+        """
+        coluna = self._colunas[campo]
+        with self._locks[posicao % len(self._locks)]:
+            valor = coluna[posicao]
+            if valor >= limite:
+                return None
+            coluna[posicao] = valor + 1
+        return valor
+
+    def decrementar(self, posicao, campo):
+        # Devolve uma reserva de incrementar_se_abaixo cuja operação não se concretizou
+        coluna = self._colunas[campo]
+        with self._locks[posicao % len(self._locks)]:
+            coluna[posicao] -= 1
+
+    def zerar(self, posicao=None):
+        """
+        Zera os contadores da conta na `posicao` ou, sem ela, de todas as contas.
+        """
+        if posicao is not None:
+            with self._locks[posicao % len(self._locks)]:
+                for coluna in self._colunas.values():
+                    coluna[posicao] = 0
+            return
+        for lock in self._locks:
+            lock.acquire()
+        try:
+            self._memoria.buf[:] = bytes(len(self._memoria.buf))
+        finally:
+            for lock in reversed(self._locks):
+                lock.release()
+
+    def fechar(self):
+        """
+        Desfaz o mapeamento neste processo; no processo que criou a tabela (e não
+        em filhos obtidos por fork), também a remove do sistema. As colunas obtidas com coluna() deixam de ser válidas.
+        """
+        for coluna in self._colunas.values():
+            coluna.release()
+        self._valores.release()
+        self._memoria.close()
+        if os.getpid() == self._pid_dono:
+            self._memoria.unlink()
@@ -1,5 +1,7 @@
 import datetime
 
+from lote import executar_lote_de_arquivo, ler_argumento_lote
+
 menu = """
 
 [d] Depositar
@@ -9,24 +11,24 @@ menu = """
 
 => """
 
-saldo = 0
-limite = 500
-extrato = ""
-numero_saques = 0
 LIMITE_SAQUES = 3
-numero_transacoes = 0
 LIMITE_TRANSACOES = 10
 
-while True:
-    opcao = input(menu)
+def main(arquivo_lote=None):
+    saldo = 0
+    limite = 500
+    extrato = ""
+    numero_saques = 0
+    numero_transacoes = 0
 
-    if opcao == "d":
+    def depositar():
+        nonlocal saldo, extrato, numero_transacoes
         if numero_transacoes >= LIMITE_TRANSACOES:
             print("Operação falhou! Você excedeu o número máximo de transações diárias.")
-            continue
-        
+            return False
+
         valor = float(input("Informe o valor do depósito: "))
-        
+
         if valor > 0:
             saldo += valor
             data_hora = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
@@ -35,11 +37,13 @@ while True:
             print("Depósito realizado com sucesso!")
         else:
             print("Operação falhou! O valor informado é inválido.")
+            return False
 
-    elif opcao == "s":
+    def sacar():
+        nonlocal saldo, extrato, numero_saques, numero_transacoes
         if numero_transacoes >= LIMITE_TRANSACOES:
             print("Operação falhou! Você excedeu o número máximo de transações diárias.")
-            continue
+            return False
 
         valor = float(input("Informe o valor do saque: "))
 
@@ -49,10 +53,13 @@ while True:
 
         if excedeu_saldo:
             print("Operação falhou! Você não tem saldo suficiente.")
+            return False
         elif excedeu_limite:
             print("Operação falhou! O valor do saque excede o limite.")
+            return False
         elif excedeu_saques:
             print("Operação falhou! Número máximo de saques diários excedido.")
+            return False
         elif valor > 0:
             saldo -= valor
             data_hora = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
@@ -62,15 +69,35 @@ while True:
             print("Saque realizado com sucesso!")
         else:
             print("Operação falhou! O valor informado é inválido.")
-    
-    elif opcao == "e":
+            return False
+
+    def exibir_extrato():
         print("\n=============== EXTRATO ===============")
         print("Não foram realizadas movimentações." if not extrato else extrato)
         print(f"\nSaldo: R$ {saldo:.2f}")
         print("=======================================")
 
-    elif opcao == "q":
-        break
-    
-    else:
-        print("Operação inválida, por favor selecione novamente a operação desejada.")
\ No newline at end of file
+    opcoes_menu = {
+        "d": depositar,
+        "s": sacar,
+        "e": exibir_extrato,
+    }
+
+    if arquivo_lote:
+        executar_lote_de_arquivo(opcoes_menu, arquivo_lote)
+        return
+
+    while True:
+        opcao = input(menu)
+
+        if opcao == "q":
+            break
+
+        acao = opcoes_menu.get(opcao)
+        if acao:
+            acao()
+        else:
+            print("Operação inválida, por favor selecione novamente a operação desejada.")
+
+if __name__ == "__main__":
+    main(ler_argumento_lote())
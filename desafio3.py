@@ -1,4 +1,13 @@
 import datetime
+from array import array
+from bisect import bisect_left
+
+from lote import executar_lote_de_arquivo, ler_argumento_lote
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional: sem ele os juros e tarifas são calculados em Python puro
+    np = None
 
 # Constantes globais
 AGENCIA = "0001"
@@ -70,7 +79,7 @@ def cadastrar_usuario(usuarios):
 
     if usuario_existente:
         print("\n@@@ Já existe um usuário com este CPF! @@@")
-        return
+        return False
 
     nome = input("Informe o nome completo: ")
     data_nascimento = input("Informe a data de nascimento (dd-mm-aaaa): ")
@@ -109,6 +118,198 @@ def criar_conta_corrente(agencia, numero_conta, usuarios):
         "numero_transacoes": 0
     }
 
+class TabelaContas:
+    """
+    Tabela colunar (struct-of-arrays) das contas.
+    Cada campo numérico fica em um array tipado, na posição numero_conta - 1,
+    de modo que a busca por (cpf, numero_conta) é um acesso direto ao array
+    seguido da conferência do CPF, sem percorrer a lista de contas.
+    Com `contadores` (ContadoresCompartilhados), os contadores diários ficam
+    em memória compartilhada e os limites valem para todos os processos que
+    atendem as mesmas contas.
+    """
+    def __init__(self, contadores=None):
+        self.agencia = []
+        self.cpf = []
+        self.extrato = []
+        self.saldo = array("d")
+        self.limite = array("d")
+        self.contadores = contadores
+        if contadores is not None:
+            self.numero_saques = contadores.coluna("numero_saques")
+            self.numero_transacoes = contadores.coluna("numero_transacoes")
+        else:
+            self.numero_saques = array("i")
+            self.numero_transacoes = array("i")
+        self.saldo_fechamento = array("d")
+        # Lançamentos em bloco (juros/tarifas): (data_hora, tipo, posições, valores). Os
+        # índices em lancamentos_aplicados contam desde o primeiro bloco, inclusive os já
+        # descartados (aplicados a todas as contas)
+        self.lancamentos = []
+        self.lancamentos_descartados = 0
+        self.lancamentos_aplicados = array("i")
+
+    def __len__(self):
+        return len(self.saldo)
+
+    def __iter__(self):
+        for posicao in range(len(self)):
+            yield self.linha(posicao)
+
+    def adicionar(self, conta):
+        """
+        Acrescenta uma conta (no formato retornado por criar_conta_corrente).
+        Os números de conta são sequenciais a partir de 1.
+        """
+        if conta["numero_conta"] != len(self) + 1:
+            raise ValueError("O número da conta deve ser o próximo da sequência.")
+        if self.contadores is not None and len(self) >= self.contadores.capacidade:
+            raise ValueError("A tabela de contadores compartilhados está cheia.")
+        self.agencia.append(conta["agencia"])
+        self.cpf.append(conta["cpf"])
+        self.extrato.append(conta["extrato"])
+        self.saldo.append(conta["saldo"])
+        self.limite.append(conta["limite"])
+        # Os contadores compartilhados já têm a posição, possivelmente usada por outro processo
+        if self.contadores is None:
+            self.numero_saques.append(conta["numero_saques"])
+            self.numero_transacoes.append(conta["numero_transacoes"])
+        self.lancamentos_aplicados.append(self.lancamentos_descartados + len(self.lancamentos))
+        return len(self) - 1
+
+    def posicao(self, cpf, num_conta):
+        """
+        Retorna a posição da conta nos arrays, ou None se ela não existir para o CPF.
+        """
+        posicao = num_conta - 1
+        if 0 <= posicao < len(self) and self.cpf[posicao] == cpf:
+            return posicao
+        return None
+
+    def linha(self, posicao):
+        self.materializar_lancamentos(posicao)
+        return {
+            "agencia": self.agencia[posicao],
+            "numero_conta": posicao + 1,
+            "cpf": self.cpf[posicao],
+            "saldo": self.saldo[posicao],
+            "limite": self.limite[posicao],
+            "extrato": self.extrato[posicao],
+            "numero_saques": self.numero_saques[posicao],
+            "numero_transacoes": self.numero_transacoes[posicao]
+        }
+
+    def saldo_total(self):
+        return sum(self.saldo)
+
+    def reservar(self, campo, posicao, limite):
+        """
+        Confere e incrementa o contador diário `campo` ("numero_saques" ou
+        "numero_transacoes") da conta, se ele estiver abaixo de `limite`.
+        Retorna o valor anterior, ou None se o limite já foi atingido.
+        """
+        if self.contadores is not None:
+            return self.contadores.incrementar_se_abaixo(posicao, campo, limite)
+        contador = getattr(self, campo)
+        valor = contador[posicao]
+        if valor >= limite:
+            return None
+        contador[posicao] = valor + 1
+        return valor
+
+    def devolver(self, campo, posicao):
+        # Desfaz uma reserva cuja operação foi recusada
+        if self.contadores is not None:
+            self.contadores.decrementar(posicao, campo)
+        else:
+            getattr(self, campo)[posicao] -= 1
+
+    def aplicar_juros_e_tarifas(self, taxa_juros, tarifa, saldo_minimo_isencao):
+        """
+        Credita juros (taxa_juros sobre os saldos positivos) e debita a tarifa das
+        contas com saldo abaixo de saldo_minimo_isencao, em todas as contas de uma vez.
+        Contas com saldo menor que a tarifa não são cobradas: o saldo nunca fica negativo.
+        Com NumPy, o cálculo é feito sobre a própria coluna de saldos, sem cópia.
+        Os lançamentos são guardados em bloco e entram no extrato de cada conta
+        quando ela é usada (veja materializar_lancamentos).
+        Retorna (quantidade de créditos de juros, quantidade de tarifas).
+        """
+        data_hora = datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
+        if np is not None:
+            saldo = np.frombuffer(self.saldo, dtype=np.float64)
+            juros = np.round(np.where(saldo > 0, saldo * taxa_juros, 0.0), 2)
+            cobrar = (saldo < saldo_minimo_isencao) & (saldo >= tarifa)
+            posicoes_juros = np.flatnonzero(juros > 0)
+            valores_juros = array("d", juros[posicoes_juros].tobytes())
+            posicoes_juros = array("i", posicoes_juros.astype(np.int32).tobytes())
+            posicoes_tarifa = array("i", np.flatnonzero(cobrar).astype(np.int32).tobytes())
+            saldo += juros
+            saldo -= cobrar * tarifa
+            del saldo  # libera o buffer: o array de saldos volta a poder crescer
+        else:
+            posicoes_juros, valores_juros, posicoes_tarifa = array("i"), array("d"), array("i")
+            for posicao, saldo in enumerate(self.saldo):
+                juros = round(saldo * taxa_juros, 2) if saldo > 0 else 0.0
+                if juros > 0:
+                    posicoes_juros.append(posicao)
+                    valores_juros.append(juros)
+                if tarifa <= saldo < saldo_minimo_isencao:
+                    posicoes_tarifa.append(posicao)
+                    juros -= tarifa
+                self.saldo[posicao] = saldo + juros
+
+        self.descartar_lancamentos_aplicados()
+        if posicoes_juros:
+            self.lancamentos.append((data_hora, "Juros", posicoes_juros, valores_juros))
+        if posicoes_tarifa:
+            self.lancamentos.append((data_hora, "Tarifa", posicoes_tarifa, tarifa))
+        return len(posicoes_juros), len(posicoes_tarifa)
+
+    def materializar_lancamentos(self, posicao):
+        """
+        Acrescenta ao extrato da conta os lançamentos em bloco ainda não aplicados a ela.
+        As posições de cada bloco estão em ordem crescente (busca binária); o valor
+        é um array paralelo às posições ou um único valor para todas.
+        """
+        pendentes = self.lancamentos[self.lancamentos_aplicados[posicao] - self.lancamentos_descartados:]
+        for data_hora, tipo, posicoes, valores in pendentes:
+            indice = bisect_left(posicoes, posicao)
+            if indice < len(posicoes) and posicoes[indice] == posicao:
+                valor = valores[indice] if isinstance(valores, array) else valores
+                self.extrato[posicao] += f"{data_hora} - {tipo}: R$ {valor:.2f}\n"
+        self.lancamentos_aplicados[posicao] = self.lancamentos_descartados + len(self.lancamentos)
+
+    def descartar_lancamentos_aplicados(self):
+        """
+        Descarta os blocos de lançamentos que todas as contas já aplicaram.
+        Retorna a quantidade de blocos descartados.
+        """
+        if not self.lancamentos or not len(self):
+            return 0
+        if np is not None:
+            aplicados = int(np.frombuffer(self.lancamentos_aplicados, dtype=np.int32).min())
+        else:
+            aplicados = min(self.lancamentos_aplicados)
+        descartar = aplicados - self.lancamentos_descartados
+        del self.lancamentos[:descartar]
+        self.lancamentos_descartados = aplicados
+        return descartar
+
+    def fechamento_diario(self):
+        """
+        Fechamento do dia: registra o saldo de fechamento de todas as contas e
+        zera os contadores diários. Cada coluna é copiada/zerada de uma vez,
+        sem percorrer as contas em Python.
+        """
+        quantidade = len(self)
+        self.saldo_fechamento = array("d", self.saldo)
+        if self.contadores is not None:
+            self.contadores.zerar()
+            return quantidade
+        self.numero_saques[:] = array("i", bytes(self.numero_saques.itemsize * quantidade))
+        self.numero_transacoes[:] = array("i", bytes(self.numero_transacoes.itemsize * quantidade))
+        return quantidade
+
 def filtrar_usuario(usuarios, cpf):
     """
     Função auxiliar para buscar um usuário por CPF.
@@ -120,10 +321,9 @@ def filtrar_usuario(usuarios, cpf):
 def filtrar_conta(contas, cpf, num_conta):
     """
     Função auxiliar para buscar uma conta por CPF e número da conta.
-    Retorna a conta se encontrada, caso contrário, retorna None.
+    Retorna a posição da conta na tabela se encontrada, caso contrário, retorna None.
     """
-    contas_filtradas = [conta for conta in contas if conta["cpf"] == cpf and conta["numero_conta"] == num_conta]
-    return contas_filtradas[0] if contas_filtradas else None
+    return contas.posicao(cpf, num_conta)
 
 def listar_contas(contas):
     """
@@ -155,13 +355,131 @@ def listar_usuarios(usuarios):
         for chave, valor in usuario.items():
             print(f"{chave.capitalize()}:\t{valor}")
 
-def main():
+def operacao_deposito(contas):
+    """
+    Solicita CPF, número da conta e valor, e realiza o depósito.
+    """
+    cpf = input("Informe o CPF do usuário: ")
+    num_conta = int(input("Informe o número da conta: "))
+    conta = filtrar_conta(contas, cpf, num_conta)
+
+    if conta is None:
+        print("Conta não encontrada ou dados incorretos.")
+        return False
+    contas.materializar_lancamentos(conta)
+
+    # Verifica o limite de transações diárias antes de prosseguir
+    if contas.numero_transacoes[conta] >= LIMITE_TRANSACOES:
+        print("Operação falhou! Você excedeu o número máximo de transações diárias.")
+        return False
+
+    valor = float(input("Informe o valor do depósito: "))
+    # Confere o limite de novo, já contando a transação: outro processo pode ter usado a última
+    if contas.reservar("numero_transacoes", conta, LIMITE_TRANSACOES) is None:
+        print("Operação falhou! Você excedeu o número máximo de transações diárias.")
+        return False
+    contas.saldo[conta], contas.extrato[conta] = depositar(cpf, num_conta, contas.saldo[conta], valor, contas.extrato[conta])
+    if valor <= 0:
+        # Recusado por depositar()
+        return False
+
+def operacao_saque(contas):
+    """
+    Solicita CPF, número da conta e valor, e realiza o saque.
+    """
+    cpf = input("Informe o CPF do usuário: ")
+    num_conta = int(input("Informe o número da conta: "))
+    conta = filtrar_conta(contas, cpf, num_conta)
+
+    if conta is None:
+        print("Conta não encontrada ou dados incorretos.")
+        return False
+    contas.materializar_lancamentos(conta)
+
+    # Verifica o limite de transações diárias antes de prosseguir
+    if contas.numero_transacoes[conta] >= LIMITE_TRANSACOES:
+        print("Operação falhou! Você excedeu o número máximo de transações diárias.")
+        return False
+
+    valor = float(input("Informe o valor do saque: "))
+    # Confere o limite de novo, já contando a transação: outro processo pode ter usado a última
+    if contas.reservar("numero_transacoes", conta, LIMITE_TRANSACOES) is None:
+        print("Operação falhou! Você excedeu o número máximo de transações diárias.")
+        return False
+
+    # O saque é reservado antes de ser feito e devolvido se for recusado
+    numero_saques = contas.reservar("numero_saques", conta, LIMITE_SAQUES)
+    contas.saldo[conta], contas.extrato[conta], numero_saques_depois = sacar(
+        cpf=cpf,
+        num_conta=num_conta,
+        saldo=contas.saldo[conta],
+        valor=valor,
+        extrato=contas.extrato[conta],
+        limite=contas.limite[conta],
+        numero_saques=LIMITE_SAQUES if numero_saques is None else numero_saques,
+        limite_saques=LIMITE_SAQUES
+    )
+    if numero_saques is None:
+        return False
+    if numero_saques_depois == numero_saques:
+        # Recusado por sacar(): a reserva volta para a conta
+        contas.devolver("numero_saques", conta)
+        return False
+
+def operacao_extrato(contas):
+    """
+    Solicita CPF e número da conta e exibe o extrato.
+    """
+    cpf = input("Informe o CPF do usuário: ")
+    num_conta = int(input("Informe o número da conta: "))
+    conta = filtrar_conta(contas, cpf, num_conta)
+
+    if conta is None:
+        print("Conta não encontrada ou dados incorretos.")
+        return False
+    contas.materializar_lancamentos(conta)
+
+    exibir_extrato(cpf, num_conta, contas.saldo[conta], extrato=contas.extrato[conta])
+
+def operacao_nova_conta(usuarios, contas):
+    """
+    Cria uma nova conta com o próximo número da sequência.
+    """
+    nova_conta = criar_conta_corrente(AGENCIA, len(contas) + 1, usuarios)
+    if not nova_conta:
+        return False
+    contas.adicionar(nova_conta)
+
+def operacao_fechamento_diario(contas):
+    """
+    Registra os saldos de fechamento e zera os contadores diários.
+    """
+    quantidade = contas.fechamento_diario()
+    print(f"Fechamento diário concluído para {quantidade} conta(s).")
+
+def operacao_juros_e_tarifas(contas):
+    """
+    Solicita a taxa de juros, a tarifa e o saldo mínimo para isenção e aplica
+    os lançamentos em todas as contas.
+    """
+    taxa_juros = float(input("Informe a taxa de juros do período (%): ")) / 100
+    tarifa = float(input("Informe o valor da tarifa: "))
+    saldo_minimo_isencao = float(input("Informe o saldo mínimo para isenção da tarifa: "))
+
+    if taxa_juros < 0 or tarifa < 0:
+        print("Operação falhou! Os valores informados são inválidos.")
+        return False
+
+    quantidade_juros, quantidade_tarifas = contas.aplicar_juros_e_tarifas(taxa_juros, tarifa, saldo_minimo_isencao)
+    print(f"Juros creditados em {quantidade_juros} conta(s); tarifa debitada de {quantidade_tarifas} conta(s).")
+
+def main(arquivo_lote=None):
     """
     Função principal que gerencia o fluxo do programa.
+    Com `arquivo_lote`, executa as operações do arquivo sem prompts (veja lote.py).
     """
     usuarios = []
-    contas = []
-    numero_conta = 1
+    contas = TabelaContas()
 
     menu = """
     [d] Depositar
@@ -171,97 +489,40 @@ def main():
     [nc] Nova conta
     [lc] Listar contas
     [lu] Listar usuários
+    [fd] Fechamento diário
+    [jt] Juros e tarifas
     [q] Sair
     => """
 
+    opcoes_menu = {
+        "d": lambda: operacao_deposito(contas),
+        "s": lambda: operacao_saque(contas),
+        "e": lambda: operacao_extrato(contas),
+        "nu": lambda: cadastrar_usuario(usuarios),
+        "nc": lambda: operacao_nova_conta(usuarios, contas),
+        "lc": lambda: listar_contas(contas),
+        "lu": lambda: listar_usuarios(usuarios),
+        "fd": lambda: operacao_fechamento_diario(contas),
+        "jt": lambda: operacao_juros_e_tarifas(contas),
+    }
+
+    if arquivo_lote:
+        executar_lote_de_arquivo(opcoes_menu, arquivo_lote)
+        return
+
     while True:
         opcao = input(menu)
 
-        if opcao == "d":
-            # Solicita CPF e número da conta para realizar o depósito
-            cpf = input("Informe o CPF do usuário: ")
-            num_conta = int(input("Informe o número da conta: "))
-            conta = filtrar_conta(contas, cpf, num_conta)
-
-            if not conta:
-                print("Conta não encontrada ou dados incorretos.")
-                continue
-
-            # Verifica o limite de transações diárias antes de prosseguir
-            if conta["numero_transacoes"] >= LIMITE_TRANSACOES:
-                print("Operação falhou! Você excedeu o número máximo de transações diárias.")
-                continue
-
-            valor = float(input("Informe o valor do depósito: "))
-            conta["saldo"], conta["extrato"] = depositar(cpf, num_conta, conta["saldo"], valor, conta["extrato"])
-            conta["numero_transacoes"] += 1
-
-        elif opcao == "s":
-            # Solicita CPF e número da conta para realizar o saque
-            cpf = input("Informe o CPF do usuário: ")
-            num_conta = int(input("Informe o número da conta: "))
-            conta = filtrar_conta(contas, cpf, num_conta)
-
-            if not conta:
-                print("Conta não encontrada ou dados incorretos.")
-                continue
-
-            # Verifica o limite de transações diárias antes de prosseguir
-            if conta["numero_transacoes"] >= LIMITE_TRANSACOES:
-                print("Operação falhou! Você excedeu o número máximo de transações diárias.")
-                continue
-
-            valor = float(input("Informe o valor do saque: "))
-            conta["saldo"], conta["extrato"], conta["numero_saques"] = sacar(
-                cpf=cpf,
-                num_conta=num_conta,
-                saldo=conta["saldo"],
-                valor=valor,
-                extrato=conta["extrato"],
-                limite=conta["limite"],
-                numero_saques=conta["numero_saques"],
-                limite_saques=LIMITE_SAQUES
-            )
-            conta["numero_transacoes"] += 1
-
-        elif opcao == "e":
-            # Solicita CPF e número da conta para exibir o extrato
-            cpf = input("Informe o CPF do usuário: ")
-            num_conta = int(input("Informe o número da conta: "))
-            conta = filtrar_conta(contas, cpf, num_conta)
-
-            if not conta:
-                print("Conta não encontrada ou dados incorretos.")
-                continue
-
-            exibir_extrato(cpf, num_conta, conta["saldo"], extrato=conta["extrato"])
-
-        elif opcao == "nu":
-            # Chama a função para cadastrar um novo usuário
-            cadastrar_usuario(usuarios)
-
-        elif opcao == "nc":
-            # Chama a função para criar uma nova conta
-            nova_conta = criar_conta_corrente(AGENCIA, numero_conta, usuarios)
-            if nova_conta:
-                contas.append(nova_conta)
-                numero_conta += 1
-
-        elif opcao == "lc":
-            # Lista todas as contas cadastradas
-            listar_contas(contas)
-
-        elif opcao == "lu":
-            # Lista todos os usuários cadastrados
-            listar_usuarios(usuarios)
-
-        elif opcao == "q":
+        if opcao == "q":
             # Sai do programa
             break
 
+        acao = opcoes_menu.get(opcao)
+        if acao:
+            acao()
         else:
             print("Operação inválida, por favor selecione novamente a operação desejada.")
 
 # Ponto de entrada do programa
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main(ler_argumento_lote())
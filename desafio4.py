@@ -1,28 +1,101 @@
+import contextlib
 import datetime
+import sys
+import threading
+import unicodedata
 from abc import ABC, abstractmethod
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from operator import attrgetter, itemgetter
+
+from historico_compacto import ESCALA_VALOR, TAMANHO_BLOCO, TIPOS, BlocoHistorico, codigo_do_tipo, formatar_data
+from historico_disco import ArquivoHistorico, ler_argumento_historico
+from lote import executar_lote_de_arquivo, ler_argumento_lote
 
 # Constantes globais
 AGENCIA = "0001"
 LIMITE_SAQUES = 3
 LIMITE_VALOR_SAQUE = 500
+TAMANHO_PAGINA = 20
+LIMITE_CACHE_EXTRATOS = 64 * 2**20  # caracteres de extrato já formatados mantidos em memória
+LIMITE_NOVOS_CLIENTES = 16384  # clientes nos índices auxiliares antes de intercalá-los nos principais
+
+# Histórico em disco (veja historico_disco.py); None mantém o histórico em memória
+armazenamento_historico = None
+# Contadores diários em memória compartilhada entre processos (veja contadores_compartilhados.py);
+# None mantém o número de saques em cada conta
+contadores_compartilhados = None
 
 class Historico:
     """
     Classe para armazenar o histórico de transações de uma conta.
+    As movimentações recentes ficam sem compactação, para registro rápido; a
+    cada TAMANHO_BLOCO elas são seladas em um bloco compactado (veja
+    historico_compacto.py).
     """
     def __init__(self):
-        self._transacoes = []
+        self._blocos = []
+        # (blocos visíveis, recentes como código, valor em milionésimos, data): trocados juntos ao selar um bloco
+        self._estado = (0, array("q"))
 
     @property
     def transacoes(self):
-        return self._transacoes
+        return self.transacoes_desde(0)
+
+    def __len__(self):
+        quantidade_blocos, recentes = self._estado
+        return quantidade_blocos * TAMANHO_BLOCO + len(recentes) // 3
+
+    def _registros(self, inicio=0, data_inicial=None, data_final=None):
+        quantidade_blocos, recentes = self._estado
+        recentes = recentes.tolist()
+        registros = []
+        for bloco in self._blocos[inicio // TAMANHO_BLOCO:quantidade_blocos]:
+            if data_inicial is not None and bloco.data_maxima < data_inicial:
+                continue
+            if data_final is not None and bloco.data_minima > data_final:
+                continue
+            registros.extend(bloco.registros())
+        if inicio < quantidade_blocos * TAMANHO_BLOCO:
+            del registros[:inicio % TAMANHO_BLOCO]
+        else:
+            del recentes[:3 * (inicio - quantidade_blocos * TAMANHO_BLOCO)]
+        iterador = iter(recentes)
+        registros.extend(zip(iterador, iterador, iterador))
+        return registros
+
+    @staticmethod
+    def _como_transacoes(registros):
+        return [
+            {"tipo": TIPOS[codigo], "valor": valor / ESCALA_VALOR, "data": formatar_data(data)}
+            for codigo, valor, data in registros
+        ]
+
+    def transacoes_desde(self, inicio):
+        return self._como_transacoes(self._registros(inicio))
+
+    def transacoes_entre(self, data_inicial=None, data_final=None):
+        """
+        Transações entre duas datas (datetime, inclusive), pulando os blocos fora do período.
+        """
+        data_inicial = None if data_inicial is None else int(data_inicial.timestamp())
+        data_final = None if data_final is None else int(data_final.timestamp())
+        return self._como_transacoes(
+            (codigo, valor, data) for codigo, valor, data in self._registros(0, data_inicial, data_final)
+            if (data_inicial is None or data >= data_inicial) and (data_final is None or data <= data_final)
+        )
 
     def adicionar_transacao(self, transacao):
-        self._transacoes.append({
-            "tipo": transacao.__class__.__name__,
-            "valor": transacao.valor,
-            "data": datetime.datetime.now().strftime("%d/%m/%Y %H:%M:%S")
-        })
+        self.registrar_movimento(transacao.__class__.__name__, transacao.valor)
+
+    def registrar_movimento(self, tipo, valor, data=None):
+        quantidade_blocos, recentes = self._estado
+        data = int(datetime.datetime.now().timestamp() if data is None else data)
+        recentes.extend((codigo_do_tipo(tipo), round(valor * ESCALA_VALOR), data))
+        if len(recentes) == 3 * TAMANHO_BLOCO:
+            self._blocos.append(BlocoHistorico(recentes[0::3], recentes[1::3], recentes[2::3]))
+            self._estado = (quantidade_blocos + 1, array("q"))
 
 class Transacao(ABC):
     """
@@ -51,9 +124,12 @@ class Deposito(Transacao):
         return self._valor
 
     def registrar(self, conta):
-        sucesso_transacao = conta.depositar(self.valor)
-        if sucesso_transacao:
-            conta.historico.adicionar_transacao(self)
+        # Saldo e histórico mudam juntos, na mesma versão (veja RegistroVersoes)
+        with conta._lock, versoes:
+            sucesso_transacao = conta.depositar(self.valor)
+            if sucesso_transacao:
+                conta.historico.adicionar_transacao(self)
+            return sucesso_transacao
 
 class Saque(Transacao):
     """
@@ -69,9 +145,200 @@ class Saque(Transacao):
         return self._valor
 
     def registrar(self, conta):
-        sucesso_transacao = conta.sacar(self.valor)
-        if sucesso_transacao:
-            conta.historico.adicionar_transacao(self)
+        # Saldo e histórico mudam juntos, na mesma versão (veja RegistroVersoes)
+        with conta._lock, versoes:
+            sucesso_transacao = conta.sacar(self.valor)
+            if sucesso_transacao:
+                conta.historico.adicionar_transacao(self)
+            return sucesso_transacao
+
+class Transferencia(Transacao):
+    """
+    Classe para representar uma transferência entre duas contas.
+    """
+    def __init__(self, valor, conta_destino):
+        if valor <= 0:
+            raise ValueError("O valor da transferência deve ser positivo.")
+        self._valor = valor
+        self._conta_destino = conta_destino
+
+    @property
+    def valor(self):
+        return self._valor
+
+    @property
+    def conta_destino(self):
+        return self._conta_destino
+
+    def registrar(self, conta):
+        with bloquear_contas(conta, self.conta_destino):
+            sucesso_transacao = conta.transferir(self.valor, self.conta_destino)
+            if sucesso_transacao:
+                conta.historico.registrar_movimento("TransferenciaEnviada", self.valor)
+                self.conta_destino.historico.registrar_movimento("TransferenciaRecebida", self.valor)
+            return sucesso_transacao
+
+@contextlib.contextmanager
+def bloquear_contas(*contas):
+    """
+    Adquire os locks das contas sempre em ordem crescente de número, de modo
+    que operações sobre as mesmas contas nunca esperem uma pela outra em
+    ordem inversa (sem deadlock). Tudo o que for alterado dentro do bloco
+    entra na mesma versão (veja RegistroVersoes).
+    """
+    with contextlib.ExitStack() as pilha:
+        for conta in sorted(set(contas), key=lambda conta: conta.numero):
+            pilha.enter_context(conta._lock)
+        with versoes:
+            yield
+
+class RegistroVersoes:
+    """
+    Versões das contas para instantâneos consistentes sem parar as escritas.
+    Cada escrita (um bloco de bloquear_contas ou um ajuste de saldo avulso)
+    recebe a versão corrente; abrir um instantâneo avança a versão e só
+    espera (avisado por elas) as escritas já em andamento terminarem. Enquanto houver
+    instantâneo aberto, a primeira escrita de uma conta em uma versão nova
+    guarda o estado substituído (cópia na escrita); esses estados são
+    descartados quando nenhum instantâneo aberto pode mais lê-los.
+
+    Como gerenciador de contexto, delimita uma escrita e produz
+    [versão, instantâneo aberto mais antigo ou None, profundidade]; escritas
+    aninhadas na mesma thread compartilham a versão da mais externa.
+    """
+    def __init__(self):
+        self.versao = 0
+        self._escritas = {}  # thread -> escrita em andamento
+        self._leitores = {}  # versão -> instantâneos abertos
+        self._leitor_mais_antigo = None
+        self._com_anteriores = set()
+        self._lock = threading.Lock()
+        # Instantâneos esperando escritas em andamento; só então as escritas avisam ao terminar
+        self._escritas_terminadas = threading.Condition(self._lock)
+        self._aguardando = 0
+        self._local = threading.local()
+
+    def __enter__(self):
+        escrita = getattr(self._local, "escrita", None)
+        if escrita is not None:
+            escrita[2] += 1
+            return escrita
+        # Publica a versão antes de conferi-la: se um instantâneo avançou a versão no
+        # meio do caminho, tenta de novo; senão, o instantâneo vai enxergar esta escrita
+        thread = threading.get_ident()
+        while True:
+            versao = self.versao
+            escrita = self._escritas[thread] = [versao, None, 1]
+            if self.versao == versao:
+                break
+        escrita[1] = self._leitor_mais_antigo
+        self._local.escrita = escrita
+        return escrita
+
+    def __exit__(self, *excecao):
+        escrita = self._local.escrita
+        escrita[2] -= 1
+        if not escrita[2]:
+            self._local.escrita = None
+            del self._escritas[threading.get_ident()]
+            if self._aguardando:
+                with self._escritas_terminadas:
+                    self._escritas_terminadas.notify_all()
+
+    def guardar_anterior(self, conta, versao, leitor_mais_antigo):
+        # Chamado com o lock da conta, antes da primeira alteração dela na `versao`
+        anteriores = conta._anteriores
+        if leitor_mais_antigo is not None:
+            anteriores.append((conta._versao, versao, conta._saldo, len(conta._historico)))
+            self._com_anteriores.add(conta)
+        self._descartar_anteriores(anteriores, versao if leitor_mais_antigo is None else leitor_mais_antigo)
+
+    @staticmethod
+    def _descartar_anteriores(anteriores, leitor_mais_antigo):
+        # Um estado substituído na versão v só serve a instantâneos anteriores a v
+        while anteriores and anteriores[0][1] <= leitor_mais_antigo:
+            anteriores.popleft()
+
+    def instantaneo(self):
+        with self._escritas_terminadas:
+            versao = self.versao
+            self._leitores[versao] = self._leitores.get(versao, 0) + 1
+            self._leitor_mais_antigo = min(self._leitores)
+            self.versao = versao + 1
+            # Espera apenas as escritas que já estavam em andamento (duram microssegundos)
+            self._aguardando += 1
+            try:
+                self._escritas_terminadas.wait_for(
+                    lambda: not any(escrita[0] <= versao for escrita in list(self._escritas.values()))
+                )
+            finally:
+                self._aguardando -= 1
+        return Instantaneo(self, versao)
+
+    def _fechar(self, versao):
+        with self._lock:
+            self._leitores[versao] -= 1
+            if not self._leitores[versao]:
+                del self._leitores[versao]
+            self._leitor_mais_antigo = min(self._leitores) if self._leitores else None
+            limite = self.versao if self._leitor_mais_antigo is None else self._leitor_mais_antigo
+            contas = list(self._com_anteriores)
+        # Com o lock de cada conta, como nas escritas: o descarte tem um dono por vez
+        for conta in contas:
+            with conta._lock:
+                self._descartar_anteriores(conta._anteriores, limite)
+                if not conta._anteriores:
+                    self._com_anteriores.discard(conta)
+
+class Instantaneo:
+    """
+    Visão congelada dos saldos e históricos das contas na versão em que foi
+    aberto. Feche-o (ou use como gerenciador de contexto) ao terminar, para
+    que os estados antigos sejam descartados.
+    """
+    def __init__(self, registro, versao):
+        self._registro = registro
+        self.versao = versao
+        self._aberto = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def contas(self, contas):
+        return [conta for conta in contas if conta._versao_criacao <= self.versao]
+
+    def saldo(self, conta):
+        return conta._estado_na_versao(self.versao)[0]
+
+    def saldos(self, contas):
+        """
+        {número: saldo} das contas existentes na versão, em uma única passada.
+        Das contas sem escrita desde a abertura lê apenas o saldo atual.
+        """
+        versao = self.versao
+        saldos = {}
+        for conta in contas:
+            # Mesma ordem de _estado_na_versao: o saldo antes da versão dele
+            saldo = conta._saldo
+            if conta._versao <= versao:
+                saldos[conta._numero] = saldo
+            elif conta._versao_criacao <= versao:
+                saldos[conta._numero] = conta._estado_na_versao(versao)[0]
+        return saldos
+
+    def transacoes(self, conta):
+        quantidade = conta._estado_na_versao(self.versao)[1]
+        return conta.historico.transacoes_desde(0)[:quantidade]
+
+    def fechar(self):
+        if self._aberto:
+            self._aberto = False
+            self._registro._fechar(self.versao)
+
+versoes = RegistroVersoes()
 
 class Conta:
     """
@@ -82,7 +349,11 @@ class Conta:
         self._numero = numero
         self._agencia = AGENCIA
         self._cliente = cliente
-        self._historico = Historico()
+        self._historico = armazenamento_historico.historico(numero) if armazenamento_historico else Historico()
+        self._lock = threading.RLock()
+        # Versão do estado atual e estados substituídos ainda visíveis a instantâneos abertos
+        self._versao = self._versao_criacao = versoes.versao
+        self._anteriores = deque()
 
     @property
     def saldo(self):
@@ -108,29 +379,69 @@ class Conta:
     def nova_conta(cls, cliente, numero):
         return cls(cliente, numero)
 
+    def _ajustar_saldo(self, variacao, saque=0):
+        # Toda alteração de saldo passa por aqui, mantendo a posição do cliente em dia
+        # e o estado anterior guardado para os instantâneos abertos
+        with versoes as (versao, leitor_mais_antigo, _):
+            if self._versao != versao:
+                versoes.guardar_anterior(self, versao, leitor_mais_antigo)
+                self._versao = versao
+            self._saldo += variacao
+            self._cliente.atualizar_posicao(variacao, saque)
+
+    def _estado_na_versao(self, versao):
+        # (saldo, quantidade de transações) na `versao`; o estado atual é lido antes da
+        # versão dele, então uma escrita concorrente nunca passa por estado antigo
+        saldo, quantidade = self._saldo, len(self._historico)
+        if self._versao <= versao:
+            return saldo, quantidade
+        for inicial, final, saldo, quantidade in reversed(tuple(self._anteriores)):
+            if inicial <= versao < final:
+                return saldo, quantidade
+        if versao < self._versao_criacao:
+            # A conta ainda não existia na versão
+            return 0, 0
+        raise ValueError(f"O estado da conta {self.numero} na versão {versao} não está mais disponível.")
+
     def sacar(self, valor):
-        saldo = self.saldo
-        excedeu_saldo = valor > saldo
-
-        if excedeu_saldo:
-            print("\n@@@ Operação falhou! Você não tem saldo suficiente. @@@")
-        elif valor > 0:
-            self._saldo -= valor
-            print("\n=== Saque realizado com sucesso! ===")
-            return True
-        else:
-            print("\n@@@ Operação falhou! O valor informado é inválido. @@@")
-        return False
+        with self._lock:
+            saldo = self.saldo
+            excedeu_saldo = valor > saldo
+
+            if excedeu_saldo:
+                print("\n@@@ Operação falhou! Você não tem saldo suficiente. @@@")
+            elif valor > 0:
+                self._ajustar_saldo(-valor, saque=valor)
+                print("\n=== Saque realizado com sucesso! ===")
+                return True
+            else:
+                print("\n@@@ Operação falhou! O valor informado é inválido. @@@")
+            return False
 
     def depositar(self, valor):
-        if valor > 0:
-            self._saldo += valor
-            print("\n=== Depósito realizado com sucesso! ===")
-            return True
-        else:
-            print("\n@@@ Operação falhou! O valor informado é inválido. @@@")
+        with self._lock:
+            if valor > 0:
+                self._ajustar_saldo(valor)
+                print("\n=== Depósito realizado com sucesso! ===")
+                return True
+            else:
+                print("\n@@@ Operação falhou! O valor informado é inválido. @@@")
+                return False
+
+    def transferir(self, valor, conta_destino):
+        if conta_destino is self:
+            print("\n@@@ Operação falhou! A conta de destino deve ser diferente da conta de origem. @@@")
             return False
 
+        with bloquear_contas(self, conta_destino):
+            if valor > self.saldo:
+                print("\n@@@ Operação falhou! Você não tem saldo suficiente. @@@")
+                return False
+            self._ajustar_saldo(-valor)
+            conta_destino._ajustar_saldo(valor)
+        print("\n=== Transferência realizada com sucesso! ===")
+        return True
+
 class ContaCorrente(Conta):
     """
     Classe para representar uma conta corrente, que herda de Conta.
@@ -141,6 +452,9 @@ class ContaCorrente(Conta):
         self._limite = limite
         self._limite_saques = limite_saques
         self._numero_saques = 0
+        self._contadores = contadores_compartilhados
+        if self._contadores is not None and not 0 < numero <= self._contadores.capacidade:
+            raise ValueError("A tabela de contadores compartilhados está cheia.")
 
     @property
     def limite(self):
@@ -150,20 +464,44 @@ class ContaCorrente(Conta):
     def limite_saques(self):
         return self._limite_saques
 
-    def sacar(self, valor):
-        numero_saques = self._numero_saques
-        limite_saques = self.limite_saques
-
-        excedeu_limite = valor > self.limite
-        excedeu_saques = numero_saques >= limite_saques
+    @property
+    def numero_saques(self):
+        if self._contadores is not None:
+            return self._contadores.valor(self.numero - 1, "numero_saques")
+        return self._numero_saques
+
+    def _reservar_saque(self):
+        # Confere e conta o saque de uma vez; com contadores compartilhados, entre todos os processos
+        if self._contadores is not None:
+            return self._contadores.incrementar_se_abaixo(self.numero - 1, "numero_saques", self.limite_saques) is not None
+        if self._numero_saques >= self.limite_saques:
+            return False
+        self._numero_saques += 1
+        return True
 
-        if excedeu_limite:
-            print("\n@@@ Operação falhou! O valor do saque excede o limite. @@@")
-        elif excedeu_saques:
-            print("\n@@@ Operação falhou! Número máximo de saques diários excedido. @@@")
+    def _devolver_saque(self):
+        if self._contadores is not None:
+            self._contadores.decrementar(self.numero - 1, "numero_saques")
         else:
-            return super().sacar(valor)
-        return False
+            self._numero_saques -= 1
+
+    def sacar(self, valor):
+        with self._lock:
+            if valor > self.limite:
+                print("\n@@@ Operação falhou! O valor do saque excede o limite. @@@")
+            elif not self._reservar_saque():
+                print("\n@@@ Operação falhou! Número máximo de saques diários excedido. @@@")
+            elif super().sacar(valor):
+                return True
+            else:
+                # Saque recusado (saldo ou valor): a reserva volta para a conta
+                self._devolver_saque()
+            return False
+
+    def zerar_saques_diarios(self):
+        if self._contadores is not None:
+            self._contadores.zerar(self.numero - 1)
+        self._numero_saques = 0
 
 class Cliente:
     """
@@ -172,9 +510,30 @@ class Cliente:
     def __init__(self, endereco):
         self.endereco = endereco
         self.contas = []
+        # Posição consolidada, atualizada a cada movimentação das contas
+        self.saldo_total = 0
+        self.saques_hoje = 0
+        self.total_saques_hoje = 0
+        self._lock = threading.Lock()
+
+    @property
+    def quantidade_contas(self):
+        return len(self.contas)
+
+    def atualizar_posicao(self, variacao, saque=0):
+        with self._lock:
+            self.saldo_total += variacao
+            if saque:
+                self.saques_hoje += 1
+                self.total_saques_hoje += saque
+
+    def zerar_saques_diarios(self):
+        with self._lock:
+            self.saques_hoje = 0
+            self.total_saques_hoje = 0
 
     def realizar_transacao(self, conta, transacao):
-        transacao.registrar(conta)
+        return transacao.registrar(conta)
 
     def adicionar_conta(self, conta):
         self.contas.append(conta)
@@ -189,13 +548,195 @@ class PessoaFisica(Cliente):
         self.data_nascimento = data_nascimento
         self.cpf = cpf
 
+def normalizar_nome(nome):
+    """
+    Remove acentos e diferenças de maiúsculas/minúsculas do nome
+    ("José" e "jose" ficam iguais), para ordenar e buscar por prefixo.
+    """
+    decomposto = unicodedata.normalize("NFKD", nome)
+    return "".join(caractere for caractere in decomposto if not unicodedata.combining(caractere)).casefold()
+
+def _pagina(chaves, itens, apos, tamanho):
+    """
+    Página de `itens` (ordenados por `chaves`) que começa logo depois da
+    chave `apos` (ou do início, se None). Retorna (itens da página, há mais).
+    """
+    inicio = 0 if apos is None else bisect_right(chaves, apos)
+    return itens[inicio:inicio + tamanho], inicio + tamanho < len(itens)
+
+class CadastroClientes:
+    """
+    Coleção dos clientes cadastrados. Além da ordem de cadastro, mantém
+    índices ordenados pelo nome normalizado (busca por prefixo) e pelo CPF
+    (paginação), ambos consultados por busca binária, e um dicionário por
+    CPF para a busca exata. Os clientes novos entram em índices auxiliares
+    pequenos, também ordenados (insort), consultados junto com os principais;
+    só ao passarem de LIMITE_NOVOS_CLIENTES são intercalados nos principais.
+    """
+    def __init__(self, clientes=()):
+        self._clientes = list(clientes)
+        self._cliente_do_cpf = {}
+        for cliente in self._clientes:
+            self._cliente_do_cpf.setdefault(cliente.cpf, cliente)
+        pares = sorted(((normalizar_nome(cliente.nome), cliente) for cliente in self._clientes), key=itemgetter(0))
+        self._nomes = [nome for nome, _ in pares]
+        self._por_nome = [cliente for _, cliente in pares]
+        self._por_cpf = sorted(self._clientes, key=attrgetter("cpf"))
+        self._cpfs = [cliente.cpf for cliente in self._por_cpf]
+        self._nomes_novos, self._por_nome_novos = [], []
+        self._cpfs_novos, self._por_cpf_novos = [], []
+
+    def __len__(self):
+        return len(self._clientes)
+
+    def __iter__(self):
+        return iter(self._clientes)
+
+    def append(self, cliente):
+        self._clientes.append(cliente)
+        self._cliente_do_cpf.setdefault(cliente.cpf, cliente)
+        # bisect_right: o novo fica depois dos iguais já cadastrados
+        nome = normalizar_nome(cliente.nome)
+        posicao = bisect_right(self._nomes_novos, nome)
+        self._nomes_novos.insert(posicao, nome)
+        self._por_nome_novos.insert(posicao, cliente)
+        posicao = bisect_right(self._cpfs_novos, cliente.cpf)
+        self._cpfs_novos.insert(posicao, cliente.cpf)
+        self._por_cpf_novos.insert(posicao, cliente)
+        if len(self._nomes_novos) > LIMITE_NOVOS_CLIENTES:
+            self._incorporar_novos()
+
+    @staticmethod
+    def _intercalar(chaves, itens, chaves_novas, itens_novos):
+        # Cada novo é encaixado por busca binária (depois dos iguais já indexados) e
+        # os trechos entre eles são copiados em fatias, sem percorrer o índice em Python
+        intercaladas, intercalados, anterior = [], [], 0
+        for chave, item in zip(chaves_novas, itens_novos):
+            posicao = bisect_right(chaves, chave, anterior)
+            intercaladas += chaves[anterior:posicao]
+            intercaladas.append(chave)
+            intercalados += itens[anterior:posicao]
+            intercalados.append(item)
+            anterior = posicao
+        intercaladas += chaves[anterior:]
+        intercalados += itens[anterior:]
+        return intercaladas, intercalados
+
+    def _incorporar_novos(self):
+        self._nomes, self._por_nome = self._intercalar(self._nomes, self._por_nome, self._nomes_novos, self._por_nome_novos)
+        self._cpfs, self._por_cpf = self._intercalar(self._cpfs, self._por_cpf, self._cpfs_novos, self._por_cpf_novos)
+        self._nomes_novos, self._por_nome_novos = [], []
+        self._cpfs_novos, self._por_cpf_novos = [], []
+
+    def buscar_por_cpf(self, cpf):
+        return self._cliente_do_cpf.get(cpf)
+
+    def pagina(self, apos_cpf=None, tamanho=TAMANHO_PAGINA):
+        """
+        Clientes em ordem de CPF, a partir do primeiro CPF maior que `apos_cpf`.
+        Retorna (clientes da página, há mais).
+        """
+        inicio = 0 if apos_cpf is None else bisect_right(self._cpfs, apos_cpf)
+        inicio_novos = 0 if apos_cpf is None else bisect_right(self._cpfs_novos, apos_cpf)
+        candidatos = [
+            *zip(self._cpfs[inicio:inicio + tamanho], self._por_cpf[inicio:inicio + tamanho]),
+            *zip(self._cpfs_novos[inicio_novos:inicio_novos + tamanho], self._por_cpf_novos[inicio_novos:inicio_novos + tamanho]),
+        ]
+        candidatos.sort(key=itemgetter(0))
+        restantes = len(self._cpfs) - inicio + len(self._cpfs_novos) - inicio_novos
+        return [cliente for _, cliente in candidatos[:tamanho]], restantes > tamanho
+
+    @staticmethod
+    def _com_prefixo(nomes, clientes, prefixo, limite):
+        posicao = bisect_left(nomes, prefixo)
+        encontrados = []
+        while posicao < len(nomes) and len(encontrados) < limite and nomes[posicao].startswith(prefixo):
+            encontrados.append((nomes[posicao], clientes[posicao]))
+            posicao += 1
+        return encontrados
+
+    def buscar_por_prefixo(self, prefixo, limite=10):
+        """
+        Retorna até `limite` clientes cujo nome normalizado começa com o prefixo,
+        em ordem alfabética.
+        """
+        prefixo = normalizar_nome(prefixo)
+        encontrados = self._com_prefixo(self._nomes, self._por_nome, prefixo, limite)
+        encontrados += self._com_prefixo(self._nomes_novos, self._por_nome_novos, prefixo, limite)
+        encontrados.sort(key=itemgetter(0))
+        return [cliente for _, cliente in encontrados[:limite]]
+
+class CadastroContas:
+    """
+    Coleção das contas, ordenada pelo número (os números são sequenciais,
+    então novas contas entram no fim), para busca e paginação por número.
+    """
+    def __init__(self, contas=()):
+        self._contas = sorted(contas, key=lambda conta: conta.numero)
+        self._numeros = [conta.numero for conta in self._contas]
+
+    def __len__(self):
+        return len(self._contas)
+
+    def __iter__(self):
+        return iter(self._contas)
+
+    def append(self, conta):
+        posicao = bisect_right(self._numeros, conta.numero)
+        self._numeros.insert(posicao, conta.numero)
+        self._contas.insert(posicao, conta)
+
+    def buscar(self, numero):
+        posicao = bisect_left(self._numeros, numero)
+        if posicao < len(self._numeros) and self._numeros[posicao] == numero:
+            return self._contas[posicao]
+        return None
+
+    def pagina(self, apos_numero=None, tamanho=TAMANHO_PAGINA):
+        """
+        Contas em ordem de número, a partir da primeira com número maior que
+        `apos_numero`. Retorna (contas da página, há mais).
+        """
+        return _pagina(self._numeros, self._contas, apos_numero, tamanho)
+
+class CacheExtratos:
+    """
+    Linhas de extrato já formatadas, por conta. A cada extrato só são
+    formatadas as transações registradas desde o anterior; quando o total
+    passa de `limite` caracteres, saem as contas usadas há mais tempo (LRU).
+    """
+    def __init__(self, limite=LIMITE_CACHE_EXTRATOS):
+        self._limite = limite
+        self._extratos = OrderedDict()  # numero da conta -> (transações formatadas, texto)
+        self._tamanho = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._extratos)
+
+    def extrato(self, conta):
+        historico = conta.historico
+        with self._lock:
+            formatadas, texto = self._extratos.pop(conta.numero, (0, ""))
+            self._tamanho -= len(texto)
+            if formatadas < len(historico):
+                novas = historico.transacoes_desde(formatadas)
+                texto += "".join(f"{transacao['data']} - {transacao['tipo']}: R$ {transacao['valor']:.2f}\n" for transacao in novas)
+                formatadas += len(novas)
+
+            self._extratos[conta.numero] = (formatadas, texto)
+            self._tamanho += len(texto)
+            while self._tamanho > self._limite and self._extratos:
+                _, (_, removido) = self._extratos.popitem(last=False)
+                self._tamanho -= len(removido)
+        return texto
+
 def filtrar_cliente(clientes, cpf):
     """
     Função auxiliar para buscar um cliente por CPF.
     Retorna o cliente se encontrado, caso contrário, retorna None.
     """
-    clientes_filtrados = [cliente for cliente in clientes if cliente.cpf == cpf]
-    return clientes_filtrados[0] if clientes_filtrados else None
+    return clientes.buscar_por_cpf(cpf)
 
 def filtrar_conta(cliente, numero_conta):
     """
@@ -207,6 +748,34 @@ def filtrar_conta(cliente, numero_conta):
             return conta
     return None
 
+def transferir_em_lote(transferencias):
+    """
+    Aplica um lote de transferências (conta_origem, conta_destino, valor)
+    compensando-as antes: cada conta recebe uma única variação líquida, com
+    todas as contas bloqueadas na ordem canônica. Se alguma conta ficaria
+    com saldo negativo, nada é alterado (ValueError).
+    Retorna um dicionário {numero_conta: variacao}.
+    """
+    variacoes = {}
+    for conta_origem, conta_destino, valor in transferencias:
+        if valor <= 0:
+            raise ValueError("O valor da transferência deve ser positivo.")
+        if conta_origem is conta_destino:
+            raise ValueError("A conta de destino deve ser diferente da conta de origem.")
+        variacoes[conta_origem] = variacoes.get(conta_origem, 0) - valor
+        variacoes[conta_destino] = variacoes.get(conta_destino, 0) + valor
+    variacoes = {conta: variacao for conta, variacao in variacoes.items() if variacao}
+
+    with bloquear_contas(*variacoes):
+        insuficientes = [str(conta.numero) for conta, variacao in variacoes.items() if conta.saldo + variacao < 0]
+        if insuficientes:
+            raise ValueError(f"Saldo insuficiente para o lote na(s) conta(s): {', '.join(insuficientes[:10])}")
+        for conta, variacao in variacoes.items():
+            conta._ajustar_saldo(variacao)
+            tipo = "TransferenciaRecebida" if variacao > 0 else "TransferenciaEnviada"
+            conta.historico.registrar_movimento(tipo, abs(variacao))
+    return {conta.numero: variacao for conta, variacao in variacoes.items()}
+
 class NumeroContaManager:
     """
     Gerencia a geração de números de conta sequenciais.
@@ -225,21 +794,22 @@ def depositar_flow(clientes):
 
     if not cliente:
         print("\n@@@ Cliente não encontrado! @@@")
-        return
+        return False
 
     num_conta = int(input("Informe o número da conta: "))
     conta = filtrar_conta(cliente, num_conta)
 
     if not conta:
         print("\n@@@ Conta não encontrada para este cliente! @@@")
-        return
+        return False
 
     valor = float(input("Informe o valor do depósito: "))
     try:
         transacao = Deposito(valor)
-        cliente.realizar_transacao(conta, transacao)
+        return cliente.realizar_transacao(conta, transacao)
     except ValueError as e:
         print(f"\n@@@ Erro: {e} @@@")
+        return False
 
 
 def sacar_flow(clientes):
@@ -248,44 +818,73 @@ def sacar_flow(clientes):
 
     if not cliente:
         print("\n@@@ Cliente não encontrado! @@@")
-        return
+        return False
 
     num_conta = int(input("Informe o número da conta: "))
     conta = filtrar_conta(cliente, num_conta)
 
     if not conta:
         print("\n@@@ Conta não encontrada para este cliente! @@@")
-        return
+        return False
 
     valor = float(input("Informe o valor do saque: "))
     try:
         transacao = Saque(valor)
-        cliente.realizar_transacao(conta, transacao)
+        return cliente.realizar_transacao(conta, transacao)
     except ValueError as e:
         print(f"\n@@@ Erro: {e} @@@")
+        return False
 
-def exibir_extrato_flow(clientes):
+def transferir_flow(clientes, contas):
     cpf = input("Informe o CPF do cliente (somente números): ")
     cliente = filtrar_cliente(clientes, cpf)
 
     if not cliente:
         print("\n@@@ Cliente não encontrado! @@@")
-        return
+        return False
+
+    num_conta = int(input("Informe o número da conta de origem: "))
+    conta = filtrar_conta(cliente, num_conta)
+
+    if not conta:
+        print("\n@@@ Conta não encontrada para este cliente! @@@")
+        return False
+
+    num_destino = int(input("Informe o número da conta de destino: "))
+    conta_destino = contas.buscar(num_destino)
+
+    if not conta_destino:
+        print("\n@@@ Conta de destino não encontrada! @@@")
+        return False
+
+    valor = float(input("Informe o valor da transferência: "))
+    try:
+        transacao = Transferencia(valor, conta_destino)
+        return cliente.realizar_transacao(conta, transacao)
+    except ValueError as e:
+        print(f"\n@@@ Erro: {e} @@@")
+        return False
+
+def exibir_extrato_flow(clientes, extratos):
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    cliente = filtrar_cliente(clientes, cpf)
+
+    if not cliente:
+        print("\n@@@ Cliente não encontrado! @@@")
+        return False
 
     num_conta = int(input("Informe o número da conta: "))
     conta = filtrar_conta(cliente, num_conta)
 
     if not conta:
         print("\n@@@ Conta não encontrada para este cliente! @@@")
-        return
+        return False
 
     print("\n=============== EXTRATO ===============")
     print(f"Agência:\t{conta.agencia}")
     print(f"Conta:\t\t{conta.numero}")
     print(f"Cliente:\t{cliente.nome}")
-    extrato = ""
-    for transacao in conta.historico.transacoes:
-        extrato += f"{transacao['data']} - {transacao['tipo']}: R$ {transacao['valor']:.2f}\n"
+    extrato = extratos.extrato(conta)
 
     print("Não foram realizadas movimentações." if not extrato else extrato)
     print(f"\nSaldo atual:\t R$ {conta.saldo:.2f}")
@@ -297,7 +896,7 @@ def cadastrar_usuario_flow(clientes):
 
     if cliente_existente:
         print("\n@@@ Já existe um cliente com este CPF! @@@")
-        return
+        return False
 
     nome = input("Informe o nome completo: ")
     data_nascimento = input("Informe a data de nascimento (dd-mm-aaaa): ")
@@ -312,7 +911,7 @@ def criar_conta_flow(clientes, contas, numero_conta_manager):
 
     if not cliente:
         print("\n@@@ Cliente não encontrado! Fluxo de criação de conta encerrado. @@@")
-        return
+        return False
 
     numero_conta = numero_conta_manager.obter_proximo_numero()
     conta = ContaCorrente.nova_conta(cliente=cliente, numero=numero_conta)
@@ -320,64 +919,185 @@ def criar_conta_flow(clientes, contas, numero_conta_manager):
     contas.append(conta)
     print("\n=== Conta criada com sucesso! ===")
 
+def posicao_cliente_flow(clientes):
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    cliente = filtrar_cliente(clientes, cpf)
+
+    if not cliente:
+        print("\n@@@ Cliente não encontrado! @@@")
+        return False
+
+    print("\n=============== POSIÇÃO DO CLIENTE ===============")
+    print(f"Cliente:\t{cliente.nome}")
+    print(f"Contas:\t\t{cliente.quantidade_contas}")
+    print(f"Saldo total:\t R$ {cliente.saldo_total:.2f}")
+    print(f"Saques hoje:\t {cliente.saques_hoje} (R$ {cliente.total_saques_hoje:.2f})")
+    print("==================================================")
+
+def fechamento_diario(contas):
+    """
+    Fechamento do dia: registra o saldo de fechamento de cada conta e zera
+    os contadores diários de saques. A tabela de contadores compartilhados,
+    quando configurada, é zerada de uma vez (como no desafio3), e cada
+    cliente é zerado uma única vez, não uma vez por conta.
+    Retorna um dicionário {numero_conta: saldo_fechamento}.
+    """
+    # Saldos de um mesmo instante, sem interromper as operações em andamento
+    with versoes.instantaneo() as instantaneo:
+        saldos_fechamento = instantaneo.saldos(contas)
+    if contadores_compartilhados is not None:
+        contadores_compartilhados.zerar()
+    else:
+        for conta in contas:
+            conta.zerar_saques_diarios()
+    for cliente in dict.fromkeys(conta._cliente for conta in contas):
+        cliente.zerar_saques_diarios()
+    return saldos_fechamento
+
+def fechamento_diario_flow(contas):
+    saldos_fechamento = fechamento_diario(contas)
+    print(f"\n=== Fechamento diário concluído: {len(saldos_fechamento)} conta(s), "
+          f"saldo total R$ {sum(saldos_fechamento.values()):.2f} ===")
+
+def ler_tamanho_pagina():
+    """
+    Lê o tamanho da página (vazio = TAMANHO_PAGINA; 0 = apenas o total).
+    """
+    tamanho = input(f"Itens por página (vazio = {TAMANHO_PAGINA}, 0 = apenas o total): ").strip()
+    tamanho = int(tamanho) if tamanho else TAMANHO_PAGINA
+    if tamanho < 0:
+        raise ValueError("O tamanho da página não pode ser negativo.")
+    return tamanho
+
+def escrever_pagina(titulo, blocos, rodape):
+    """
+    Monta a página inteira em um único buffer e a escreve de uma vez.
+    """
+    sys.stdout.write("".join([f"\n{titulo}\n", *blocos, f"{rodape}\n"]))
+
 def listar_contas_flow(contas):
     if not contas:
         print("\n@@@ Nenhuma conta cadastrada! @@@")
-    else:
-        print("\n=============== CONTAS CADASTRADAS ===============")
-        for conta in contas:
-            print(f"""
-Agência:\t{conta.agencia}
-C/C:\t\t{conta.numero}
-Cliente:\t{conta.cliente.nome}
-CPF:\t\t{conta.cliente.cpf}
-""")
-        print("==================================================")
+        return
+
+    try:
+        tamanho = ler_tamanho_pagina()
+        if tamanho == 0:
+            print(f"\n=== {len(contas)} conta(s) cadastrada(s). ===")
+            return
+        apos = input("Listar após a conta nº (vazio = do início): ").strip()
+        pagina, ha_mais = contas.pagina(int(apos) if apos else None, tamanho)
+    except ValueError as e:
+        print(f"\n@@@ Erro: {e} @@@")
+        return False
+
+    blocos = [
+        f"\nAgência:\t{conta.agencia}\nC/C:\t\t{conta.numero}\nCliente:\t{conta.cliente.nome}\nCPF:\t\t{conta.cliente.cpf}\n\n"
+        for conta in pagina
+    ]
+    rodape = f"Próxima página: após a conta nº {pagina[-1].numero}" if ha_mais else "Fim da lista."
+    escrever_pagina("=============== CONTAS CADASTRADAS ===============", blocos,
+                    f"{rodape}\n==================================================")
+
+def buscar_usuarios_flow(clientes):
+    prefixo = input("Informe o início do nome: ").strip()
+    if not normalizar_nome(prefixo):
+        print("\n@@@ Informe ao menos uma letra do nome. @@@")
+        return False
+
+    encontrados = clientes.buscar_por_prefixo(prefixo)
+    if not encontrados:
+        print("\n@@@ Nenhum cliente encontrado! @@@")
+        return
+
+    linhas = ["\n=============== CLIENTES ENCONTRADOS ==============="]
+    for cliente in encontrados:
+        linhas.append(f"Nome:\t\t{cliente.nome}\nCPF:\t\t{cliente.cpf}\n")
+    linhas.append("=====================================================")
+    print("\n".join(linhas))
 
 def listar_usuarios_flow(clientes):
     if not clientes:
         print("\n@@@ Nenhum cliente cadastrado! @@@")
-    else:
-        print("\n=============== CLIENTES CADASTRADOS ===============")
-        for cliente in clientes:
-            print(f"""
-Nome:\t\t{cliente.nome}
-CPF:\t\t{cliente.cpf}
-Endereço:\t{cliente.endereco}
-""")
-        print("======================================================")
+        return
+
+    try:
+        tamanho = ler_tamanho_pagina()
+        if tamanho == 0:
+            print(f"\n=== {len(clientes)} cliente(s) cadastrado(s). ===")
+            return
+        apos = input("Listar após o CPF (vazio = do início): ").strip()
+        pagina, ha_mais = clientes.pagina(apos or None, tamanho)
+    except ValueError as e:
+        print(f"\n@@@ Erro: {e} @@@")
+        return False
+
+    blocos = [
+        f"\nNome:\t\t{cliente.nome}\nCPF:\t\t{cliente.cpf}\nEndereço:\t{cliente.endereco}\n\n"
+        for cliente in pagina
+    ]
+    rodape = f"Próxima página: após o CPF {pagina[-1].cpf}" if ha_mais else "Fim da lista."
+    escrever_pagina("=============== CLIENTES CADASTRADOS ===============", blocos,
+                    f"{rodape}\n======================================================")
 
 
-def main():
+def main(arquivo_lote=None, diretorio_historico=None):
     """
     Função principal que gerencia o fluxo do programa.
+    Com `arquivo_lote`, executa as operações do arquivo sem prompts (veja lote.py).
+    Com `diretorio_historico`, o histórico das contas fica em arquivos mapeados em memória.
     """
-    clientes = []
-    contas = []
+    global armazenamento_historico
+    if diretorio_historico:
+        armazenamento_historico = ArquivoHistorico(diretorio_historico)
+        try:
+            _executar(arquivo_lote)
+        finally:
+            armazenamento_historico.fechar()
+            armazenamento_historico = None
+    else:
+        _executar(arquivo_lote)
+
+def _executar(arquivo_lote):
+    clientes = CadastroClientes()
+    contas = CadastroContas()
     gerenciador_contas = NumeroContaManager()
+    extratos = CacheExtratos()
 
     menu = """
     [d] Depositar
     [s] Sacar
+    [t] Transferir
     [e] Extrato
     [nu] Novo usuário
     [nc] Nova conta
     [lc] Listar contas
     [lu] Listar usuários
+    [bu] Buscar usuários
+    [pc] Posição do cliente
+    [fd] Fechamento diário
     [q] Sair
     => """
 
     opcoes_menu = {
         "d": lambda: depositar_flow(clientes),
         "s": lambda: sacar_flow(clientes),
-        "e": lambda: exibir_extrato_flow(clientes),
+        "t": lambda: transferir_flow(clientes, contas),
+        "e": lambda: exibir_extrato_flow(clientes, extratos),
         "nu": lambda: cadastrar_usuario_flow(clientes),
         "nc": lambda: criar_conta_flow(clientes, contas, gerenciador_contas),
         "lc": lambda: listar_contas_flow(contas),
         "lu": lambda: listar_usuarios_flow(clientes),
+        "bu": lambda: buscar_usuarios_flow(clientes),
+        "pc": lambda: posicao_cliente_flow(clientes),
+        "fd": lambda: fechamento_diario_flow(contas),
         "q": lambda: "Sair"
     }
 
+    if arquivo_lote:
+        executar_lote_de_arquivo(opcoes_menu, arquivo_lote)
+        return
+
     while True:
         opcao = input(menu)
         acao = opcoes_menu.get(opcao)
@@ -390,4 +1110,4 @@ def main():
             print("\n@@@ Operação inválida, por favor selecione novamente a operação desejada. @@@")
 
 if __name__ == "__main__":
-    main()
+    main(ler_argumento_lote(), ler_argumento_historico())
@@ -1,23 +1,332 @@
+import contextlib
+import contextvars
 import datetime
+import heapq
+import logging
+import os
+import queue
+import threading
+import time
+import unicodedata
+import zlib
 from abc import ABC, abstractmethod
-from sqlalchemy import create_engine, Column, Integer, String, Float, ForeignKey, DateTime
+from bisect import bisect_right
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice, repeat
+from sqlalchemy import create_engine, event, bindparam, case, exists, func, insert, inspect, literal, delete, select, text, update, union_all, Column, Integer, String, Float, ForeignKey, DateTime, Date, Index
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.sql.expression import FunctionElement
+
+from admissao import ADMITIDA, MENSAGENS, ControleAdmissao
+from agendador import Agendador
+from lote import executar_lote_de_arquivo, ler_argumento_lote
 
 # --- Configuração do Banco de Dados com SQLAlchemy ---
-DB_URL = "mssql+pyodbc://localhost\\SQLEXPRESS/sistema_bancario?driver=ODBC+Driver+17+for+SQL+Server&Trusted_Connection=yes"
-engine = create_engine(DB_URL)
+# A URL pode ser trocada pela variável de ambiente EXTRADB_URL (ex.: "sqlite:///sistema_bancario.db")
+DB_URL_PADRAO = "mssql+pyodbc://localhost\\SQLEXPRESS/sistema_bancario?driver=ODBC+Driver+17+for+SQL+Server&Trusted_Connection=yes"
+DB_URL = os.environ.get("EXTRADB_URL", DB_URL_PADRAO)
+SQLITE_OTIMIZADO = os.environ.get("EXTRADB_SQLITE_OTIMIZADO", "1") != "0"
+# Transações mais antigas que isto (em dias) são movidas para `transacoes_arquivo`
+DIAS_RETENCAO = int(os.environ.get("EXTRADB_DIAS_RETENCAO", "180"))
+# Escrita em grupo: depósitos/saques de vários produtores compartilham um único commit
+ESCRITA_EM_GRUPO = os.environ.get("EXTRADB_ESCRITA_EM_GRUPO", "0") == "1"
+GRUPO_MAX_OPERACOES = int(os.environ.get("EXTRADB_GRUPO_MAX_OPERACOES", "200"))
+GRUPO_INTERVALO_MS = float(os.environ.get("EXTRADB_GRUPO_INTERVALO_MS", "5"))
+# Projeção de leitura em memória para listagens e extratos recentes
+PROJECAO_LEITURA = os.environ.get("EXTRADB_PROJECAO_LEITURA", "0") == "1"
+PROJECAO_TRANSACOES_RECENTES = int(os.environ.get("EXTRADB_PROJECAO_TRANSACOES_RECENTES", "50"))
+PROJECAO_IDADE_MAXIMA_S = float(os.environ.get("EXTRADB_PROJECAO_IDADE_MAXIMA_S", "300"))
+# Processos usados na reconstrução dos saldos a partir do log de transações
+PROCESSOS_RECONSTRUCAO = int(os.environ.get("EXTRADB_PROCESSOS_RECONSTRUCAO", str(os.cpu_count() or 1)))
+# Um banco por agência: "0001=sqlite:///agencia_0001.db,0002=sqlite:///agencia_0002.db" (vazio = só EXTRADB_URL)
+AGENCIAS = os.environ.get("EXTRADB_AGENCIAS", "")
+# Instrumentação: consultas e tempo por fluxo (relatório ao sair) e log das consultas acima do limiar
+INSTRUMENTAR_CONSULTAS = os.environ.get("EXTRADB_INSTRUMENTAR_CONSULTAS", "0") == "1"
+CONSULTA_LENTA_MS = float(os.environ.get("EXTRADB_CONSULTA_LENTA_MS", "100"))
+# Controle de admissão (admissao.py) de depósitos, saques e extratos: taxa e rajada por CPF,
+# operações simultâneas e espera máxima por uma vaga antes de recusar
+ADMISSAO = os.environ.get("EXTRADB_ADMISSAO", "0") == "1"
+ADMISSAO_TAXA_CPF = float(os.environ.get("EXTRADB_ADMISSAO_TAXA_CPF", "5"))
+ADMISSAO_RAJADA_CPF = float(os.environ.get("EXTRADB_ADMISSAO_RAJADA_CPF", "10"))
+ADMISSAO_EM_ANDAMENTO = int(os.environ.get("EXTRADB_ADMISSAO_EM_ANDAMENTO", "64"))
+ADMISSAO_ESPERA_MS = float(os.environ.get("EXTRADB_ADMISSAO_ESPERA_MS", "50"))
+# Agendador (agendador.py): extratos e listagens em segundo plano, cedendo a vez às operações do menu
+AGENDADOR = os.environ.get("EXTRADB_AGENDADOR", "0") == "1"
+RELATORIOS_SIMULTANEOS = int(os.environ.get("EXTRADB_RELATORIOS_SIMULTANEOS", "2"))
+RELATORIOS_PAUSA_MAXIMA_MS = float(os.environ.get("EXTRADB_RELATORIOS_PAUSA_MAXIMA_MS", "100"))
+
+# Perfil SQLite otimizado: pragmas aplicados a cada nova conexão
+PRAGMAS_SQLITE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "cache_size": -65536,       # ~64 MB de cache de páginas (valor negativo = KiB)
+    "mmap_size": 268435456,     # 256 MB de I/O mapeado em memória
+    "busy_timeout": 5000,       # ms aguardando um lock antes de falhar
+    "temp_store": "MEMORY",
+}
+
+def _aplicar_pragmas_sqlite(conexao_dbapi, registro_conexao):
+    cursor = conexao_dbapi.cursor()
+    for pragma, valor in PRAGMAS_SQLITE.items():
+        cursor.execute(f"PRAGMA {pragma}={valor}")
+    cursor.close()
+
+def criar_engine(url=DB_URL, otimizar_sqlite=SQLITE_OTIMIZADO):
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite" and otimizar_sqlite:
+        event.listen(engine, "connect", _aplicar_pragmas_sqlite)
+    return engine
+
+engine = criar_engine()
 Session = sessionmaker(bind=engine)
 Base = declarative_base()
 
+# --- Roteamento por Agência (um banco por agência) ---
+
+class RoteadorAgencias:
+    """
+    Escolhe o banco de cada operação. O cliente pertence à agência dada pelo
+    hash do CPF e suas contas ficam no mesmo banco; os números de conta são
+    intercalados entre as agências (a i-ésima gera i, i + n, i + 2n, ...),
+    então o número da conta também indica o banco. Listagens e relatórios
+    consultam todos os bancos em paralelo.
+    """
+    def __init__(self, sessions_por_agencia):
+        self._sessions = dict(sessions_por_agencia)
+        self.agencias = list(self._sessions)
+
+    @classmethod
+    def de_configuracao(cls, texto, otimizar_sqlite=SQLITE_OTIMIZADO):
+        sessions = {}
+        for item in texto.split(","):
+            agencia, url = item.split("=", 1)
+            sessions[agencia.strip()] = sessionmaker(bind=criar_engine(url.strip(), otimizar_sqlite))
+        return cls(sessions)
+
+    def __len__(self):
+        return len(self.agencias)
+
+    def agencia_do_cpf(self, cpf):
+        return self.agencias[zlib.crc32(cpf.encode()) % len(self.agencias)]
+
+    def agencia_da_conta(self, numero):
+        return self.agencias[(int(numero) - 1) % len(self.agencias)]
+
+    def numeracao(self, agencia):
+        # (primeiro número, passo) das contas da agência
+        return self.agencias.index(agencia) + 1, len(self.agencias)
+
+    def session_factory(self, agencia):
+        return self._sessions[agencia]
+
+    def session_do_cpf(self, cpf):
+        return self._sessions[self.agencia_do_cpf(cpf)]()
+
+    def em_todas(self, funcao):
+        """
+        Executa `funcao(session_factory)` em cada agência, em paralelo, e
+        retorna os resultados na ordem das agências.
+        """
+        if len(self.agencias) == 1:
+            return [funcao(self._sessions[self.agencias[0]])]
+        with ThreadPoolExecutor(len(self.agencias)) as executor:
+            # Cada tarefa leva uma cópia do contexto (medição de consultas do fluxo em andamento)
+            tarefas = [
+                executor.submit(contextvars.copy_context().run, funcao, session_factory)
+                for session_factory in self._sessions.values()
+            ]
+            return [tarefa.result() for tarefa in tarefas]
+
+    def consultar_todas(self, consulta):
+        """
+        Executa `consulta(session)` em cada agência, em paralelo.
+        """
+        def executar(session_factory):
+            session = session_factory()
+            try:
+                return consulta(session)
+            finally:
+                session.close()
+        return self.em_todas(executar)
+
+    def criar_tabelas(self):
+        for session_factory in self._sessions.values():
+            with session_factory.kw["bind"].begin() as conexao:
+                Base.metadata.create_all(conexao)
+                migrar_tabelas(conexao)
+
+roteador = RoteadorAgencias.de_configuracao(AGENCIAS) if AGENCIAS else RoteadorAgencias({"0001": Session})
+
+# --- Instrumentação de Consultas SQL ---
+
+log_consultas_lentas = logging.getLogger("extradb.consultas_lentas")
+
+class MedicaoConsultas:
+    """
+    Comandos SQL executados dentro de um bloco `medir_consultas`.
+    """
+    def __init__(self, fluxo):
+        self.fluxo = fluxo
+        self.comandos = []  # (duração em segundos, SQL)
+
+    @property
+    def quantidade(self):
+        return len(self.comandos)
+
+    @property
+    def tempo(self):
+        return sum(duracao for duracao, _ in self.comandos)
+
+class EstatisticasConsultas:
+    """
+    Totais por fluxo: execuções, consultas, tempo e os comandos mais lentos.
+    """
+    def __init__(self, mais_lentas=5):
+        self._mais_lentas = mais_lentas
+        self._fluxos = {}  # fluxo -> [execuções, consultas, tempo, heap (duração, SQL)]
+        self._lock = threading.Lock()
+
+    def acumular(self, medicao):
+        with self._lock:
+            totais = self._fluxos.setdefault(medicao.fluxo, [0, 0, 0.0, []])
+            totais[0] += 1
+            totais[1] += medicao.quantidade
+            totais[2] += medicao.tempo
+            for comando in medicao.comandos:
+                if len(totais[3]) < self._mais_lentas:
+                    heapq.heappush(totais[3], comando)
+                elif comando > totais[3][0]:
+                    heapq.heapreplace(totais[3], comando)
+
+    def relatorio(self):
+        with self._lock:
+            linhas = ["\n=============== CONSULTAS SQL POR FLUXO ==============="]
+            for fluxo, (execucoes, consultas, tempo, mais_lentas) in sorted(self._fluxos.items()):
+                linhas.append(f"{fluxo}: {execucoes} execução(ões), {consultas} consulta(s) "
+                              f"({consultas / execucoes:.1f} por execução), {tempo * 1000:.1f} ms")
+                for duracao, sql in sorted(mais_lentas, reverse=True):
+                    linhas.append(f"\t{duracao * 1000:8.2f} ms  {' '.join(sql.split())[:120]}")
+            linhas.append("=======================================================")
+        return "\n".join(linhas)
+
+estatisticas_consultas = EstatisticasConsultas()
+# Medições em andamento no contexto atual (blocos aninhados contam todos)
+_medicoes_ativas = contextvars.ContextVar("medicoes_consultas", default=())
+
+# O início de cada comando fica no contexto da execução, e não na conexão: um comando
+# que falha não deixa um início sobrando para o próximo da mesma conexão
+@event.listens_for(Engine, "before_cursor_execute")
+def _antes_da_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    if INSTRUMENTAR_CONSULTAS or _medicoes_ativas.get():
+        contexto.inicio_consulta = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _depois_da_consulta(conexao, cursor, sql, parametros, contexto, executemany):
+    inicio = getattr(contexto, "inicio_consulta", None)
+    if inicio is None:
+        return
+    duracao = time.perf_counter() - inicio
+    for medicao in _medicoes_ativas.get():
+        medicao.comandos.append((duracao, sql))
+    if INSTRUMENTAR_CONSULTAS and duracao * 1000 >= CONSULTA_LENTA_MS:
+        log_consultas_lentas.warning("%.1f ms: %s | parâmetros: %r", duracao * 1000, " ".join(sql.split()), parametros)
+
+@contextlib.contextmanager
+def medir_consultas(fluxo):
+    """
+    Registra os comandos SQL executados no bloco e os soma às estatísticas do fluxo.
+    """
+    medicao = MedicaoConsultas(fluxo)
+    token = _medicoes_ativas.set(_medicoes_ativas.get() + (medicao,))
+    try:
+        yield medicao
+    finally:
+        _medicoes_ativas.reset(token)
+        estatisticas_consultas.acumular(medicao)
+
+# Máximo de consultas SQL de uma execução de cada fluxo, por agência (verificado por `orcamento_consultas`)
+ORCAMENTO_CONSULTAS = {
+    "depositar_flow": 7,
+    "sacar_flow": 7,
+    "transferir_flow": 14,
+    "exibir_extrato_flow": 5,
+    "cadastrar_usuario_flow": 2,
+    "criar_conta_flow": 5,
+    "listar_contas_flow": 1,
+    "listar_usuarios_flow": 1,
+    "buscar_usuarios_flow": 1,
+    "posicao_cliente_flow": 1,
+}
+
+class OrcamentoConsultasExcedido(AssertionError):
+    pass
+
+@contextlib.contextmanager
+def orcamento_consultas(fluxo, maximo=None):
+    """
+    Para testes: falha (OrcamentoConsultasExcedido) se o bloco executar mais
+    consultas que `maximo` (padrão: ORCAMENTO_CONSULTAS[fluxo]).
+        with orcamento_consultas("depositar_flow"):
+            depositar_flow()
+    """
+    maximo = ORCAMENTO_CONSULTAS[fluxo] if maximo is None else maximo
+    with medir_consultas(fluxo) as medicao:
+        yield medicao
+    if medicao.quantidade > maximo:
+        comandos = "\n".join(f"  {' '.join(sql.split())[:160]}" for _, sql in medicao.comandos)
+        raise OrcamentoConsultasExcedido(f"{fluxo}: {medicao.quantidade} consultas (máximo {maximo})\n{comandos}")
+
+def _medir_fluxo(fluxo):
+    def executar():
+        with medir_consultas(fluxo.__name__):
+            return fluxo()
+    return executar
+
+# --- Ordenação Comparável entre Agências ---
+
+class OrdemBinaria(FunctionElement):
+    # Coluna ordenada pelos códigos dos caracteres, a mesma ordem das strings em Python:
+    # as listagens de várias agências são intercaladas em Python (heapq.merge) e cada
+    # banco precisa entregar as linhas na ordem que o merge compara
+    inherit_cache = True
+
+@compiles(OrdemBinaria)
+def _compilar_ordem_binaria(elemento, compilador, **opcoes):
+    # A comparação padrão do SQLite já é binária
+    return compilador.process(elemento.clauses, **opcoes)
+
+@compiles(OrdemBinaria, "mssql")
+def _compilar_ordem_binaria_mssql(elemento, compilador, **opcoes):
+    return f"{compilador.process(elemento.clauses, **opcoes)} COLLATE Latin1_General_BIN2"
+
 # --- Definição das Classes (Mapeamento de Objetos para Tabelas) ---
 
+def normalizar_nome(nome):
+    # Sem acentos e sem diferença de maiúsculas/minúsculas ("José" == "jose")
+    decomposto = unicodedata.normalize("NFKD", nome)
+    return "".join(caractere for caractere in decomposto if not unicodedata.combining(caractere)).casefold()
+
+def _nome_normalizado_padrao(contexto):
+    return normalizar_nome(contexto.get_current_parameters()["nome"])
+
 class Cliente(Base):
     __tablename__ = "clientes"
     id = Column(Integer, primary_key=True)
     nome = Column(String(255), nullable=False)
+    # Preenchido a partir do nome em todo INSERT (inclusive em massa); indexado para busca por prefixo
+    nome_normalizado = Column(String(255), default=_nome_normalizado_padrao, index=True)
     data_nascimento = Column(DateTime)
     cpf = Column(String(14), nullable=False, unique=True)
     endereco = Column(String(255), nullable=False)
+    # Posição consolidada, mantida na mesma transação de cada movimentação e de cada nova conta
+    saldo_total = Column(Float, nullable=False, default=0.0)
+    quantidade_contas = Column(Integer, nullable=False, default=0)
+    saques_hoje = Column(Integer, nullable=False, default=0)
+    total_saques_hoje = Column(Float, nullable=False, default=0.0)
     contas = relationship("ContaCorrente", back_populates="cliente")
 
 class ContaCorrente(Base):
@@ -50,6 +359,223 @@ class Transacao(Base):
 
     conta = relationship("ContaCorrente", back_populates="transacoes")
 
+    # AUTOINCREMENT: sem ele o SQLite reaproveita os ids das transações mais novas depois
+    # de arquivadas, e o arquivamento seguinte colide com a chave de `transacoes_arquivo`
+    __table_args__ = (Index("ix_transacoes_conta_data", "conta_id", "data"), {"sqlite_autoincrement": True})
+
+class TransacaoArquivada(Base):
+    __tablename__ = "transacoes_arquivo"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    tipo = Column(String(50), nullable=False)
+    valor = Column(Float, nullable=False)
+    data = Column(DateTime, nullable=False)
+    conta_id = Column(Integer, ForeignKey("contas.id"))
+
+    __table_args__ = (Index("ix_transacoes_arquivo_conta_data", "conta_id", "data"),)
+
+class Arquivamento(Base):
+    __tablename__ = "arquivamento"
+    id = Column(Integer, primary_key=True)
+    corte = Column(DateTime, nullable=False)
+
+class ResumoDiario(Base):
+    __tablename__ = "resumo_diario"
+    conta_id = Column(Integer, ForeignKey("contas.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+    quantidade_depositos = Column(Integer, nullable=False, default=0)
+    total_depositos = Column(Float, nullable=False, default=0.0)
+    quantidade_saques = Column(Integer, nullable=False, default=0)
+    total_saques = Column(Float, nullable=False, default=0.0)
+    quantidade_transferencias_enviadas = Column(Integer, nullable=False, default=0)
+    total_transferencias_enviadas = Column(Float, nullable=False, default=0.0)
+    quantidade_transferencias_recebidas = Column(Integer, nullable=False, default=0)
+    total_transferencias_recebidas = Column(Float, nullable=False, default=0.0)
+    quantidade_juros = Column(Integer, nullable=False, default=0)
+    total_juros = Column(Float, nullable=False, default=0.0)
+    quantidade_tarifas = Column(Integer, nullable=False, default=0)
+    total_tarifas = Column(Float, nullable=False, default=0.0)
+    saldo_fechamento = Column(Float, nullable=False, default=0.0)
+
+# Efeito de cada tipo de transação no saldo e colunas do resumo diário que ele alimenta
+SINAL_TRANSACAO = {
+    "Deposito": 1, "Saque": -1, "TransferenciaEnviada": -1, "TransferenciaRecebida": 1, "Juros": 1, "Tarifa": -1,
+}
+COLUNAS_RESUMO = {
+    "Deposito": ("quantidade_depositos", "total_depositos"),
+    "Saque": ("quantidade_saques", "total_saques"),
+    "TransferenciaEnviada": ("quantidade_transferencias_enviadas", "total_transferencias_enviadas"),
+    "TransferenciaRecebida": ("quantidade_transferencias_recebidas", "total_transferencias_recebidas"),
+    "Juros": ("quantidade_juros", "total_juros"),
+    "Tarifa": ("quantidade_tarifas", "total_tarifas"),
+}
+
+# --- Comandos Pré-construídos ---
+# Construídos uma única vez com parâmetros vinculados: o SQLAlchemy reaproveita a forma
+# compilada do seu cache a cada execução, sem remontar a consulta em Python.
+
+_SELECIONAR_CLIENTE_POR_CPF = select(Cliente).where(Cliente.cpf == bindparam("cpf")).limit(1)
+# Prefixo como faixa [prefixo, sucessor do prefixo) sobre o índice de nome_normalizado
+# Clientes com o nome normalizado por último: é a chave da ordenação e da intercalação das agências
+_BUSCAR_CLIENTES_POR_PREFIXO = (
+    select(Cliente.nome, Cliente.cpf, Cliente.endereco, Cliente.nome_normalizado)
+    .where(Cliente.nome_normalizado >= bindparam("inicio"), Cliente.nome_normalizado < bindparam("fim"))
+    .order_by(OrdemBinaria(Cliente.nome_normalizado))
+    .limit(bindparam("limite"))
+)
+_LISTAR_CONTAS = (
+    select(ContaCorrente.agencia, ContaCorrente.numero, Cliente.nome, Cliente.cpf)
+    .join(Cliente)
+    .order_by(OrdemBinaria(ContaCorrente.numero))
+)
+_LISTAR_CLIENTES = (
+    select(Cliente.nome, Cliente.cpf, Cliente.endereco, Cliente.nome_normalizado)
+    .order_by(OrdemBinaria(Cliente.nome_normalizado))
+)
+_SELECIONAR_CONTA_DO_CLIENTE = (
+    select(ContaCorrente)
+    .where(ContaCorrente.numero == bindparam("numero"), ContaCorrente.cliente_id == bindparam("cliente_id"))
+    .limit(1)
+)
+_SELECIONAR_CONTA_POR_NUMERO = select(ContaCorrente).where(ContaCorrente.numero == bindparam("numero")).limit(1)
+# Bloqueia as linhas das contas sempre em ordem crescente de id: duas transferências
+# entre as mesmas contas nunca esperam uma pela outra em ordem inversa (sem deadlock)
+_BLOQUEAR_CONTAS = (
+    select(ContaCorrente.id)
+    .where(ContaCorrente.id.in_(bindparam("conta_ids", expanding=True)))
+    .order_by(ContaCorrente.id)
+    .with_for_update()
+)
+_CREDITAR_CONTA = (
+    update(ContaCorrente)
+    .where(ContaCorrente.id == bindparam("conta_id"))
+    .values(saldo=ContaCorrente.saldo + bindparam("valor"))
+    .execution_options(synchronize_session=False)
+)
+# Só debita se o saldo e o limite de saques ainda permitirem no momento do UPDATE
+_DEBITAR_SAQUE = (
+    update(ContaCorrente)
+    .where(
+        ContaCorrente.id == bindparam("conta_id"),
+        ContaCorrente.saldo >= bindparam("valor"),
+        ContaCorrente.numero_saques < ContaCorrente.limite_saques_diarios,
+    )
+    .values(saldo=ContaCorrente.saldo - bindparam("valor"), numero_saques=ContaCorrente.numero_saques + 1)
+    .execution_options(synchronize_session=False)
+)
+_DEBITAR_TRANSFERENCIA = (
+    update(ContaCorrente)
+    .where(ContaCorrente.id == bindparam("conta_id"), ContaCorrente.saldo >= bindparam("valor"))
+    .values(saldo=ContaCorrente.saldo - bindparam("valor"))
+    .execution_options(synchronize_session=False)
+)
+
+# Posição do cliente: soma a variação de saldo (e o saque, se for um) à linha do cliente
+_ATUALIZAR_POSICAO_CLIENTE = (
+    update(Cliente)
+    .where(Cliente.id == bindparam("cliente_id"))
+    .values(
+        saldo_total=Cliente.saldo_total + bindparam("variacao"),
+        saques_hoje=Cliente.saques_hoje + bindparam("saques"),
+        total_saques_hoje=Cliente.total_saques_hoje + bindparam("valor_saques"),
+    )
+    .execution_options(synchronize_session=False)
+)
+_CONTAR_NOVA_CONTA = (
+    update(Cliente.__table__)
+    .where(Cliente.__table__.c.id == bindparam("cliente_id"))
+    .values(
+        quantidade_contas=Cliente.__table__.c.quantidade_contas + 1,
+        saldo_total=Cliente.__table__.c.saldo_total + bindparam("saldo"),
+    )
+)
+
+@event.listens_for(ContaCorrente, "after_insert")
+def _contar_nova_conta(mapper, conexao, conta):
+    # Toda conta inserida pelo ORM entra na posição do cliente no mesmo flush
+    conexao.execute(_CONTAR_NOVA_CONTA, {"cliente_id": conta.cliente_id, "saldo": conta.saldo or 0.0})
+
+# --- Migração de Bancos Existentes ---
+# create_all só cria as tabelas que faltam: as colunas acrescentadas depois a tabelas que
+# já existem são criadas aqui, com ALTER TABLE, e preenchidas nas linhas antigas.
+
+def _preencher_nome_normalizado(conexao, tamanho_lote=10000):
+    # normalizar_nome não tem equivalente em SQL: lê os nomes em lotes e grava a forma normalizada
+    tabela = Cliente.__table__
+    preencher = (
+        update(tabela)
+        .where(tabela.c.id == bindparam("cliente_id"))
+        .values(nome_normalizado=bindparam("normalizado"))
+    )
+    ultimo_id = 0
+    while True:
+        linhas = conexao.execute(
+            select(tabela.c.id, tabela.c.nome).where(tabela.c.id > ultimo_id).order_by(tabela.c.id).limit(tamanho_lote)
+        ).all()
+        if not linhas:
+            return
+        conexao.execute(preencher, [{"cliente_id": cliente_id, "normalizado": normalizar_nome(nome)} for cliente_id, nome in linhas])
+        ultimo_id = linhas[-1][0]
+
+def _preencher_posicao_clientes(conexao):
+    recalcular_posicao_clientes(conexao)
+
+# (coluna, valor padrão das linhas existentes ou None, função que preenche as linhas existentes)
+COLUNAS_MIGRADAS = [
+    (Cliente.__table__.c.nome_normalizado, None, _preencher_nome_normalizado),
+    (Cliente.__table__.c.saldo_total, 0, _preencher_posicao_clientes),
+    (Cliente.__table__.c.quantidade_contas, 0, _preencher_posicao_clientes),
+    (Cliente.__table__.c.saques_hoje, 0, _preencher_posicao_clientes),
+    (Cliente.__table__.c.total_saques_hoje, 0, _preencher_posicao_clientes),
+]
+
+def _migrar_autoincremento_sqlite(conexao):
+    # `transacoes` criada sem AUTOINCREMENT por uma versão anterior: recria a tabela uma vez,
+    # com a sequência a partir do maior id já usado (inclusive pelas transações arquivadas)
+    if conexao.dialect.name != "sqlite":
+        return
+    tabela = Transacao.__table__
+    ddl = conexao.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :nome"), {"nome": tabela.name}
+    ).scalar()
+    if "AUTOINCREMENT" in ddl.upper():
+        return
+    anterior = f"{tabela.name}_sem_autoincremento"
+    conexao.execute(text(f"ALTER TABLE {tabela.name} RENAME TO {anterior}"))
+    for indice in tabela.indexes:
+        conexao.execute(text(f"DROP INDEX IF EXISTS {indice.name}"))
+    tabela.create(conexao)
+    colunas = ", ".join(coluna.name for coluna in tabela.columns)
+    conexao.execute(text(f"INSERT INTO {tabela.name} ({colunas}) SELECT {colunas} FROM {anterior}"))
+    conexao.execute(text(f"DROP TABLE {anterior}"))
+    maior_id = max(
+        conexao.scalar(select(func.coalesce(func.max(Transacao.id), 0))),
+        conexao.scalar(select(func.coalesce(func.max(TransacaoArquivada.id), 0))),
+    )
+    conexao.execute(text("DELETE FROM sqlite_sequence WHERE name = :nome"), {"nome": tabela.name})
+    conexao.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:nome, :seq)"), {"nome": tabela.name, "seq": maior_id})
+
+def migrar_tabelas(conexao):
+    # Acrescenta as colunas e os índices que faltam num banco criado por uma versão anterior
+    colunas_existentes = {}
+    preenchimentos = []
+    for coluna, padrao, preencher in COLUNAS_MIGRADAS:
+        tabela = coluna.table.name
+        if tabela not in colunas_existentes:
+            colunas_existentes[tabela] = {existente["name"] for existente in inspect(conexao).get_columns(tabela)}
+        if coluna.name in colunas_existentes[tabela]:
+            continue
+        tipo = coluna.type.compile(dialect=conexao.dialect)
+        restricao = "" if padrao is None else f" DEFAULT {padrao} NOT NULL"
+        conexao.execute(text(f"ALTER TABLE {tabela} ADD {coluna.name} {tipo}{restricao}"))
+        if preencher and preencher not in preenchimentos:
+            preenchimentos.append(preencher)
+    for preencher in preenchimentos:
+        preencher(conexao)
+    _migrar_autoincremento_sqlite(conexao)
+    for tabela in Base.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(conexao, checkfirst=True)
+
 # --- Classes de Negócio (Adaptadas para usar o ORM) ---
 
 class Historico:
@@ -58,17 +584,468 @@ class Historico:
 
     def adicionar_transacao(self, tipo, valor, session):
         try:
+            agora = datetime.datetime.now()
             nova_transacao = Transacao(
                 tipo=tipo,
                 valor=valor,
-                data=datetime.datetime.now(),
+                data=agora,
                 conta=self._conta
             )
             session.add(nova_transacao)
+            atualizar_resumo_diario(self._conta, tipo, valor, agora.date(), session)
+            atualizar_posicao_cliente(self._conta, tipo, valor, session)
         except Exception as e:
             print(f"Erro ao adicionar transação: {e}")
             session.rollback()
 
+# --- Resumo Diário (mantido na mesma transação de cada depósito/saque) ---
+
+def novo_resumo_diario(conta_id, dia):
+    resumo = ResumoDiario(conta_id=conta_id, dia=dia, saldo_fechamento=0.0)
+    for coluna_quantidade, coluna_total in COLUNAS_RESUMO.values():
+        setattr(resumo, coluna_quantidade, 0)
+        setattr(resumo, coluna_total, 0.0)
+    return resumo
+
+def atualizar_resumo_diario(conta, tipo, valor, dia, session):
+    resumo = session.get(ResumoDiario, (conta.id, dia))
+    if resumo is None:
+        resumo = novo_resumo_diario(conta.id, dia)
+        session.add(resumo)
+
+    coluna_quantidade, coluna_total = COLUNAS_RESUMO[tipo]
+    setattr(resumo, coluna_quantidade, getattr(resumo, coluna_quantidade) + 1)
+    setattr(resumo, coluna_total, getattr(resumo, coluna_total) + valor)
+    resumo.saldo_fechamento = conta.saldo
+    return resumo
+
+def atualizar_posicao_cliente(conta, tipo, valor, session):
+    saque = tipo == "Saque"
+    session.execute(_ATUALIZAR_POSICAO_CLIENTE, {
+        "cliente_id": conta.cliente_id,
+        "variacao": SINAL_TRANSACAO[tipo] * valor,
+        "saques": 1 if saque else 0,
+        "valor_saques": valor if saque else 0.0,
+    })
+
+def recalcular_posicao_clientes(session, dia=None):
+    # Refaz a posição de todos os clientes a partir das contas e do resumo do dia
+    # (usado pela reconstrução dos saldos e para preencher bancos já existentes)
+    dia = dia or datetime.date.today()
+    da_conta = ContaCorrente.cliente_id == Cliente.id
+    session.execute(
+        update(Cliente)
+        .values(
+            saldo_total=select(func.coalesce(func.sum(ContaCorrente.saldo), 0.0)).where(da_conta).scalar_subquery(),
+            quantidade_contas=select(func.count(ContaCorrente.id)).where(da_conta).scalar_subquery(),
+            saques_hoje=select(func.coalesce(func.sum(ContaCorrente.numero_saques), 0)).where(da_conta).scalar_subquery(),
+            total_saques_hoje=(
+                select(func.coalesce(func.sum(ResumoDiario.total_saques), 0.0))
+                .select_from(ResumoDiario)
+                .join(ContaCorrente, ContaCorrente.id == ResumoDiario.conta_id)
+                .where(da_conta, ResumoDiario.dia == dia)
+                .scalar_subquery()
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+def obter_resumo_diario(conta, session, dia=None):
+    return session.get(ResumoDiario, (conta.id, dia or datetime.date.today()))
+
+def _linha_resumo(resumo):
+    linha = {"conta_id": resumo.conta_id, "dia": resumo.dia, "saldo_fechamento": resumo.saldo_fechamento}
+    for coluna_quantidade, coluna_total in COLUNAS_RESUMO.values():
+        linha[coluna_quantidade] = getattr(resumo, coluna_quantidade)
+        linha[coluna_total] = getattr(resumo, coluna_total)
+    return linha
+
+def reconstruir_resumo_diario(session, contas_por_lote=1000):
+    # Recalcula todo o resumo a partir de `transacoes` (backfill). Cada lote de contas é
+    # percorrido em ordem cronológica para obter o saldo de fechamento de cada dia.
+    session.query(ResumoDiario).delete()
+    ids = [conta_id for (conta_id,) in session.query(ContaCorrente.id).order_by(ContaCorrente.id)]
+
+    total_linhas = 0
+    for inicio in range(0, len(ids), contas_por_lote):
+        primeiro, ultimo = ids[inicio], ids[min(inicio + contas_por_lote, len(ids)) - 1]
+        historico = selecionar_historico_completo().subquery()
+        transacoes = session.execute(
+            select(historico.c.conta_id, historico.c.tipo, historico.c.valor, historico.c.data)
+            .where(historico.c.conta_id.between(primeiro, ultimo))
+            .order_by(historico.c.conta_id, historico.c.data, historico.c.id)
+        ).all()
+
+        linhas = []
+        resumo = None
+        saldo = 0.0
+        for conta_id, tipo, valor, data in transacoes:
+            if resumo is None or resumo.conta_id != conta_id or resumo.dia != data.date():
+                if resumo is not None:
+                    linhas.append(_linha_resumo(resumo))
+                if resumo is None or resumo.conta_id != conta_id:
+                    saldo = 0.0
+                resumo = novo_resumo_diario(conta_id, data.date())
+
+            coluna_quantidade, coluna_total = COLUNAS_RESUMO[tipo]
+            setattr(resumo, coluna_quantidade, getattr(resumo, coluna_quantidade) + 1)
+            setattr(resumo, coluna_total, getattr(resumo, coluna_total) + valor)
+            saldo += SINAL_TRANSACAO[tipo] * valor
+            resumo.saldo_fechamento = saldo
+
+        if resumo is not None:
+            linhas.append(_linha_resumo(resumo))
+        if linhas:
+            session.execute(insert(ResumoDiario), linhas)
+            total_linhas += len(linhas)
+    return total_linhas
+
+# --- Arquivamento (transações antigas vão para a tabela fria `transacoes_arquivo`) ---
+
+def obter_corte_arquivamento(session):
+    return session.query(Arquivamento.corte).order_by(Arquivamento.id).limit(1).scalar()
+
+def _colunas_historico(tabela):
+    return (tabela.id, tabela.conta_id, tabela.tipo, tabela.valor, tabela.data)
+
+def selecionar_historico_completo():
+    return union_all(select(*_colunas_historico(Transacao)), select(*_colunas_historico(TransacaoArquivada)))
+
+def consultar_transacoes(conta, session, inicio=None):
+    # Só consulta o arquivo quando o período pedido alcança datas anteriores ao corte. Em
+    # ordem de id (de gravação): os ids só crescem e são mantidos no arquivo
+    def selecionar(tabela):
+        consulta = select(tabela.data, tabela.tipo, tabela.valor, tabela.id).where(tabela.conta_id == conta.id)
+        return consulta.where(tabela.data >= inicio) if inicio else consulta
+
+    corte = obter_corte_arquivamento(session)
+    if corte and (inicio is None or inicio < corte):
+        transacoes = union_all(selecionar(TransacaoArquivada), selecionar(Transacao)).subquery()
+        consulta = select(transacoes.c.data, transacoes.c.tipo, transacoes.c.valor).order_by(transacoes.c.id)
+    else:
+        consulta = selecionar(Transacao).with_only_columns(Transacao.data, Transacao.tipo, Transacao.valor).order_by(Transacao.id)
+    return session.execute(consulta).all()
+
+def arquivar_transacoes(corte, session_factory=None, tamanho_lote=1000):
+    # O corte é gravado antes de mover os dados: a partir daí os extratos que alcançam
+    # o período já consultam o arquivo, mesmo com o job ainda em andamento.
+    session_factory = session_factory or Session
+    session = session_factory()
+    try:
+        registro = session.query(Arquivamento).order_by(Arquivamento.id).first()
+        if registro is None:
+            session.add(Arquivamento(corte=corte))
+        elif registro.corte < corte:
+            registro.corte = corte
+        session.commit()
+    finally:
+        session.close()
+
+    # Cada lote é uma transação curta, para não segurar locks na tabela quente
+    total = 0
+    while True:
+        session = session_factory()
+        try:
+            ids = [
+                transacao_id for (transacao_id,) in
+                session.query(Transacao.id).filter(Transacao.data < corte).order_by(Transacao.id).limit(tamanho_lote)
+            ]
+            if not ids:
+                return total
+
+            session.execute(
+                insert(TransacaoArquivada).from_select(
+                    ["id", "conta_id", "tipo", "valor", "data"],
+                    select(*_colunas_historico(Transacao)).where(Transacao.id.in_(ids))
+                )
+            )
+            session.execute(delete(Transacao).where(Transacao.id.in_(ids)))
+            session.commit()
+            total += len(ids)
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+# --- Fechamento Diário (comandos em massa por faixa de contas) ---
+
+def fechamento_diario(session_factory=None, dia=None, contas_por_lote=1000):
+    # Para cada faixa de ids: grava o saldo de fechamento do dia no resumo (atualizando as
+    # linhas existentes e inserindo as que faltam) e zera os saques diários. Cada faixa é
+    # uma transação curta, para que os locks durem pouco.
+    session_factory = session_factory or Session
+    dia = dia or datetime.date.today()
+
+    colunas_zeradas = [coluna for colunas in COLUNAS_RESUMO.values() for coluna in colunas]
+    session = session_factory()
+    try:
+        menor_id, maior_id = session.query(func.min(ContaCorrente.id), func.max(ContaCorrente.id)).one()
+    finally:
+        session.close()
+    if menor_id is None:
+        return 0
+
+    total = 0
+    for inicio in range(menor_id, maior_id + 1, contas_por_lote):
+        fim = inicio + contas_por_lote - 1
+        session = session_factory()
+        try:
+            saldo_da_conta = select(ContaCorrente.saldo).where(ContaCorrente.id == ResumoDiario.conta_id).scalar_subquery()
+            session.execute(
+                update(ResumoDiario)
+                .where(ResumoDiario.dia == dia, ResumoDiario.conta_id.between(inicio, fim))
+                .values(saldo_fechamento=saldo_da_conta)
+                .execution_options(synchronize_session=False)
+            )
+            sem_resumo = ~exists().where(ResumoDiario.conta_id == ContaCorrente.id, ResumoDiario.dia == dia)
+            session.execute(
+                insert(ResumoDiario).from_select(
+                    ["conta_id", "dia", *colunas_zeradas, "saldo_fechamento"],
+                    select(
+                        ContaCorrente.id,
+                        literal(dia, Date),
+                        *[literal(0) for _ in colunas_zeradas],
+                        ContaCorrente.saldo,
+                    ).where(ContaCorrente.id.between(inicio, fim), sem_resumo)
+                )
+            )
+            resultado = session.execute(
+                update(ContaCorrente)
+                .where(ContaCorrente.id.between(inicio, fim))
+                .values(numero_saques=0)
+                .execution_options(synchronize_session=False)
+            )
+            session.execute(
+                update(Cliente)
+                .where(Cliente.id.in_(select(ContaCorrente.cliente_id).where(ContaCorrente.id.between(inicio, fim))))
+                .values(saques_hoje=0, total_saques_hoje=0.0)
+                .execution_options(synchronize_session=False)
+            )
+            session.commit()
+            total += resultado.rowcount
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return total
+
+# --- Reconstrução Paralela do Estado (saldos e contadores a partir do log de transações) ---
+
+def _dobrar_historico(conexao, inicio, fim, dia, tamanho_lote=10000):
+    # Percorre o histórico (quente + arquivo) da faixa de contas com cursor no servidor,
+    # sem materializar as linhas, e devolve {conta_id: (saldo, saques no dia)}.
+    historico = selecionar_historico_completo().subquery()
+    consulta = (
+        select(historico.c.conta_id, historico.c.tipo, historico.c.valor, historico.c.data)
+        .where(historico.c.conta_id.between(inicio, fim))
+        .order_by(historico.c.conta_id, historico.c.data, historico.c.id)
+    )
+    estado = {}
+    conta_atual, saldo, saques = None, 0.0, 0
+    for conta_id, tipo, valor, data in conexao.execution_options(yield_per=tamanho_lote).execute(consulta):
+        if conta_id != conta_atual:
+            if conta_atual is not None:
+                estado[conta_atual] = (saldo, saques)
+            conta_atual, saldo, saques = conta_id, 0.0, 0
+        saldo += SINAL_TRANSACAO[tipo] * valor
+        if tipo == "Saque" and data.date() == dia:
+            saques += 1
+    if conta_atual is not None:
+        estado[conta_atual] = (saldo, saques)
+    return estado
+
+def _dobrar_faixa(url, inicio, fim, dia):
+    # Executado nos processos trabalhadores: cada um abre o próprio engine
+    engine_faixa = criar_engine(url)
+    try:
+        with engine_faixa.connect() as conexao:
+            return _dobrar_historico(conexao, inicio, fim, dia)
+    finally:
+        engine_faixa.dispose()
+
+def _banco_em_memoria(url):
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def reconstruir_estado(session_factory=None, processos=None, dia=None, gravar=True,
+                       faixas_por_processo=4, contas_por_lote=1000):
+    # Divide as contas em faixas de id e refaz saldo e saques do dia de cada faixa em
+    # paralelo. O resultado {conta_id: (saldo, numero_saques)} é gravado em massa em
+    # `contas` (gravar=True) ou apenas devolvido para carregar um modelo em memória.
+    session_factory = session_factory or Session
+    processos = processos or PROCESSOS_RECONSTRUCAO
+    dia = dia or datetime.date.today()
+
+    session = session_factory()
+    try:
+        ids = list(session.scalars(select(ContaCorrente.id).order_by(ContaCorrente.id)))
+        if not ids:
+            return {}
+        tamanho = -(-len(ids) // (processos * faixas_por_processo))
+        faixas = [(ids[i], ids[min(i + tamanho, len(ids)) - 1]) for i in range(0, len(ids), tamanho)]
+        estado = dict.fromkeys(ids, (0.0, 0))
+
+        url = session.get_bind().url
+        if processos <= 1 or _banco_em_memoria(url):
+            conexao = session.connection()
+            for inicio, fim in faixas:
+                estado.update(_dobrar_historico(conexao, inicio, fim, dia))
+        else:
+            inicios, fins = zip(*faixas)
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                for parcial in executor.map(_dobrar_faixa, repeat(url.render_as_string(hide_password=False)), inicios, fins, repeat(dia)):
+                    estado.update(parcial)
+
+        if gravar:
+            linhas = [
+                {"id": conta_id, "saldo": saldo, "numero_saques": saques}
+                for conta_id, (saldo, saques) in estado.items()
+            ]
+            for inicio in range(0, len(linhas), contas_por_lote):
+                session.execute(update(ContaCorrente), linhas[inicio:inicio + contas_por_lote])
+            recalcular_posicao_clientes(session, dia)
+            session.commit()
+        return estado
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# --- Juros e Tarifas (lançamentos calculados em massa, por faixa de contas) ---
+
+def aplicar_juros_e_tarifas(taxa_juros, tarifa, saldo_minimo_isencao, session_factory=None, contas_por_lote=10000):
+    # Credita juros sobre os saldos positivos e debita a tarifa das contas com saldo abaixo
+    # do mínimo de isenção (e não menor que a tarifa: nenhum saldo fica negativo). Para cada faixa de ids, numa transação curta: os lançamentos
+    # são inseridos em `transacoes` com INSERT ... SELECT (a partir do saldo anterior), os
+    # saldos mudam com um único UPDATE e o resumo do dia soma o que foi lançado.
+    # Os lançamentos da execução são reconhecidos pelo id (acima do maior id existente
+    # antes da inserção), e não pela data: duas execuções no mesmo segundo não se somam.
+    # Retorna a quantidade de lançamentos por tipo.
+    session_factory = session_factory or Session
+    # Mesma data em todos os lançamentos da execução; a ordem no extrato vem do id
+    agora = datetime.datetime.now()
+    hoje = agora.date()
+    valores = {
+        "Juros": (ContaCorrente.saldo > 0, func.round(ContaCorrente.saldo * taxa_juros, 2)),
+        "Tarifa": ((ContaCorrente.saldo < saldo_minimo_isencao) & (ContaCorrente.saldo >= tarifa), literal(tarifa, Float)),
+    }
+
+    session = session_factory()
+    try:
+        menor_id, maior_id = session.query(func.min(ContaCorrente.id), func.max(ContaCorrente.id)).one()
+    finally:
+        session.close()
+    totais = dict.fromkeys(valores, 0)
+    if menor_id is None:
+        return totais
+
+    def lancado(tipo, agregado, conta_id):
+        return (
+            select(agregado)
+            .where(Transacao.conta_id == conta_id, desta_execucao, Transacao.tipo == tipo)
+            .scalar_subquery()
+        )
+
+    colunas_lancadas = [coluna for tipo in valores for coluna in COLUNAS_RESUMO[tipo]]
+    outras_colunas = [
+        coluna for tipo, colunas in COLUNAS_RESUMO.items() if tipo not in valores for coluna in colunas
+    ]
+    for inicio in range(menor_id, maior_id + 1, contas_por_lote):
+        fim = inicio + contas_por_lote - 1
+        session = session_factory()
+        try:
+            na_faixa = ContaCorrente.id.between(inicio, fim)
+            ultimo_id = session.scalar(select(func.coalesce(func.max(Transacao.id), 0)))
+            desta_execucao = Transacao.id > ultimo_id
+            for tipo, (condicao, valor) in valores.items():
+                resultado = session.execute(
+                    insert(Transacao).from_select(
+                        ["tipo", "valor", "data", "conta_id"],
+                        select(literal(tipo), valor, literal(agora, DateTime), ContaCorrente.id)
+                        .where(na_faixa, condicao, valor > 0)
+                    )
+                )
+                totais[tipo] += resultado.rowcount
+
+            condicao_juros, juros = valores["Juros"]
+            condicao_tarifa, _ = valores["Tarifa"]
+            session.execute(
+                update(ContaCorrente)
+                .where(na_faixa, condicao_juros | condicao_tarifa)
+                .values(saldo=ContaCorrente.saldo
+                        + case((condicao_juros, juros), else_=0.0)
+                        - case((condicao_tarifa, tarifa), else_=0.0))
+                .execution_options(synchronize_session=False)
+            )
+            # Posição dos clientes das contas da faixa: soma o que foi lançado nelas
+            lancado_ao_cliente = (
+                select(func.coalesce(func.sum(case((Transacao.tipo == "Juros", Transacao.valor), else_=-Transacao.valor)), 0.0))
+                .select_from(Transacao)
+                .join(ContaCorrente, ContaCorrente.id == Transacao.conta_id)
+                .where(ContaCorrente.cliente_id == Cliente.id, na_faixa, desta_execucao,
+                       Transacao.tipo.in_(list(valores)))
+                .scalar_subquery()
+            )
+            session.execute(
+                update(Cliente)
+                .where(Cliente.id.in_(select(ContaCorrente.cliente_id).where(na_faixa)))
+                .values(saldo_total=Cliente.saldo_total + lancado_ao_cliente)
+                .execution_options(synchronize_session=False)
+            )
+
+            # Resumo do dia: soma os lançamentos desta execução nas linhas existentes e
+            # cria as que faltam para as contas que receberam algum lançamento
+            com_lancamento = exists().where(Transacao.conta_id == ResumoDiario.conta_id, desta_execucao,
+                                            Transacao.tipo.in_(list(valores)))
+            alteracoes = {"saldo_fechamento": select(ContaCorrente.saldo).where(ContaCorrente.id == ResumoDiario.conta_id).scalar_subquery()}
+            for tipo in valores:
+                coluna_quantidade, coluna_total = COLUNAS_RESUMO[tipo]
+                alteracoes[coluna_quantidade] = getattr(ResumoDiario, coluna_quantidade) + lancado(tipo, func.count(), ResumoDiario.conta_id)
+                alteracoes[coluna_total] = getattr(ResumoDiario, coluna_total) + lancado(
+                    tipo, func.coalesce(func.sum(Transacao.valor), 0.0), ResumoDiario.conta_id
+                )
+            session.execute(
+                update(ResumoDiario)
+                .where(ResumoDiario.dia == hoje, ResumoDiario.conta_id.between(inicio, fim), com_lancamento)
+                .values(alteracoes)
+                .execution_options(synchronize_session=False)
+            )
+
+            sem_resumo = ~exists().where(ResumoDiario.conta_id == ContaCorrente.id, ResumoDiario.dia == hoje)
+            conta_com_lancamento = exists().where(Transacao.conta_id == ContaCorrente.id, desta_execucao,
+                                                  Transacao.tipo.in_(list(valores)))
+            lancados = []
+            for tipo in valores:
+                lancados += [
+                    lancado(tipo, func.count(), ContaCorrente.id),
+                    lancado(tipo, func.coalesce(func.sum(Transacao.valor), 0.0), ContaCorrente.id),
+                ]
+            session.execute(
+                insert(ResumoDiario).from_select(
+                    ["conta_id", "dia", *colunas_lancadas, *outras_colunas, "saldo_fechamento"],
+                    select(
+                        ContaCorrente.id,
+                        literal(hoje, Date),
+                        *lancados,
+                        *[literal(0) for _ in outras_colunas],
+                        ContaCorrente.saldo,
+                    ).where(na_faixa, sem_resumo, conta_com_lancamento)
+                )
+            )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+    return totais
+
+def ler_data_inicial(texto):
+    texto = (texto or "").strip()
+    return datetime.datetime.strptime(texto, "%Y-%m-%d") if texto else None
+
 class TransacaoBase(ABC):
     @property
     @abstractmethod
@@ -76,9 +1053,19 @@ class TransacaoBase(ABC):
         pass
 
     @abstractmethod
-    def registrar(self, conta, session):
+    def aplicar(self, conta, session):
+        # Grava a transação sem exibir nada; retorna (sucesso, mensagem)
         pass
 
+    def registrar(self, conta, session):
+        # Versão interativa de aplicar(): exibe o resultado
+        sucesso, mensagem = self.aplicar(conta, session)
+        print(f"\n=== {mensagem} ===" if sucesso else f"\n@@@ {mensagem} @@@")
+        return sucesso
+
+    def contas_envolvidas(self, conta_id):
+        return (conta_id,)
+
 class Deposito(TransacaoBase):
     def __init__(self, valor):
         if valor <= 0:
@@ -89,17 +1076,15 @@ class Deposito(TransacaoBase):
     def valor(self):
         return self._valor
 
-    def registrar(self, conta, session):
+    def aplicar(self, conta, session):
         try:
-            conta.saldo += self.valor
-            session.add(conta)
+            session.execute(_CREDITAR_CONTA, {"conta_id": conta.id, "valor": self.valor})
+            set_committed_value(conta, "saldo", conta.saldo + self.valor)
             conta.historico.adicionar_transacao("Deposito", self.valor, session)
-            print("\n=== Depósito realizado com sucesso! ===")
-            return True
+            return True, "Depósito realizado com sucesso!"
         except Exception as e:
-            print(f"Erro ao registrar depósito: {e}")
             session.rollback()
-            return False
+            return False, f"Erro ao registrar depósito: {e}"
 
 class Saque(TransacaoBase):
     def __init__(self, valor):
@@ -111,143 +1096,772 @@ class Saque(TransacaoBase):
     def valor(self):
         return self._valor
 
-    def registrar(self, conta, session):
+    def motivo_recusa(self, conta):
+        excedeu_saldo = self.valor > conta.saldo
+        excedeu_limite = self.valor > conta.limite_saque
+        excedeu_saques = conta.numero_saques >= conta.limite_saques_diarios
+
+        if excedeu_saldo:
+            return "Operação falhou! Você não tem saldo suficiente."
+        elif excedeu_limite:
+            return "Operação falhou! O valor do saque excede o limite."
+        elif excedeu_saques:
+            return "Operação falhou! Número máximo de saques diários excedido."
+        return None
+
+    def aplicar(self, conta, session):
         try:
-            excedeu_saldo = self.valor > conta.saldo
-            excedeu_limite = self.valor > conta.limite_saque
-            excedeu_saques = conta.numero_saques >= conta.limite_saques_diarios
-
-            if excedeu_saldo:
-                print("\n@@@ Operação falhou! Você não tem saldo suficiente. @@@")
-            elif excedeu_limite:
-                print("\n@@@ Operação falhou! O valor do saque excede o limite. @@@")
-            elif excedeu_saques:
-                print("\n@@@ Operação falhou! Número máximo de saques diários excedido. @@@")
-            else:
-                conta.saldo -= self.valor
-                conta.numero_saques += 1
-                session.add(conta)
-                conta.historico.adicionar_transacao("Saque", self.valor, session)
-                print("\n=== Saque realizado com sucesso! ===")
-                return True
-            return False
+            motivo = self.motivo_recusa(conta)
+            if motivo:
+                return False, motivo
+
+            resultado = session.execute(_DEBITAR_SAQUE, {"conta_id": conta.id, "valor": self.valor})
+            if resultado.rowcount == 0:
+                # Outra operação alterou a conta entre a leitura e o UPDATE
+                return False, "Operação falhou! O saldo da conta foi alterado, tente novamente."
+            set_committed_value(conta, "saldo", conta.saldo - self.valor)
+            set_committed_value(conta, "numero_saques", conta.numero_saques + 1)
+            conta.historico.adicionar_transacao("Saque", self.valor, session)
+            return True, "Saque realizado com sucesso!"
         except Exception as e:
-            print(f"Erro ao registrar saque: {e}")
             session.rollback()
+            return False, f"Erro ao registrar saque: {e}"
+
+class Transferencia(TransacaoBase):
+    def __init__(self, valor, conta_destino_id):
+        if valor <= 0:
+            raise ValueError("O valor da transferência deve ser positivo.")
+        self._valor = valor
+        self.conta_destino_id = conta_destino_id
+
+    @property
+    def valor(self):
+        return self._valor
+
+    def contas_envolvidas(self, conta_id):
+        return (conta_id, self.conta_destino_id)
+
+    def motivo_recusa(self, conta):
+        if conta.id == self.conta_destino_id:
+            return "Operação falhou! A conta de destino deve ser diferente da conta de origem."
+        elif self.valor > conta.saldo:
+            return "Operação falhou! Você não tem saldo suficiente."
+        return None
+
+    def aplicar(self, conta, session):
+        try:
+            motivo = self.motivo_recusa(conta)
+            if motivo:
+                return False, motivo
+
+            # Débito e crédito na mesma transação, com as duas linhas bloqueadas em ordem de id
+            session.execute(_BLOQUEAR_CONTAS, {"conta_ids": [conta.id, self.conta_destino_id]}).all()
+            destino = session.get(ContaCorrente, self.conta_destino_id)
+            if destino is None:
+                return False, "Conta de destino não encontrada!"
+
+            resultado = session.execute(_DEBITAR_TRANSFERENCIA, {"conta_id": conta.id, "valor": self.valor})
+            if resultado.rowcount == 0:
+                return False, "Operação falhou! O saldo da conta foi alterado, tente novamente."
+            session.execute(_CREDITAR_CONTA, {"conta_id": destino.id, "valor": self.valor})
+            set_committed_value(conta, "saldo", conta.saldo - self.valor)
+            set_committed_value(destino, "saldo", destino.saldo + self.valor)
+            conta.historico.adicionar_transacao("TransferenciaEnviada", self.valor, session)
+            destino.historico.adicionar_transacao("TransferenciaRecebida", self.valor, session)
+            return True, "Transferência realizada com sucesso!"
+        except Exception as e:
+            session.rollback()
+            return False, f"Erro ao registrar transferência: {e}"
+
+def transferir_em_lote(transferencias, session_factory=None, contas_por_lote=1000):
+    # Compensa as transferências (conta_origem_id, conta_destino_id, valor) em uma única
+    # variação por conta e aplica todas em uma transação: cada conta é bloqueada (em ordem
+    # de id), atualizada e registrada no histórico uma só vez, com o valor líquido do lote.
+    # Se alguma conta ficaria negativa, nada é gravado. Retorna {conta_id: variação}.
+    variacoes = {}
+    for origem_id, destino_id, valor in transferencias:
+        if valor <= 0:
+            raise ValueError("O valor da transferência deve ser positivo.")
+        if origem_id == destino_id:
+            raise ValueError("A conta de destino deve ser diferente da conta de origem.")
+        variacoes[origem_id] = variacoes.get(origem_id, 0.0) - valor
+        variacoes[destino_id] = variacoes.get(destino_id, 0.0) + valor
+    variacoes = {conta_id: variacao for conta_id, variacao in variacoes.items() if variacao}
+    if not variacoes:
+        return {}
+
+    session = (session_factory or Session)()
+    hoje = datetime.date.today()
+    try:
+        # Contas e resumos do dia vão para o mapa de identidade antes de qualquer alteração
+        ids = sorted(variacoes)
+        contas = {}
+        com_resumo = set()
+        for inicio in range(0, len(ids), contas_por_lote):
+            faixa = ids[inicio:inicio + contas_por_lote]
+            contas.update(
+                (conta.id, conta) for conta in session.scalars(
+                    select(ContaCorrente).where(ContaCorrente.id.in_(faixa)).order_by(ContaCorrente.id).with_for_update()
+                )
+            )
+            com_resumo.update(
+                resumo.conta_id for resumo in session.scalars(
+                    select(ResumoDiario).where(ResumoDiario.conta_id.in_(faixa), ResumoDiario.dia == hoje)
+                )
+            )
+
+        faltantes = [conta_id for conta_id in ids if conta_id not in contas]
+        if faltantes:
+            raise ValueError(f"Conta(s) não encontrada(s): {faltantes[:10]}")
+        insuficientes = [contas[conta_id].numero for conta_id in ids if contas[conta_id].saldo + variacoes[conta_id] < 0]
+        if insuficientes:
+            raise ValueError(f"Saldo insuficiente para o lote na(s) conta(s): {', '.join(insuficientes[:10])}")
+
+        session.add_all(novo_resumo_diario(conta_id, hoje) for conta_id in ids if conta_id not in com_resumo)
+        session.flush()
+        with session.no_autoflush:
+            for conta_id in ids:
+                conta, variacao = contas[conta_id], variacoes[conta_id]
+                conta.saldo = conta.saldo + variacao
+                tipo = "TransferenciaRecebida" if variacao > 0 else "TransferenciaEnviada"
+                conta.historico.adicionar_transacao(tipo, abs(variacao), session)
+        session.commit()
+        return variacoes
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+# --- Escrita em Grupo (group commit) ---
+
+class OperacaoPendente:
+    def __init__(self, conta_id, transacao):
+        self.conta_id = conta_id
+        self.transacao = transacao
+        self.sucesso = None
+        self.erro = None
+        self._concluida = threading.Event()
+
+    def concluir(self, sucesso=None, erro=None):
+        self.sucesso = sucesso
+        self.erro = erro
+        self._concluida.set()
+
+    def resultado(self, timeout=None):
+        if not self._concluida.wait(timeout):
+            raise TimeoutError("A operação não foi confirmada a tempo.")
+        if self.erro:
+            raise self.erro
+        return self.sucesso
+
+class EscritorEmGrupo:
+    # Um único thread aplica as operações validadas de vários produtores e confirma todas
+    # com um só commit a cada `max_operacoes` ou `intervalo_ms`; cada produtor só recebe a
+    # resposta depois que esse commit foi gravado.
+    def __init__(self, session_factory=None, max_operacoes=GRUPO_MAX_OPERACOES, intervalo_ms=GRUPO_INTERVALO_MS):
+        self._session_factory = session_factory or Session
+        self._max_operacoes = max_operacoes
+        self._intervalo = intervalo_ms / 1000
+        self._fila = queue.Queue()
+        self._thread = None
+        self._parar = threading.Event()
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._executar, name="escritor-em-grupo", daemon=True)
+        self._thread.start()
+        return self
+
+    def parar(self):
+        self._parar.set()
+        if self._thread:
+            self._thread.join()
+
+    def submeter(self, conta_id, transacao):
+        operacao = OperacaoPendente(conta_id, transacao)
+        self._fila.put(operacao)
+        return operacao
+
+    def _executar(self):
+        while not (self._parar.is_set() and self._fila.empty()):
+            try:
+                lote = [self._fila.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+
+            prazo = time.monotonic() + self._intervalo
+            while len(lote) < self._max_operacoes:
+                restante = prazo - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    lote.append(self._fila.get(timeout=restante))
+                except queue.Empty:
+                    break
+            self._gravar(lote)
+
+    def _gravar(self, lote):
+        session = self._session_factory()
+        resultados = []
+        try:
+            # Carrega de uma vez as contas e os resumos do dia do lote no mapa de identidade,
+            # para que cada operação não precise de consultas (e autoflush) próprias
+            conta_ids = {
+                conta_id for operacao in lote for conta_id in operacao.transacao.contas_envolvidas(operacao.conta_id)
+            }
+            hoje = datetime.date.today()
+            contas = session.query(ContaCorrente).filter(ContaCorrente.id.in_(conta_ids)).all()
+            resumos = session.query(ResumoDiario).filter(
+                ResumoDiario.conta_id.in_(conta_ids), ResumoDiario.dia == hoje
+            ).all()
+            com_resumo = {resumo.conta_id for resumo in resumos}
+            for conta in contas:
+                if conta.id not in com_resumo:
+                    resumo = novo_resumo_diario(conta.id, hoje)
+                    resumo.saldo_fechamento = conta.saldo
+                    session.add(resumo)
+            session.flush()
+
+            # Sem autoflush, as transações pendentes do lote são inseridas juntas no commit
+            with session.no_autoflush:
+                for operacao in lote:
+                    conta = session.get(ContaCorrente, operacao.conta_id)
+                    transacao_atual = session.get_transaction()
+                    sucesso = conta is not None and operacao.transacao.registrar(conta, session)
+                    if session.get_transaction() is not transacao_atual:
+                        # registrar() desfez a transação: as operações anteriores do lote se perderam
+                        resultados = [False] * len(resultados)
+                    resultados.append(sucesso)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            for operacao in lote:
+                operacao.concluir(erro=e)
+        else:
+            for operacao, sucesso in zip(lote, resultados):
+                operacao.concluir(sucesso=sucesso)
+        finally:
+            session.close()
+
+escritor_em_grupo = None
+
+def efetivar_transacao(transacao, conta, session):
+    if escritor_em_grupo is not None:
+        # Libera a sessão de leitura e aguarda o commit compartilhado
+        conta_id = conta.id
+        session.rollback()
+        return escritor_em_grupo.submeter(conta_id, transacao).resultado()
+
+    sucesso = transacao.registrar(conta, session)
+    if sucesso:
+        session.commit()
+    else:
+        session.rollback()
+    return sucesso
+
+# --- Projeção de Leitura (CQRS) ---
+
+class ProjecaoLeitura:
+    # Modelo de leitura em memória: carregado uma vez das tabelas e mantido pelos eventos
+    # das sessões confirmadas (clientes, contas e transações gravados). Operações em massa
+    # que não passam pelo ORM são cobertas pela atualização após `idade_maxima` segundos,
+    # que relê clientes e contas e só as transações com id acima da última carregada.
+    def __init__(self, session_factory=None, transacoes_recentes=PROJECAO_TRANSACOES_RECENTES,
+                 idade_maxima=PROJECAO_IDADE_MAXIMA_S):
+        self._session_factory = session_factory or Session
+        self._transacoes_recentes = transacoes_recentes
+        self._idade_maxima = idade_maxima
+        self._lock = threading.RLock()
+        self._clientes = {}
+        self._contas = {}
+        self._recentes = {}
+        self._quantidade_transacoes = {}
+        self._ultimo_id = 0
+        self._ids_aplicados = set()  # transações acima de _ultimo_id já aplicadas pelos eventos
+        # Listagens já ordenadas (None: montar na próxima leitura), com as chaves de ordenação
+        # para inserir clientes e contas novos por busca binária. Cada inserção troca a lista
+        # por uma nova (cópia na escrita), então a lista entregue a um leitor nunca muda
+        self._listagem_contas, self._numeros_listados = None, []
+        self._listagem_clientes, self._nomes_listados = None, []
+        self._carregada_em = 0.0
+
+    def ativar(self):
+        self.recarregar()
+        event.listen(self._session_factory, "after_flush", self._capturar_eventos)
+        event.listen(self._session_factory, "after_commit", self._aplicar_eventos)
+        event.listen(self._session_factory, "after_soft_rollback", self._descartar_eventos)
+        return self
+
+    def desativar(self):
+        event.remove(self._session_factory, "after_flush", self._capturar_eventos)
+        event.remove(self._session_factory, "after_commit", self._aplicar_eventos)
+        event.remove(self._session_factory, "after_soft_rollback", self._descartar_eventos)
+
+    def _ler_clientes_e_contas(self, session):
+        clientes = {
+            cliente_id: [nome, cpf, endereco]
+            for cliente_id, nome, cpf, endereco in session.query(Cliente.id, Cliente.nome, Cliente.cpf, Cliente.endereco)
+        }
+        contas = {
+            conta_id: [agencia, numero, saldo, cliente_id]
+            for conta_id, agencia, numero, saldo, cliente_id in session.query(
+                ContaCorrente.id, ContaCorrente.agencia, ContaCorrente.numero, ContaCorrente.saldo, ContaCorrente.cliente_id
+            )
+        }
+        return clientes, contas
+
+    def _ler_transacoes(self, session, desde_id):
+        # Transações com id acima de `desde_id`, em ordem; os ids só crescem (AUTOINCREMENT)
+        consulta = (
+            session.query(Transacao.id, Transacao.conta_id, Transacao.data, Transacao.tipo, Transacao.valor)
+            .filter(Transacao.id > desde_id)
+            .order_by(Transacao.id)
+        )
+        return consulta.yield_per(10000)
+
+    def recarregar(self):
+        session = self._session_factory()
+        try:
+            clientes, contas = self._ler_clientes_e_contas(session)
+            recentes = {}
+            quantidade = {}
+            ultimo_id = 0
+            for ultimo_id, conta_id, data, tipo, valor in self._ler_transacoes(session, 0):
+                recentes.setdefault(conta_id, deque(maxlen=self._transacoes_recentes)).append((data, tipo, valor))
+                quantidade[conta_id] = quantidade.get(conta_id, 0) + 1
+            if obter_corte_arquivamento(session):
+                # Contas com histórico arquivado nunca têm o extrato completo na projeção
+                for (conta_id,) in session.query(TransacaoArquivada.conta_id).distinct():
+                    quantidade[conta_id] = quantidade.get(conta_id, 0) + self._transacoes_recentes + 1
+        finally:
+            session.close()
+
+        with self._lock:
+            self._clientes, self._contas = clientes, contas
+            self._recentes, self._quantidade_transacoes = recentes, quantidade
+            self._ultimo_id = ultimo_id
+            self._ids_aplicados = set()
+            self._listagem_contas = self._listagem_clientes = None
+            self._carregada_em = time.monotonic()
+
+    def atualizar(self):
+        # Clientes e contas (saldos alterados em massa) são relidos por inteiro; das
+        # transações, só as novas que ainda não chegaram pelos eventos
+        session = self._session_factory()
+        try:
+            clientes, contas = self._ler_clientes_e_contas(session)
+            with self._lock:
+                desde_id = self._ultimo_id
+            novas = list(self._ler_transacoes(session, desde_id))
+        finally:
+            session.close()
+
+        with self._lock:
+            self._clientes, self._contas = clientes, contas
+            self._listagem_contas = self._listagem_clientes = None
+            for transacao_id, conta_id, data, tipo, valor in novas:
+                if transacao_id in self._ids_aplicados:
+                    continue
+                self._recentes.setdefault(conta_id, deque(maxlen=self._transacoes_recentes)).append((data, tipo, valor))
+                self._quantidade_transacoes[conta_id] = self._quantidade_transacoes.get(conta_id, 0) + 1
+            if novas:
+                self._ultimo_id = max(self._ultimo_id, novas[-1][0])
+                self._ids_aplicados = {transacao_id for transacao_id in self._ids_aplicados if transacao_id > self._ultimo_id}
+            self._carregada_em = time.monotonic()
+
+    def _recarregar_se_antiga(self):
+        if time.monotonic() - self._carregada_em > self._idade_maxima:
+            self.atualizar()
+
+    def _capturar_eventos(self, session, contexto_flush):
+        # Copia os valores no flush: depois do commit os objetos estão expirados
+        eventos = session.info.setdefault("eventos_projecao", [])
+        for objeto in session.new:
+            if isinstance(objeto, Cliente):
+                eventos.append(("cliente", objeto.id, [objeto.nome, objeto.cpf, objeto.endereco]))
+            elif isinstance(objeto, ContaCorrente):
+                eventos.append(("conta", objeto.id, [objeto.agencia, objeto.numero, objeto.saldo or 0.0, objeto.cliente_id]))
+            elif isinstance(objeto, Transacao):
+                eventos.append(("transacao", objeto.conta_id, (objeto.id, (objeto.data, objeto.tipo, objeto.valor))))
+
+    def _descartar_eventos(self, session, transacao_anterior):
+        if transacao_anterior.parent is None:
+            session.info.pop("eventos_projecao", None)
+
+    def _aplicar_eventos(self, session):
+        eventos = session.info.pop("eventos_projecao", None)
+        if not eventos:
+            return
+        with self._lock:
+            for tipo_evento, chave, dados in eventos:
+                if tipo_evento == "cliente":
+                    self._clientes[chave] = dados
+                    self._listar_cliente_novo(dados)
+                elif tipo_evento == "conta":
+                    self._contas[chave] = dados
+                    self._listar_conta_nova(dados)
+                else:
+                    transacao_id, dados = dados
+                    if transacao_id <= self._ultimo_id:
+                        # Já lida por uma atualização, com o saldo da conta
+                        continue
+                    self._ids_aplicados.add(transacao_id)
+                    data, tipo, valor = dados
+                    conta = self._contas.get(chave)
+                    if conta is not None:
+                        conta[2] += SINAL_TRANSACAO.get(tipo, 0) * valor
+                    self._recentes.setdefault(chave, deque(maxlen=self._transacoes_recentes)).append(dados)
+                    self._quantidade_transacoes[chave] = self._quantidade_transacoes.get(chave, 0) + 1
+
+    @staticmethod
+    def _inserir_ordenado(chaves, lista, chave, item):
+        posicao = bisect_right(chaves, chave)
+        chaves.insert(posicao, chave)
+        return lista[:posicao] + [item] + lista[posicao:]
+
+    def _listar_cliente_novo(self, cliente):
+        if self._listagem_clientes is not None:
+            self._listagem_clientes = self._inserir_ordenado(
+                self._nomes_listados, self._listagem_clientes, normalizar_nome(cliente[0]), tuple(cliente)
+            )
+
+    def _listar_conta_nova(self, conta):
+        agencia, numero, _, cliente_id = conta
+        cliente = self._clientes.get(cliente_id)
+        if cliente is None:
+            # O cliente chega no mesmo commit: a listagem é remontada na próxima leitura
+            self._listagem_contas = None
+        elif self._listagem_contas is not None:
+            self._listagem_contas = self._inserir_ordenado(
+                self._numeros_listados, self._listagem_contas, numero, (agencia, numero, cliente[0], cliente[1])
+            )
+
+    def listar_contas(self):
+        # Lista compartilhada entre os leitores: não deve ser alterada
+        self._recarregar_se_antiga()
+        with self._lock:
+            if self._listagem_contas is None:
+                contas = sorted(
+                    (numero, (agencia, numero, self._clientes[cliente_id][0], self._clientes[cliente_id][1]))
+                    for agencia, numero, _, cliente_id in self._contas.values()
+                    if cliente_id in self._clientes
+                )
+                self._numeros_listados = [numero for numero, _ in contas]
+                self._listagem_contas = [conta for _, conta in contas]
+            return self._listagem_contas
+
+    def listar_clientes(self):
+        # Lista compartilhada entre os leitores: não deve ser alterada
+        self._recarregar_se_antiga()
+        with self._lock:
+            if self._listagem_clientes is None:
+                clientes = sorted(
+                    ((normalizar_nome(cliente[0]), tuple(cliente)) for cliente in self._clientes.values()),
+                    key=lambda par: par[0],
+                )
+                self._nomes_listados = [nome for nome, _ in clientes]
+                self._listagem_clientes = [cliente for _, cliente in clientes]
+            return self._listagem_clientes
+
+    def saldo(self, conta_id):
+        self._recarregar_se_antiga()
+        with self._lock:
+            conta = self._contas.get(conta_id)
+            return conta[2] if conta else None
+
+    def transacoes(self, conta_id, inicio=None):
+        # Devolve None quando o período pedido vai além das transações mantidas em memória
+        self._recarregar_se_antiga()
+        with self._lock:
+            recentes = list(self._recentes.get(conta_id, ()))
+            completo = self._quantidade_transacoes.get(conta_id, 0) <= len(recentes)
+        if not completo and (inicio is None or not recentes or inicio < recentes[0][0]):
+            return None
+        return [transacao for transacao in recentes if inicio is None or transacao[0] >= inicio]
+
+projecao_leitura = None
+
+# --- Controle de Admissão ---
+
+def criar_controle_admissao():
+    return ControleAdmissao(ADMISSAO_TAXA_CPF, ADMISSAO_RAJADA_CPF, ADMISSAO_EM_ANDAMENTO, ADMISSAO_ESPERA_MS / 1000)
+
+controle_admissao = None
+
+def admitir_operacao(cpf):
+    # Sem controle configurado, tudo é admitido; uma operação recusada não toca o banco
+    if controle_admissao is None:
+        return True
+    codigo = controle_admissao.admitir(cpf)
+    if codigo != ADMITIDA:
+        print(f"\n@@@ Operação recusada ({codigo}): {MENSAGENS[codigo]} @@@")
+        return False
+    return True
+
+def liberar_operacao():
+    if controle_admissao is not None:
+        controle_admissao.liberar()
+
+# --- Agendador de Relatórios ---
+
+def criar_agendador():
+    return Agendador(RELATORIOS_SIMULTANEOS, RELATORIOS_PAUSA_MAXIMA_MS / 1000)
+
+agendador = None
+
+def executar_relatorio(nome, blocos, erro, ao_concluir=None):
+    # Sem agendador o relatório é impresso na hora; com ele, roda em segundo plano
+    # e é exibido entre as próximas operações. `ao_concluir` só é usado com o
+    # agendador: é chamado quando o relatório termina, com ou sem erro
+    if agendador is None:
+        try:
+            for bloco in blocos:
+                print(bloco, end="")
+        except Exception as e:
+            print(f"{erro}: {e}")
             return False
+        return
+    futuro = agendador.submeter_relatorio(nome, blocos, erro)
+    if ao_concluir is not None:
+        futuro.add_done_callback(lambda _futuro: ao_concluir())
+    print(f"\n=== {nome} em preparação; será exibido assim que ficar pronto. ===")
+
+def exibir_relatorios_prontos():
+    if agendador is None:
+        return
+    for nome, texto in agendador.prontos():
+        print(f"\n=== {nome} ===")
+        print(texto[:-1] if texto.endswith("\n") else texto)
+
+def _como_interativa(fluxo):
+    # Operações do menu têm prioridade sobre os relatórios; ao terminar, exibem os que ficaram prontos
+    def executar():
+        try:
+            with agendador.operacao_interativa():
+                return fluxo()
+        finally:
+            exibir_relatorios_prontos()
+    return executar
 
 # --- Funções de Fluxo (Atualizadas para usar o ORM) ---
 
 def filtrar_cliente(cpf, session):
-    return session.query(Cliente).filter_by(cpf=cpf).first()
+    return session.execute(_SELECIONAR_CLIENTE_POR_CPF, {"cpf": cpf}).scalars().first()
 
 def filtrar_conta(cliente, numero_conta, session):
-    return session.query(ContaCorrente).filter_by(numero=numero_conta, cliente=cliente).first()
+    return session.execute(
+        _SELECIONAR_CONTA_DO_CLIENTE, {"numero": numero_conta, "cliente_id": cliente.id}
+    ).scalars().first()
+
+def proximo_numero_conta(session, primeiro=1, passo=1):
+    ultima_conta = session.query(ContaCorrente).order_by(ContaCorrente.id.desc()).first()
+    if ultima_conta:
+        return str(int(ultima_conta.numero) + passo).zfill(4)
+    return str(primeiro).zfill(4)
+
+def faixa_do_prefixo(prefixo):
+    # "jo" -> ("jo", "jp"): todos os nomes que começam com o prefixo ficam na faixa
+    inicio = normalizar_nome(prefixo)
+    if not inicio:
+        raise ValueError("Informe ao menos uma letra do nome.")
+    return {"inicio": inicio, "fim": inicio[:-1] + chr(ord(inicio[-1]) + 1)}
+
+def buscar_clientes_por_prefixo(prefixo, session, limite=10):
+    return session.execute(_BUSCAR_CLIENTES_POR_PREFIXO, {**faixa_do_prefixo(prefixo), "limite": limite}).all()
+
+def blocos_extrato(cliente, conta, session, inicio=None, tamanho_bloco=1000):
+    # O extrato em blocos de texto: cabeçalho, movimentações de `tamanho_bloco` em
+    # `tamanho_bloco` e rodapé; "".join(blocos) é o extrato completo
+    yield "\n".join([
+        "\n=============== EXTRATO ===============",
+        f"Agência:\t{conta.agencia}",
+        f"Conta:\t\t{conta.numero}",
+        f"Cliente:\t{cliente.nome}",
+    ]) + "\n"
+
+    # A projeção de leitura atende extratos recentes; senão, transações recentes vêm da
+    # tabela quente e o arquivo só entra se o período alcançá-lo
+    transacoes = projecao_leitura.transacoes(conta.id, inicio) if projecao_leitura else None
+    if transacoes is None:
+        transacoes = consultar_transacoes(conta, session, inicio)
+    if not transacoes:
+        yield "Não foram realizadas movimentações."
+    for posicao in range(0, len(transacoes), tamanho_bloco):
+        yield "".join(
+            f"{data.strftime('%d/%m/%Y %H:%M:%S')} - {tipo}: R$ {valor:.2f}\n"
+            for data, tipo, valor in transacoes[posicao:posicao + tamanho_bloco]
+        )
+
+    linhas = [f"\nSaldo atual:\t R$ {conta.saldo:.2f}"]
+    resumo = obter_resumo_diario(conta, session)
+    if resumo:
+        linhas.append(f"Hoje:\t\t {resumo.quantidade_depositos} depósito(s) R$ {resumo.total_depositos:.2f}"
+                      f" | {resumo.quantidade_saques} saque(s) R$ {resumo.total_saques:.2f}")
+        if resumo.quantidade_transferencias_enviadas or resumo.quantidade_transferencias_recebidas:
+            linhas.append(f"\t\t {resumo.quantidade_transferencias_enviadas} transferência(s) enviada(s) R$ {resumo.total_transferencias_enviadas:.2f}"
+                          f" | {resumo.quantidade_transferencias_recebidas} recebida(s) R$ {resumo.total_transferencias_recebidas:.2f}")
+        if resumo.quantidade_juros or resumo.quantidade_tarifas:
+            linhas.append(f"\t\t Juros R$ {resumo.total_juros:.2f} | {resumo.quantidade_tarifas} tarifa(s) R$ {resumo.total_tarifas:.2f}")
+    linhas.append("=======================================")
+    yield "\n" + "\n".join(linhas)
+
+def montar_extrato(cliente, conta, session, inicio=None):
+    return "".join(blocos_extrato(cliente, conta, session, inicio))
+
+def _blocos_extrato_em_segundo_plano(cpf, conta_id, inicio):
+    # Roda na thread do agendador: carrega cliente e conta na própria sessão
+    session = roteador.session_do_cpf(cpf)
+    try:
+        conta = session.get(ContaCorrente, conta_id)
+        yield from blocos_extrato(conta.cliente, conta, session, inicio)
+    finally:
+        session.close()
 
 def depositar_flow():
-    session = Session()
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    if not admitir_operacao(cpf):
+        return False
+    session = roteador.session_do_cpf(cpf)
     try:
-        cpf = input("Informe o CPF do cliente (somente números): ")
         cliente = filtrar_cliente(cpf, session)
 
         if not cliente:
             print("\n@@@ Cliente não encontrado! @@@")
-            return
+            return False
 
         num_conta = input("Informe o número da conta: ")
         conta = filtrar_conta(cliente, num_conta, session)
 
         if not conta:
             print("\n@@@ Conta não encontrada para este cliente! @@@")
-            return
+            return False
 
         valor = float(input("Informe o valor do depósito: "))
         transacao = Deposito(valor)
-        sucesso = transacao.registrar(conta, session)
-        
-        if sucesso:
-            session.commit()
-        else:
-            session.rollback()
+        return efetivar_transacao(transacao, conta, session)
 
     except ValueError as e:
         print(f"\n@@@ Erro: {e} @@@")
+        return False
     finally:
         session.close()
+        liberar_operacao()
 
 def sacar_flow():
-    session = Session()
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    if not admitir_operacao(cpf):
+        return False
+    session = roteador.session_do_cpf(cpf)
     try:
-        cpf = input("Informe o CPF do cliente (somente números): ")
         cliente = filtrar_cliente(cpf, session)
 
         if not cliente:
             print("\n@@@ Cliente não encontrado! @@@")
-            return
+            return False
 
         num_conta = input("Informe o número da conta: ")
         conta = filtrar_conta(cliente, num_conta, session)
 
         if not conta:
             print("\n@@@ Conta não encontrada para este cliente! @@@")
-            return
+            return False
 
         valor = float(input("Informe o valor do saque: "))
         transacao = Saque(valor)
-        sucesso = transacao.registrar(conta, session)
+        return efetivar_transacao(transacao, conta, session)
 
-        if sucesso:
-            session.commit()
-        else:
-            session.rollback()
+    except ValueError as e:
+        print(f"\n@@@ Erro: {e} @@@")
+        return False
+    finally:
+        session.close()
+        liberar_operacao()
+
+def transferir_flow():
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    session = roteador.session_do_cpf(cpf)
+    try:
+        cliente = filtrar_cliente(cpf, session)
+
+        if not cliente:
+            print("\n@@@ Cliente não encontrado! @@@")
+            return False
+
+        num_conta = input("Informe o número da conta de origem: ")
+        conta = filtrar_conta(cliente, num_conta, session)
+
+        if not conta:
+            print("\n@@@ Conta não encontrada para este cliente! @@@")
+            return False
+
+        num_destino = input("Informe o número da conta de destino: ")
+        if roteador.agencia_da_conta(num_destino) != conta.agencia:
+            print("\n@@@ Transferências entre agências diferentes não são suportadas. @@@")
+            return False
+
+        destino = session.execute(_SELECIONAR_CONTA_POR_NUMERO, {"numero": num_destino}).scalars().first()
+
+        if not destino:
+            print("\n@@@ Conta de destino não encontrada! @@@")
+            return False
+
+        valor = float(input("Informe o valor da transferência: "))
+        transacao = Transferencia(valor, destino.id)
+        return efetivar_transacao(transacao, conta, session)
 
     except ValueError as e:
         print(f"\n@@@ Erro: {e} @@@")
+        return False
     finally:
         session.close()
 
 def exibir_extrato_flow():
-    session = Session()
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    if not admitir_operacao(cpf):
+        return False
+    liberar_ao_sair = True
+    session = roteador.session_do_cpf(cpf)
     try:
-        cpf = input("Informe o CPF do cliente (somente números): ")
         cliente = filtrar_cliente(cpf, session)
 
         if not cliente:
             print("\n@@@ Cliente não encontrado! @@@")
-            return
+            return False
 
         num_conta = input("Informe o número da conta: ")
         conta = filtrar_conta(cliente, num_conta, session)
 
         if not conta:
             print("\n@@@ Conta não encontrada para este cliente! @@@")
-            return
+            return False
 
-        print("\n=============== EXTRATO ===============")
-        print(f"Agência:\t{conta.agencia}")
-        print(f"Conta:\t\t{conta.numero}")
-        print(f"Cliente:\t{cliente.nome}")
-        
-        extrato = ""
-        # Agora, a transação está ligada à conta, e o SQLAlchemy irá carregá-la
-        for transacao in conta.transacoes:
-            extrato += f"{transacao.data.strftime('%d/%m/%Y %H:%M:%S')} - {transacao.tipo}: R$ {transacao.valor:.2f}\n"
-
-        print("Não foram realizadas movimentações." if not extrato else extrato)
-        print(f"\nSaldo atual:\t R$ {conta.saldo:.2f}")
-        print("=======================================")
+        inicio = ler_data_inicial(input("Informe a data inicial (AAAA-MM-DD, vazio para todo o histórico): "))
+        if agendador is not None:
+            # A vaga da admissão continua ocupada enquanto o extrato roda no agendador
+            executar_relatorio(
+                f"Extrato da conta {conta.numero}", _blocos_extrato_em_segundo_plano(cpf, conta.id, inicio),
+                "Erro ao montar o extrato", ao_concluir=liberar_operacao,
+            )
+            liberar_ao_sair = False
+        else:
+            print(montar_extrato(cliente, conta, session, inicio))
+    except ValueError as e:
+        print(f"\n@@@ Erro: {e} @@@")
+        return False
     finally:
         session.close()
+        if liberar_ao_sair:
+            liberar_operacao()
 
 def cadastrar_usuario_flow():
-    session = Session()
+    cpf = input("Informe o CPF (somente números): ")
+    session = roteador.session_do_cpf(cpf)
     try:
-        cpf = input("Informe o CPF (somente números): ")
         cliente_existente = filtrar_cliente(cpf, session)
 
         if cliente_existente:
             print("\n@@@ Já existe um cliente com este CPF! @@@")
-            return
+            return False
 
         nome = input("Informe o nome completo: ")
         data_nascimento = input("Informe a data de nascimento (AAAA-MM-DD): ")
@@ -265,28 +1879,25 @@ def cadastrar_usuario_flow():
     except Exception as e:
         print(f"Erro ao cadastrar cliente: {e}")
         session.rollback()
+        return False
     finally:
         session.close()
 
 def criar_conta_flow():
-    session = Session()
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    session = roteador.session_do_cpf(cpf)
     try:
-        cpf = input("Informe o CPF do cliente (somente números): ")
         cliente = filtrar_cliente(cpf, session)
 
         if not cliente:
             print("\n@@@ Cliente não encontrado! Fluxo de criação de conta encerrado. @@@")
-            return
+            return False
 
-        ultima_conta = session.query(ContaCorrente).order_by(ContaCorrente.id.desc()).first()
-        if ultima_conta:
-            proximo_numero = str(int(ultima_conta.numero) + 1).zfill(4)
-        else:
-            proximo_numero = "0001"
-        
+        agencia = roteador.agencia_do_cpf(cpf)
+        proximo_numero = proximo_numero_conta(session, *roteador.numeracao(agencia))
         nova_conta = ContaCorrente(
             numero=proximo_numero,
-            agencia="0001",
+            agencia=agencia,
             limite_saque=500.00,
             limite_saques_diarios=3,
             cliente=cliente
@@ -297,74 +1908,237 @@ def criar_conta_flow():
     except Exception as e:
         print(f"Erro ao criar conta: {e}")
         session.rollback()
+        return False
     finally:
         session.close()
 
-def listar_contas_flow():
-    session = Session()
+def _blocos_listagem(linhas, formatar, titulo, rodape, vazio, tamanho_bloco=1000):
+    # A listagem em blocos de texto, formatando `tamanho_bloco` linhas por vez
+    linhas = iter(linhas)
+    bloco = list(islice(linhas, tamanho_bloco))
+    if not bloco:
+        yield f"\n@@@ {vazio} @@@\n"
+        return
+    yield f"\n{titulo}\n"
+    while bloco:
+        yield "".join(formatar(*linha) for linha in bloco)
+        bloco = list(islice(linhas, tamanho_bloco))
+    yield f"{rodape}\n"
+
+def _formatar_conta(agencia, numero, nome, cpf):
+    return f"\nAgência:\t{agencia}\nC/C:\t\t{numero}\nCliente:\t{nome}\nCPF:\t\t{cpf}\n\n"
+
+def _formatar_cliente(nome, cpf, endereco, *_):
+    return f"\nNome:\t\t{nome}\nCPF:\t\t{cpf}\nEndereço:\t{endereco}\n\n"
+
+def _blocos_contas(contas):
+    return _blocos_listagem(
+        contas, _formatar_conta, "=============== CONTAS CADASTRADAS ===============",
+        "==================================================", "Nenhuma conta cadastrada!",
+    )
+
+def _blocos_clientes(clientes):
+    return _blocos_listagem(
+        clientes, _formatar_cliente, "=============== CLIENTES CADASTRADOS ===============",
+        "======================================================", "Nenhum cliente cadastrado!",
+    )
+
+def _imprimir_clientes(clientes):
+    for bloco in _blocos_clientes(clientes):
+        print(bloco, end="")
+
+def _linhas_em_todas(consulta, chave, tamanho_lote=1000):
+    # Linhas de todas as agências, intercaladas por `chave` e lidas `tamanho_lote` por vez;
+    # as sessões ficam abertas só enquanto a iteração durar
+    sessions = [roteador.session_factory(agencia)() for agencia in roteador.agencias]
     try:
-        contas = session.query(ContaCorrente).join(Cliente).order_by(ContaCorrente.numero).all()
-        if not contas:
-            print("\n@@@ Nenhuma conta cadastrada! @@@")
-        else:
-            print("\n=============== CONTAS CADASTRADAS ===============")
-            for conta in contas:
-                print(f"""
-Agência:\t{conta.agencia}
-C/C:\t\t{conta.numero}
-Cliente:\t{conta.cliente.nome}
-CPF:\t\t{conta.cliente.cpf}
-""")
-            print("==================================================")
-    except Exception as e:
-        print(f"Erro ao listar contas: {e}")
+        yield from heapq.merge(*(session.execute(consulta).yield_per(tamanho_lote) for session in sessions), key=chave)
     finally:
-        session.close()
+        for session in sessions:
+            session.close()
+
+def blocos_listagem_contas():
+    # As consultas rodam durante a iteração, na thread que consome os blocos
+    if projecao_leitura is not None:
+        contas = projecao_leitura.listar_contas()
+    else:
+        contas = _linhas_em_todas(_LISTAR_CONTAS, lambda conta: conta.numero)
+    yield from _blocos_contas(contas)
+
+def blocos_listagem_clientes():
+    if projecao_leitura is not None:
+        clientes = projecao_leitura.listar_clientes()
+    else:
+        clientes = _linhas_em_todas(_LISTAR_CLIENTES, lambda cliente: cliente.nome_normalizado)
+    yield from _blocos_clientes(clientes)
+
+def listar_contas_flow():
+    return executar_relatorio("Listagem de contas", blocos_listagem_contas(), "Erro ao listar contas")
 
 def listar_usuarios_flow():
-    session = Session()
+    return executar_relatorio("Listagem de usuários", blocos_listagem_clientes(), "Erro ao listar usuários")
+
+def buscar_usuarios_flow():
+    prefixo = input("Informe o início do nome: ").strip()
+    if not normalizar_nome(prefixo):
+        print("\n@@@ Informe ao menos uma letra do nome. @@@")
+        return False
+
     try:
-        clientes = session.query(Cliente).order_by(Cliente.nome).all()
+        por_agencia = roteador.consultar_todas(lambda session: buscar_clientes_por_prefixo(prefixo, session))
+        clientes = list(islice(heapq.merge(*por_agencia, key=lambda cliente: cliente.nome_normalizado), 10))
         if not clientes:
-            print("\n@@@ Nenhum cliente cadastrado! @@@")
-        else:
-            print("\n=============== CLIENTES CADASTRADOS ===============")
-            for cliente in clientes:
-                print(f"""
-Nome:\t\t{cliente.nome}
-CPF:\t\t{cliente.cpf}
-Endereço:\t{cliente.endereco}
-""")
-            print("======================================================")
+            print("\n@@@ Nenhum cliente encontrado! @@@")
+            return
+        _imprimir_clientes(clientes)
     except Exception as e:
-        print(f"Erro ao listar usuários: {e}")
+        print(f"Erro ao buscar usuários: {e}")
+        return False
+
+def _reconstruir_resumo_diario_da_agencia(session_factory):
+    session = session_factory()
+    try:
+        total = reconstruir_resumo_diario(session)
+        session.commit()
+        return total
+    except Exception:
+        session.rollback()
+        raise
     finally:
         session.close()
 
-def main():
+def montar_posicao_cliente(cliente):
+    return "\n".join([
+        "\n=============== POSIÇÃO DO CLIENTE ===============",
+        f"Cliente:\t{cliente.nome}",
+        f"Contas:\t\t{cliente.quantidade_contas}",
+        f"Saldo total:\t R$ {cliente.saldo_total:.2f}",
+        f"Saques hoje:\t {cliente.saques_hoje} (R$ {cliente.total_saques_hoje:.2f})",
+        "==================================================",
+    ])
+
+def posicao_cliente_flow():
+    cpf = input("Informe o CPF do cliente (somente números): ")
+    session = roteador.session_do_cpf(cpf)
+    try:
+        cliente = filtrar_cliente(cpf, session)
+
+        if not cliente:
+            print("\n@@@ Cliente não encontrado! @@@")
+            return False
+
+        print(montar_posicao_cliente(cliente))
+    finally:
+        session.close()
+
+def reconstruir_resumo_diario_flow():
+    try:
+        total = sum(roteador.em_todas(_reconstruir_resumo_diario_da_agencia))
+        print(f"\n=== Resumo diário reconstruído: {total} linha(s). ===")
+    except Exception as e:
+        print(f"Erro ao reconstruir resumo diário: {e}")
+        return False
+
+def arquivar_transacoes_flow():
+    corte = datetime.datetime.now() - datetime.timedelta(days=DIAS_RETENCAO)
+    try:
+        total = sum(roteador.em_todas(lambda session_factory: arquivar_transacoes(corte, session_factory)))
+        print(f"\n=== {total} transação(ões) anteriores a {corte:%d/%m/%Y} arquivada(s). ===")
+    except Exception as e:
+        print(f"Erro ao arquivar transações: {e}")
+        return False
+
+def fechamento_diario_flow():
+    try:
+        total = sum(roteador.em_todas(fechamento_diario))
+        print(f"\n=== Fechamento diário concluído para {total} conta(s). ===")
+    except Exception as e:
+        print(f"Erro no fechamento diário: {e}")
+        return False
+
+def reconstruir_saldos_flow():
+    try:
+        total = sum(len(estado) for estado in roteador.em_todas(reconstruir_estado))
+        if projecao_leitura:
+            projecao_leitura.atualizar()
+        print(f"\n=== Saldos reconstruídos a partir do histórico para {total} conta(s). ===")
+    except Exception as e:
+        print(f"Erro ao reconstruir saldos: {e}")
+        return False
+
+def aplicar_juros_e_tarifas_flow():
+    try:
+        taxa_juros = float(input("Informe a taxa de juros do período (%): ")) / 100
+        tarifa = float(input("Informe o valor da tarifa: "))
+        saldo_minimo_isencao = float(input("Informe o saldo mínimo para isenção da tarifa: "))
+        if taxa_juros < 0 or tarifa < 0:
+            print("\n@@@ Operação falhou! Os valores informados são inválidos. @@@")
+            return False
+
+        por_agencia = roteador.em_todas(
+            lambda session_factory: aplicar_juros_e_tarifas(taxa_juros, tarifa, saldo_minimo_isencao, session_factory)
+        )
+        totais = {tipo: sum(parcial[tipo] for parcial in por_agencia) for tipo in ("Juros", "Tarifa")}
+        if projecao_leitura:
+            projecao_leitura.atualizar()
+        print(f"\n=== Juros creditados em {totais['Juros']} conta(s); tarifa debitada de {totais['Tarifa']} conta(s). ===")
+    except ValueError as e:
+        print(f"\n@@@ Erro: {e} @@@")
+        return False
+    except Exception as e:
+        print(f"Erro ao aplicar juros e tarifas: {e}")
+        return False
+
+def main(arquivo_lote=None):
     menu = """
     [d] Depositar
     [s] Sacar
+    [t] Transferir
     [e] Extrato
     [nu] Novo usuário
     [nc] Nova conta
     [lc] Listar contas
     [lu] Listar usuários
+    [bu] Buscar usuários
+    [pc] Posição do cliente
+    [rd] Reconstruir resumo diário
+    [at] Arquivar transações antigas
+    [fd] Fechamento diário
+    [rs] Reconstruir saldos
+    [jt] Juros e tarifas
     [q] Sair
     => """
 
     opcoes_menu = {
         "d": depositar_flow,
         "s": sacar_flow,
+        "t": transferir_flow,
         "e": exibir_extrato_flow,
         "nu": cadastrar_usuario_flow,
         "nc": criar_conta_flow,
         "lc": listar_contas_flow,
         "lu": listar_usuarios_flow,
+        "bu": buscar_usuarios_flow,
+        "pc": posicao_cliente_flow,
+        "rd": reconstruir_resumo_diario_flow,
+        "at": arquivar_transacoes_flow,
+        "fd": fechamento_diario_flow,
+        "rs": reconstruir_saldos_flow,
+        "jt": aplicar_juros_e_tarifas_flow,
         "q": "Sair"
     }
 
+    if INSTRUMENTAR_CONSULTAS:
+        opcoes_menu = {opcao: _medir_fluxo(acao) if callable(acao) else acao for opcao, acao in opcoes_menu.items()}
+    if agendador is not None:
+        opcoes_menu = {opcao: _como_interativa(acao) if callable(acao) else acao for opcao, acao in opcoes_menu.items()}
+
+    if arquivo_lote:
+        executar_lote_de_arquivo(opcoes_menu, arquivo_lote)
+        return
+
     while True:
+        exibir_relatorios_prontos()
         opcao = input(menu).lower()
         acao = opcoes_menu.get(opcao)
 
@@ -378,7 +2152,28 @@ def main():
 if __name__ == "__main__":
     # Cria as tabelas no banco de dados se elas não existirem
     print("Criando tabelas no banco de dados (se necessário)...")
-    Base.metadata.create_all(engine)
+    roteador.criar_tabelas()
     print("Tabelas prontas.")
 
-    main()
\ No newline at end of file
+    # A escrita em grupo e a projeção de leitura trabalham sobre um único banco
+    if (ESCRITA_EM_GRUPO or PROJECAO_LEITURA) and len(roteador) > 1:
+        print("Escrita em grupo e projeção de leitura desativadas: EXTRADB_AGENCIAS usa um banco por agência.")
+    elif ESCRITA_EM_GRUPO:
+        escritor_em_grupo = EscritorEmGrupo().iniciar()
+    if PROJECAO_LEITURA and len(roteador) == 1:
+        projecao_leitura = ProjecaoLeitura().ativar()
+    if ADMISSAO:
+        controle_admissao = criar_controle_admissao()
+    if AGENDADOR:
+        agendador = criar_agendador()
+    try:
+        main(ler_argumento_lote())
+    finally:
+        if agendador:
+            # Relatórios ainda em andamento são concluídos e exibidos antes de sair
+            agendador.encerrar()
+            exibir_relatorios_prontos()
+        if escritor_em_grupo:
+            escritor_em_grupo.parar()
+        if INSTRUMENTAR_CONSULTAS:
+            print(estatisticas_consultas.relatorio())
\ No newline at end of file
@@ -0,0 +1,253 @@
+"""
+Caminho assíncrono (asyncio) para os fluxos do extradb.
+
+As funções recebem os dados já informados (sem input()) e devolvem
+(sucesso, mensagem), de modo que um servidor asyncio possa manter centenas
+de requisições em andamento no mesmo processo. As regras de negócio são as
+mesmas do extradb: depósitos e saques rodam via `AsyncSession.run_sync`.
+
+Servidor de exemplo (uma operação por linha, campos separados por ";"):
+    EXTRADB_ASYNC_URL=sqlite+aiosqlite:///sistema_bancario.db python extradb_async.py
+"""
+import asyncio
+import contextlib
+import datetime
+import os
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from admissao import ADMITIDA, MENSAGENS
+from extradb import (
+    ADMISSAO,
+    SQLITE_OTIMIZADO,
+    Base,
+    Cliente,
+    ContaCorrente,
+    Deposito,
+    Saque,
+    _BUSCAR_CLIENTES_POR_PREFIXO,
+    _LISTAR_CLIENTES,
+    _LISTAR_CONTAS,
+    _SELECIONAR_CLIENTE_POR_CPF,
+    _SELECIONAR_CONTA_DO_CLIENTE,
+    _aplicar_pragmas_sqlite,
+    criar_controle_admissao,
+    faixa_do_prefixo,
+    ler_data_inicial,
+    migrar_tabelas,
+    montar_extrato,
+    montar_posicao_cliente,
+    proximo_numero_conta,
+    roteador,
+)
+
+# --- Configuração do Banco de Dados Assíncrono ---
+ASYNC_DB_URL = os.environ.get("EXTRADB_ASYNC_URL", "sqlite+aiosqlite:///sistema_bancario.db")
+
+def criar_engine_async(url=ASYNC_DB_URL, otimizar_sqlite=SQLITE_OTIMIZADO, **opcoes):
+    engine = create_async_engine(url, **opcoes)
+    if engine.dialect.name == "sqlite" and otimizar_sqlite:
+        event.listen(engine.sync_engine, "connect", _aplicar_pragmas_sqlite)
+    return engine
+
+engine_async = criar_engine_async()
+SessionAsync = async_sessionmaker(engine_async, expire_on_commit=False)
+
+# Controle de admissão (EXTRADB_ADMISSAO=1): no servidor a recusa é imediata, sem bloquear o loop
+controle_admissao = criar_controle_admissao() if ADMISSAO else None
+
+@contextlib.contextmanager
+def _admitir(cpf):
+    # Produz None se a operação foi admitida, ou a mensagem de recusa com o código
+    if controle_admissao is None:
+        yield None
+        return
+    with controle_admissao.operacao(cpf, espera=0) as codigo:
+        yield None if codigo == ADMITIDA else f"{codigo}: {MENSAGENS[codigo]}"
+
+async def criar_tabelas(engine=engine_async):
+    async with engine.begin() as conexao:
+        await conexao.run_sync(Base.metadata.create_all)
+        await conexao.run_sync(migrar_tabelas)
+
+# --- Funções de Busca ---
+
+async def filtrar_cliente(cpf, session):
+    resultado = await session.execute(_SELECIONAR_CLIENTE_POR_CPF, {"cpf": cpf})
+    return resultado.scalars().first()
+
+async def filtrar_conta(cliente, numero_conta, session):
+    resultado = await session.execute(_SELECIONAR_CONTA_DO_CLIENTE, {"numero": numero_conta, "cliente_id": cliente.id})
+    return resultado.scalars().first()
+
+async def _buscar_cliente_e_conta(cpf, numero_conta, session):
+    cliente = await filtrar_cliente(cpf, session)
+    if not cliente:
+        return None, None, "Cliente não encontrado!"
+
+    conta = await filtrar_conta(cliente, numero_conta, session)
+    if not conta:
+        return cliente, None, "Conta não encontrada para este cliente!"
+    return cliente, conta, None
+
+# --- Funções de Fluxo Assíncronas ---
+
+async def _registrar_transacao(cpf, numero_conta, transacao, sessionmaker=None):
+    with _admitir(cpf) as recusa:
+        if recusa:
+            return False, recusa
+        return await _efetivar_transacao(cpf, numero_conta, transacao, sessionmaker)
+
+async def _efetivar_transacao(cpf, numero_conta, transacao, sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        cliente, conta, erro = await _buscar_cliente_e_conta(cpf, numero_conta, session)
+        if erro:
+            return False, erro
+
+        motivo = transacao.motivo_recusa(conta) if isinstance(transacao, Saque) else None
+        if motivo:
+            return False, motivo
+
+        # aplicar(), e não registrar(): a mensagem vai na resposta, não no stdout do servidor
+        sucesso, mensagem = await session.run_sync(lambda sessao: transacao.aplicar(conta, sessao))
+        if not sucesso:
+            await session.rollback()
+            return False, mensagem
+        await session.commit()
+        return True, mensagem
+
+async def depositar(cpf, numero_conta, valor, sessionmaker=None):
+    try:
+        transacao = Deposito(valor)
+    except ValueError as e:
+        return False, str(e)
+    return await _registrar_transacao(cpf, numero_conta, transacao, sessionmaker)
+
+async def sacar(cpf, numero_conta, valor, sessionmaker=None):
+    try:
+        transacao = Saque(valor)
+    except ValueError as e:
+        return False, str(e)
+    return await _registrar_transacao(cpf, numero_conta, transacao, sessionmaker)
+
+async def exibir_extrato(cpf, numero_conta, inicio=None, sessionmaker=None):
+    with _admitir(cpf) as recusa:
+        if recusa:
+            return False, recusa
+        async with (sessionmaker or SessionAsync)() as session:
+            cliente, conta, erro = await _buscar_cliente_e_conta(cpf, numero_conta, session)
+            if erro:
+                return False, erro
+            extrato = await session.run_sync(lambda sessao: montar_extrato(cliente, conta, sessao, inicio))
+            return True, extrato
+
+async def cadastrar_usuario(cpf, nome, data_nascimento, endereco, sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        if await filtrar_cliente(cpf, session):
+            return False, "Já existe um cliente com este CPF!"
+        try:
+            session.add(Cliente(
+                nome=nome,
+                data_nascimento=datetime.datetime.strptime(data_nascimento, "%Y-%m-%d"),
+                cpf=cpf,
+                endereco=endereco
+            ))
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            return False, f"Erro ao cadastrar cliente: {e}"
+        return True, "Cliente cadastrado com sucesso!"
+
+async def criar_conta(cpf, sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        cliente = await filtrar_cliente(cpf, session)
+        if not cliente:
+            return False, "Cliente não encontrado! Fluxo de criação de conta encerrado."
+        try:
+            # Mesma agência (pelo CPF) e numeração intercalada do extradb
+            agencia = roteador.agencia_do_cpf(cpf)
+            proximo_numero = await session.run_sync(
+                lambda sessao: proximo_numero_conta(sessao, *roteador.numeracao(agencia))
+            )
+            session.add(ContaCorrente(
+                numero=proximo_numero,
+                agencia=agencia,
+                limite_saque=500.00,
+                limite_saques_diarios=3,
+                cliente=cliente
+            ))
+            await session.commit()
+        except Exception as e:
+            await session.rollback()
+            return False, f"Erro ao criar conta: {e}"
+        return True, f"Conta {proximo_numero} criada com sucesso para {cliente.nome}!"
+
+async def listar_contas(sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        resultado = await session.execute(_LISTAR_CONTAS)
+        linhas = [
+            f"Agência:\t{agencia}\nC/C:\t\t{numero}\nCliente:\t{nome}\nCPF:\t\t{cpf}\n"
+            for agencia, numero, nome, cpf in resultado
+        ]
+        return True, "\n".join(linhas) if linhas else "Nenhuma conta cadastrada!"
+
+async def listar_usuarios(sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        resultado = await session.execute(_LISTAR_CLIENTES)
+        linhas = [f"Nome:\t\t{nome}\nCPF:\t\t{cpf}\nEndereço:\t{endereco}\n" for nome, cpf, endereco, _ in resultado]
+        return True, "\n".join(linhas) if linhas else "Nenhum cliente cadastrado!"
+
+async def buscar_usuarios(prefixo, limite="10", sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        resultado = await session.execute(_BUSCAR_CLIENTES_POR_PREFIXO, {**faixa_do_prefixo(prefixo), "limite": int(limite)})
+        linhas = [f"Nome:\t\t{nome}\nCPF:\t\t{cpf}\nEndereço:\t{endereco}\n" for nome, cpf, endereco, _ in resultado]
+        return True, "\n".join(linhas) if linhas else "Nenhum cliente encontrado!"
+
+async def posicao_cliente(cpf, sessionmaker=None):
+    async with (sessionmaker or SessionAsync)() as session:
+        cliente = await filtrar_cliente(cpf, session)
+        if not cliente:
+            return False, "Cliente não encontrado!"
+        return True, montar_posicao_cliente(cliente)
+
+# --- Servidor asyncio (uma operação por linha: "d;cpf;conta;valor", "e;cpf;conta[;AAAA-MM-DD]") ---
+
+OPERACOES = {
+    "d": lambda cpf, conta, valor: depositar(cpf, conta, float(valor)),
+    "s": lambda cpf, conta, valor: sacar(cpf, conta, float(valor)),
+    "e": lambda cpf, conta, inicio="": exibir_extrato(cpf, conta, ler_data_inicial(inicio)),
+    "nu": cadastrar_usuario,
+    "nc": criar_conta,
+    "lc": listar_contas,
+    "lu": listar_usuarios,
+    "bu": buscar_usuarios,
+    "pc": posicao_cliente,
+}
+
+async def executar_linha(linha):
+    opcao, *campos = linha.strip().split(";")
+    operacao = OPERACOES.get(opcao)
+    if not operacao:
+        return False, "Operação inválida."
+    try:
+        return await operacao(*campos)
+    except (TypeError, ValueError) as e:
+        return False, f"Erro: {e}"
+
+async def _atender_cliente(leitor, escritor):
+    while linha := await leitor.readline():
+        sucesso, mensagem = await executar_linha(linha.decode())
+        escritor.write(f"{'OK' if sucesso else 'ERRO'} {mensagem}\n".encode())
+        await escritor.drain()
+    escritor.close()
+
+async def servir(host="127.0.0.1", porta=8765):
+    await criar_tabelas()
+    servidor = await asyncio.start_server(_atender_cliente, host, porta)
+    async with servidor:
+        print(f"Servidor extradb assíncrono em {host}:{porta}")
+        await servidor.serve_forever()
+
+if __name__ == "__main__":
+    asyncio.run(servir())
@@ -6,11 +6,18 @@ GO
 CREATE TABLE clientes (
     id INT IDENTITY(1,1) PRIMARY KEY,
     nome VARCHAR(255) NOT NULL,
+    nome_normalizado VARCHAR(255),
     data_nascimento DATE,
     cpf VARCHAR(14) NOT NULL UNIQUE,
-    endereco VARCHAR(255) NOT NULL
+    endereco VARCHAR(255) NOT NULL,
+    saldo_total DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+    quantidade_contas INT NOT NULL DEFAULT 0,
+    saques_hoje INT NOT NULL DEFAULT 0,
+    total_saques_hoje DECIMAL(12, 2) NOT NULL DEFAULT 0.00
 );
 
+CREATE INDEX ix_clientes_nome_normalizado ON clientes (nome_normalizado);
+
 ---
 
 CREATE TABLE contas (
@@ -34,4 +41,48 @@ CREATE TABLE transacoes (
     data DATETIME NOT NULL,
     conta_id INT,
     CONSTRAINT FK_Transacoes_Contas FOREIGN KEY (conta_id) REFERENCES contas(id)
-);
\ No newline at end of file
+);
+
+---
+
+CREATE TABLE resumo_diario (
+    conta_id INT NOT NULL,
+    dia DATE NOT NULL,
+    quantidade_depositos INT NOT NULL DEFAULT 0,
+    total_depositos DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    quantidade_saques INT NOT NULL DEFAULT 0,
+    total_saques DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    quantidade_transferencias_enviadas INT NOT NULL DEFAULT 0,
+    total_transferencias_enviadas DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    quantidade_transferencias_recebidas INT NOT NULL DEFAULT 0,
+    total_transferencias_recebidas DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    quantidade_juros INT NOT NULL DEFAULT 0,
+    total_juros DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    quantidade_tarifas INT NOT NULL DEFAULT 0,
+    total_tarifas DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    saldo_fechamento DECIMAL(10, 2) NOT NULL DEFAULT 0.00,
+    CONSTRAINT PK_Resumo_Diario PRIMARY KEY (conta_id, dia),
+    CONSTRAINT FK_Resumo_Diario_Contas FOREIGN KEY (conta_id) REFERENCES contas(id)
+);
+
+CREATE INDEX ix_transacoes_conta_data ON transacoes (conta_id, data);
+
+---
+
+CREATE TABLE transacoes_arquivo (
+    id INT PRIMARY KEY,
+    tipo VARCHAR(50) NOT NULL,
+    valor DECIMAL(10, 2) NOT NULL,
+    data DATETIME NOT NULL,
+    conta_id INT,
+    CONSTRAINT FK_Transacoes_Arquivo_Contas FOREIGN KEY (conta_id) REFERENCES contas(id)
+);
+
+CREATE INDEX ix_transacoes_arquivo_conta_data ON transacoes_arquivo (conta_id, data);
+
+---
+
+CREATE TABLE arquivamento (
+    id INT IDENTITY(1,1) PRIMARY KEY,
+    corte DATETIME NOT NULL
+);
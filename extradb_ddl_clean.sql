@@ -1,7 +1,43 @@
 USE sistema_bancario;
 GO
 
--- 1. Remove a tabela 'transacoes' (a mais dependente)
+-- 1. Remove a tabela 'arquivamento'
+IF OBJECT_ID('dbo.arquivamento', 'U') IS NOT NULL
+BEGIN
+    DROP TABLE arquivamento;
+    PRINT 'Tabela "arquivamento" removida com sucesso.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela "arquivamento" no encontrada. Nenhuma ao necessria.';
+END
+GO
+
+-- 2. Remove a tabela 'transacoes_arquivo'
+IF OBJECT_ID('dbo.transacoes_arquivo', 'U') IS NOT NULL
+BEGIN
+    DROP TABLE transacoes_arquivo;
+    PRINT 'Tabela "transacoes_arquivo" removida com sucesso.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela "transacoes_arquivo" no encontrada. Nenhuma ao necessria.';
+END
+GO
+
+-- 3. Remove a tabela 'resumo_diario'
+IF OBJECT_ID('dbo.resumo_diario', 'U') IS NOT NULL
+BEGIN
+    DROP TABLE resumo_diario;
+    PRINT 'Tabela "resumo_diario" removida com sucesso.';
+END
+ELSE
+BEGIN
+    PRINT 'Tabela "resumo_diario" no encontrada. Nenhuma ao necessria.';
+END
+GO
+
+-- 4. Remove a tabela 'transacoes'
 IF OBJECT_ID('dbo.transacoes', 'U') IS NOT NULL
 BEGIN
     DROP TABLE transacoes;
@@ -13,7 +49,7 @@ BEGIN
 END
 GO
 
--- 2. Remove a tabela 'contas'
+-- 5. Remove a tabela 'contas'
 IF OBJECT_ID('dbo.contas', 'U') IS NOT NULL
 BEGIN
     DROP TABLE contas;
@@ -25,7 +61,7 @@ BEGIN
 END
 GO
 
--- 3. Remove a tabela 'clientes' (a mais independente)
+-- 6. Remove a tabela 'clientes' (a mais independente)
 IF OBJECT_ID('dbo.clientes', 'U') IS NOT NULL
 BEGIN
     DROP TABLE clientes;
@@ -0,0 +1,128 @@
+"""
+Blocos compactados do histórico de transações do desafio4.
+
+Um bloco guarda uma sequência fechada de movimentações (tipo, valor em
+milionésimos, data em epoch) em bytes:
+
+    escala  a maior potência de 10 (até ESCALA_VALOR) que divide todos os valores
+    datas   a primeira absoluta, as demais como diferença para a anterior
+    valores divididos pela escala (em blocos só com centavos, 10000)
+    tipos   pares (código do tipo, repetições consecutivas)
+
+todos como varints (inteiros em 7 bits por byte; datas e valores em zigzag,
+para aceitar diferenças negativas). Cada bloco guarda também a menor e a
+maior data, para que leituras por período pulem blocos inteiros sem
+decodificá-los.
+"""
+import datetime
+import threading
+
+TAMANHO_BLOCO = 128
+# Valores guardados como inteiros em milionésimos: exatos para até 6 casas decimais
+ESCALA_VALOR = 10**6
+
+# Códigos dos tipos de movimentação, atribuídos na primeira vez que cada tipo aparece
+TIPOS = []
+CODIGOS = {}
+_LOCK_TIPOS = threading.Lock()
+_ultima_data = (None, None)
+
+
+def codigo_do_tipo(tipo):
+    codigo = CODIGOS.get(tipo)
+    if codigo is None:
+        with _LOCK_TIPOS:
+            if tipo not in CODIGOS:
+                TIPOS.append(tipo)
+                CODIGOS[tipo] = len(TIPOS) - 1
+            codigo = CODIGOS[tipo]
+    return codigo
+
+
+def _escrever_varint(saida, numero):
+    while numero > 0x7F:
+        saida.append(numero & 0x7F | 0x80)
+        numero >>= 7
+    saida.append(numero)
+
+
+def _ler_varint(dados, posicao):
+    numero = deslocamento = 0
+    while True:
+        byte = dados[posicao]
+        posicao += 1
+        numero |= (byte & 0x7F) << deslocamento
+        if byte < 0x80:
+            return numero, posicao
+        deslocamento += 7
+
+
+def _zigzag(numero):
+    return numero << 1 if numero >= 0 else (-numero << 1) - 1
+
+
+def _dezigzag(numero):
+    return numero >> 1 if not numero & 1 else -((numero + 1) >> 1)
+
+
+def formatar_data(epoch):
+    # Movimentações próximas costumam cair no mesmo segundo: reaproveita a última formatação
+    global _ultima_data
+    data, texto = _ultima_data
+    if data != epoch:
+        texto = datetime.datetime.fromtimestamp(epoch).strftime("%d/%m/%Y %H:%M:%S")
+        _ultima_data = (epoch, texto)
+    return texto
+
+
+class BlocoHistorico:
+    """
+    Bloco selado (imutável) de movimentações.
+    """
+    __slots__ = ("dados", "quantidade", "data_minima", "data_maxima")
+
+    def __init__(self, codigos, valores, datas):
+        dados = bytearray()
+        escala = ESCALA_VALOR
+        while escala > 1 and any(valor % escala for valor in valores):
+            escala //= 10
+        _escrever_varint(dados, escala)
+        anterior = 0
+        for data in datas:
+            _escrever_varint(dados, _zigzag(data - anterior))
+            anterior = data
+        for valor in valores:
+            _escrever_varint(dados, _zigzag(valor // escala))
+        inicio = 0
+        for posicao in range(1, len(codigos) + 1):
+            if posicao == len(codigos) or codigos[posicao] != codigos[inicio]:
+                _escrever_varint(dados, codigos[inicio])
+                _escrever_varint(dados, posicao - inicio)
+                inicio = posicao
+        self.dados = bytes(dados)
+        self.quantidade = len(datas)
+        self.data_minima = min(datas)
+        self.data_maxima = max(datas)
+
+    def registros(self):
+        """
+        Lista de (código do tipo, valor em milionésimos, data) na ordem em que foram registrados.
+        """
+        dados, quantidade = self.dados, self.quantidade
+        escala, posicao = _ler_varint(dados, 0)
+        datas = []
+        data = 0
+        for _ in range(quantidade):
+            diferenca, posicao = _ler_varint(dados, posicao)
+            data += _dezigzag(diferenca)
+            datas.append(data)
+        valores = []
+        for _ in range(quantidade):
+            valor, posicao = _ler_varint(dados, posicao)
+            valores.append(_dezigzag(valor) * escala)
+        codigos = []
+        while len(codigos) < quantidade:
+            codigo, posicao = _ler_varint(dados, posicao)
+            repeticoes, posicao = _ler_varint(dados, posicao)
+            codigos.extend([codigo] * repeticoes)
+        return list(zip(codigos, valores, datas))
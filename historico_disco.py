@@ -0,0 +1,179 @@
+"""
+Histórico de transações em disco para as contas do desafio4.
+
+Cada movimentação é um registro binário de tamanho fixo (número da conta,
+tipo, valor em milionésimos, data e posição do registro anterior da mesma conta)
+acrescentado ao arquivo do shard da conta (número % quantidade de shards).
+Os arquivos são lidos e escritos via mmap: a leitura de um extrato
+decodifica os registros direto das páginas mapeadas, sem cópias.
+
+Em memória fica apenas, por conta, a posição do último registro e a
+quantidade de registros; os registros de uma conta são encadeados de trás
+para frente. Assim o tamanho do processo depende das contas em uso, não do
+volume total do histórico.
+
+Uso:
+    python desafio4.py --historico /caminho/para/diretorio
+"""
+import datetime
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+
+from historico_compacto import ESCALA_VALOR
+
+# conta (uint32), tipo (uint8), 3 bytes de alinhamento, valor em milionésimos, data (epoch em segundos), registro anterior
+REGISTRO = struct.Struct("<IBxxxqqq")
+TIPOS = ("Deposito", "Saque", "TransferenciaEnviada", "TransferenciaRecebida")
+CODIGOS = {tipo: codigo for codigo, tipo in enumerate(TIPOS, 1)}
+TAMANHO_INICIAL = 1 << 20
+QUANTIDADE_SHARDS = 16
+
+
+def ler_argumento_historico(argv=None):
+    """
+    Retorna o diretório informado em --historico, ou None.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if "--historico" in argv:
+        posicao = argv.index("--historico")
+        if posicao + 1 < len(argv):
+            return argv[posicao + 1]
+    return None
+
+
+class Shard:
+    """
+    Um arquivo de registros mapeado em memória. O arquivo é pré-alocado e
+    dobra de tamanho quando enche, para não remapear a cada registro.
+    """
+    def __init__(self, caminho):
+        self._arquivo = open(caminho, "w+b")
+        self._arquivo.truncate(TAMANHO_INICIAL)
+        self.mapa = mmap.mmap(self._arquivo.fileno(), 0)
+        self.fim = 0
+        self.lock = threading.Lock()
+
+    def acrescentar(self, numero, codigo, valor, data, anterior):
+        if self.fim + REGISTRO.size > len(self.mapa):
+            self._crescer()
+        posicao = self.fim
+        REGISTRO.pack_into(self.mapa, posicao, numero, codigo, valor, data, anterior)
+        self.fim += REGISTRO.size
+        return posicao
+
+    def _crescer(self):
+        tamanho = len(self.mapa) * 2
+        self.mapa.close()
+        self._arquivo.truncate(tamanho)
+        self.mapa = mmap.mmap(self._arquivo.fileno(), 0)
+
+    def fechar(self):
+        self.mapa.flush()
+        self.mapa.close()
+        self._arquivo.truncate(self.fim)
+        self._arquivo.close()
+
+
+class ArquivoHistorico:
+    """
+    Conjunto de shards com o índice de cada conta: {número: [posição do último
+    registro, quantidade de registros]}. Começa sempre vazio, como o restante
+    do estado do desafio4.
+    """
+    def __init__(self, diretorio, quantidade_shards=QUANTIDADE_SHARDS):
+        os.makedirs(diretorio, exist_ok=True)
+        self._shards = [
+            Shard(os.path.join(diretorio, f"historico_{indice:03d}.bin")) for indice in range(quantidade_shards)
+        ]
+        self._indice = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excecao):
+        self.fechar()
+
+    def _shard(self, numero):
+        return self._shards[numero % len(self._shards)]
+
+    def historico(self, numero):
+        return HistoricoEmDisco(self, numero)
+
+    def registrar(self, numero, tipo, valor, data=None):
+        shard = self._shard(numero)
+        data = int(time.time() if data is None else data)
+        with shard.lock:
+            anterior, quantidade = self._indice.get(numero, (-1, 0))
+            posicao = shard.acrescentar(numero, CODIGOS[tipo], round(valor * ESCALA_VALOR), data, anterior)
+            self._indice[numero] = [posicao, quantidade + 1]
+
+    def quantidade(self, numero):
+        return self._indice.get(numero, (-1, 0))[1]
+
+    def registros(self, numero, inicio=0):
+        """
+        Registros (tipo, valor, data) da conta a partir do `inicio`-ésimo, em
+        ordem cronológica. Percorre a cadeia só até o registro `inicio`.
+        """
+        shard = self._shard(numero)
+        with shard.lock:
+            posicao, quantidade = self._indice.get(numero, (-1, 0))
+            registros = []
+            for _ in range(quantidade - inicio):
+                _, codigo, valor, data, anterior = REGISTRO.unpack_from(shard.mapa, posicao)
+                registros.append((TIPOS[codigo - 1], valor / ESCALA_VALOR, data))
+                posicao = anterior
+        registros.reverse()
+        return registros
+
+    def fechar(self):
+        for shard in self._shards:
+            shard.fechar()
+
+
+class HistoricoEmDisco:
+    """
+    Mesma interface do Historico do desafio4, com os registros guardados no
+    ArquivoHistorico em vez de uma lista em memória.
+    """
+    def __init__(self, arquivo, numero):
+        self._arquivo = arquivo
+        self._numero = numero
+
+    @property
+    def transacoes(self):
+        return self.transacoes_desde(0)
+
+    def __len__(self):
+        return self._arquivo.quantidade(self._numero)
+
+    @staticmethod
+    def _como_transacoes(registros):
+        return [
+            {"tipo": tipo, "valor": valor, "data": datetime.datetime.fromtimestamp(data).strftime("%d/%m/%Y %H:%M:%S")}
+            for tipo, valor, data in registros
+        ]
+
+    def transacoes_desde(self, inicio):
+        return self._como_transacoes(self._arquivo.registros(self._numero, inicio))
+
+    def transacoes_entre(self, data_inicial=None, data_final=None):
+        """
+        Transações entre duas datas (datetime, inclusive).
+        """
+        data_inicial = None if data_inicial is None else int(data_inicial.timestamp())
+        data_final = None if data_final is None else int(data_final.timestamp())
+        return self._como_transacoes(
+            (tipo, valor, data) for tipo, valor, data in self._arquivo.registros(self._numero)
+            if (data_inicial is None or data >= data_inicial) and (data_final is None or data <= data_final)
+        )
+
+    def adicionar_transacao(self, transacao):
+        self.registrar_movimento(transacao.__class__.__name__, transacao.valor)
+
+    def registrar_movimento(self, tipo, valor, data=None):
+        self._arquivo.registrar(self._numero, tipo, valor, data)
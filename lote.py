@@ -0,0 +1,140 @@
+"""
+Modo em lote (sem prompts) para os programas de menu.
+
+Cada linha do fluxo de comandos é uma operação, com a opção do menu seguida
+de todos os campos que o fluxo interativo pediria, separados por ";":
+
+    nu;12345678900;Maria Silva;01-01-1990;Rua A, 1 - Centro - Cidade/UF
+    nc;12345678900
+    d;12345678900;1;150.00
+    s;12345678900;1;50.00
+    e;12345678900;1
+
+Os campos são entregues, na ordem, às chamadas de input() dos mesmos
+handlers de `opcoes_menu`; a saída é acumulada em buffer e gravada em blocos.
+Linhas vazias ou iniciadas por "#" são ignoradas.
+
+Uma operação conta como falha quando o handler levanta uma exceção ou
+retorna False (recusa de negócio: saldo insuficiente, limite diário,
+cliente ou conta não encontrados, ...).
+Campos além dos que o handler leu geram apenas um aviso: a operação já
+foi executada e não conta como falha.
+
+Uso:
+    python desafio4.py --lote operacoes.txt
+    python desafio4.py --lote - < operacoes.txt
+"""
+import builtins
+import contextlib
+import io
+import sys
+import time
+
+SEPARADOR = ";"
+TAMANHO_BUFFER = 1 << 16
+
+
+class CamposInsuficientes(Exception):
+    pass
+
+
+class ResumoLote:
+    """
+    Totais de uma execução em lote.
+    """
+    def __init__(self):
+        self.operacoes = 0
+        self.falhas = 0
+        self.duracao = 0.0
+
+    def __str__(self):
+        vazao = self.operacoes / self.duracao if self.duracao else 0.0
+        return (f"\n=== Lote concluído: {self.operacoes} operação(ões), {self.falhas} falha(s) "
+                f"em {self.duracao:.2f}s ({vazao:,.0f} ops/s) ===")
+
+
+def ler_argumento_lote(argv=None):
+    """
+    Retorna o arquivo informado em --lote (ou "-" para a entrada padrão), ou None.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if "--lote" in argv:
+        posicao = argv.index("--lote")
+        return argv[posicao + 1] if posicao + 1 < len(argv) else "-"
+    return None
+
+
+@contextlib.contextmanager
+def abrir_fluxo(arquivo):
+    if arquivo == "-":
+        yield sys.stdin
+    else:
+        with open(arquivo, encoding="utf-8") as fluxo:
+            yield fluxo
+
+
+def executar_lote(opcoes_menu, linhas, saida=None):
+    """
+    Executa cada linha pelo handler correspondente de `opcoes_menu` e
+    retorna um ResumoLote. A opção "q" encerra o lote.
+    """
+    saida = saida or sys.stdout
+    resumo = ResumoLote()
+    campos = []
+    buffer = io.StringIO()
+
+    def ler_campo(prompt=""):
+        if not campos:
+            raise CamposInsuficientes("campos insuficientes para a operação")
+        return campos.pop()
+
+    input_original = builtins.input
+    builtins.input = ler_campo
+    inicio = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(buffer):
+            for numero_linha, linha in enumerate(linhas, 1):
+                linha = linha.strip()
+                if not linha or linha.startswith("#"):
+                    continue
+
+                opcao, *valores = linha.split(SEPARADOR)
+                if opcao == "q":
+                    break
+                acao = opcoes_menu.get(opcao)
+                resumo.operacoes += 1
+                if acao is None:
+                    resumo.falhas += 1
+                    print(f"\n@@@ Linha {numero_linha}: operação inválida '{opcao}'. @@@")
+                    continue
+
+                campos[:] = reversed(valores)
+                try:
+                    resumo.falhas += acao() is False
+                except Exception as e:
+                    resumo.falhas += 1
+                    print(f"\n@@@ Linha {numero_linha}: {e} @@@")
+                else:
+                    # A operação já foi executada (e gravada): os campos a mais são só avisados,
+                    # para que reexecutar as linhas com falha não a aplique de novo
+                    if campos:
+                        print(f"\n@@@ Linha {numero_linha}: aviso: {len(campos)} campo(s) não utilizado(s) @@@")
+
+                if buffer.tell() >= TAMANHO_BUFFER:
+                    saida.write(buffer.getvalue())
+                    buffer.seek(0)
+                    buffer.truncate()
+    finally:
+        builtins.input = input_original
+        resumo.duracao = time.perf_counter() - inicio
+        saida.write(buffer.getvalue())
+    return resumo
+
+
+def executar_lote_de_arquivo(opcoes_menu, arquivo, saida=None):
+    saida = saida or sys.stdout
+    with abrir_fluxo(arquivo) as fluxo:
+        resumo = executar_lote(opcoes_menu, fluxo, saida)
+    saida.write(f"{resumo}\n")
+    saida.flush()
+    return resumo
@@ -0,0 +1,79 @@
+"""
+Orçamento de consultas SQL dos fluxos do menu do extradb (ORCAMENTO_CONSULTAS),
+cada um executado contra um banco SQLite temporário.
+
+    python -m pytest test_orcamento_consultas.py
+"""
+import builtins
+import os
+
+# Antes de importar o extradb, cujo banco padrão é o SQL Server
+os.environ.setdefault("EXTRADB_URL", "sqlite://")
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import extradb
+
+# Campos digitados em cada fluxo, com o banco preparado por `banco`
+ENTRADAS = {
+    "depositar_flow": ["11111111111", "0001", "100"],
+    "sacar_flow": ["11111111111", "0001", "50"],
+    "transferir_flow": ["11111111111", "0001", "0002", "10"],
+    "exibir_extrato_flow": ["11111111111", "0001", ""],
+    "cadastrar_usuario_flow": ["33333333333", "Carla Dias", "1992-03-03", "Rua C, 3"],
+    "criar_conta_flow": ["22222222222"],
+    "listar_contas_flow": [],
+    "listar_usuarios_flow": [],
+    "buscar_usuarios_flow": ["ana"],
+    "posicao_cliente_flow": ["11111111111"],
+}
+
+
+def executar(fluxo, entradas, monkeypatch):
+    respostas = iter(entradas)
+    monkeypatch.setattr(builtins, "input", lambda prompt="": next(respostas))
+    resultado = fluxo()
+    assert next(respostas, None) is None, "campos não utilizados"
+    return resultado
+
+
+@pytest.fixture
+def banco(tmp_path, monkeypatch, capsys):
+    engine = extradb.criar_engine(f"sqlite:///{tmp_path / 'banco.db'}")
+    Session = sessionmaker(bind=engine)
+    monkeypatch.setattr(extradb, "Session", Session)
+    monkeypatch.setattr(extradb, "roteador", extradb.RoteadorAgencias({"0001": Session}))
+    extradb.roteador.criar_tabelas()
+
+    for entradas in (
+        ["11111111111", "Ana Souza", "1990-01-01", "Rua A, 1"],
+        ["22222222222", "Bruno Lima", "1991-02-02", "Rua B, 2"],
+    ):
+        assert executar(extradb.cadastrar_usuario_flow, entradas, monkeypatch) is not False
+        assert executar(extradb.criar_conta_flow, entradas[:1], monkeypatch) is not False
+    assert executar(extradb.depositar_flow, ["11111111111", "0001", "500"], monkeypatch) is not False
+    capsys.readouterr()
+    yield
+    engine.dispose()
+
+
+def test_todos_os_fluxos_do_orcamento_tem_entradas():
+    assert set(ENTRADAS) == set(extradb.ORCAMENTO_CONSULTAS)
+
+
+@pytest.mark.parametrize("nome", sorted(extradb.ORCAMENTO_CONSULTAS))
+def test_fluxo_dentro_do_orcamento(nome, banco, monkeypatch, capsys):
+    with extradb.orcamento_consultas(nome) as medicao:
+        resultado = executar(getattr(extradb, nome), ENTRADAS[nome], monkeypatch)
+
+    saida = capsys.readouterr().out
+    assert resultado is not False, saida
+    assert "@@@" not in saida
+    assert medicao.quantidade > 0
+
+
+def test_orcamento_excedido(banco, monkeypatch):
+    with pytest.raises(extradb.OrcamentoConsultasExcedido, match="posicao_cliente_flow"):
+        with extradb.orcamento_consultas("posicao_cliente_flow", maximo=0):
+            executar(extradb.posicao_cliente_flow, ENTRADAS["posicao_cliente_flow"], monkeypatch)